@@ -1,24 +1,51 @@
 """The Lock Manager integration."""
 import asyncio
 import logging
+import time
 import voluptuous as vol
 import homeassistant.helpers.config_validation as cv
 
-from datetime import timedelta
-from typing import Optional
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, Event, CoreState, callback
-from homeassistant.helpers.event import async_call_later
 from homeassistant.util import Throttle
+import homeassistant.util.dt as dt_util
 from openzwavemqtt.const import CommandClass
 
 from homeassistant.components.ozw import DOMAIN as OZW_DOMAIN
 from homeassistant.components.zwave import DOMAIN as ZWAVE_DOMAIN
 
-from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.const import ATTR_BATTERY_LEVEL, EVENT_HOMEASSISTANT_STOP, EVENT_STATE_CHANGED
+from homeassistant.exceptions import HomeAssistantError
 from .sensor import CodeSensor, ATTR_SENSOR_SLOT_ENABLED, ATTR_SENSOR_SETTINGS
-from .schema import SLOT_SETTINGS_SCHEMA
+from .schema import (
+    SLOT_SETTINGS_SCHEMA,
+    UPDATE_SLOTS_SCHEMA,
+    SET_USER_SCHEMA,
+    REVOKE_USER_SCHEMA,
+    validate_slot_entry,
+)
+from .users import UserManager
+from .metrics import CoordinatorMetrics
+from .code_index import CodeIndex
+from .bulk import async_export_slots, async_import_slots, config_file, DEFAULT_CHUNK_SIZE, FORMATS
+from .profiler import CoordinatorProfiler, PROFILE_CYCLES, PROFILE_EVENTS
+from .access_log import AccessLog, ACCESS_LOG_DIR, remove_log
+from .counters import AccessCounters
+from .notifications import NotificationQueue, PERSISTENT_NOTIFICATION
+from .timers import TimerManager, TIMER_ALARM_PAIR, TIMER_DOOR_OPEN, TIMER_LOCK_CHANGED, TIMER_LOCKDOWN
+from .correlator import AlarmCorrelator, HALF_LEVEL, HALF_TYPE
+from .decoders import DecoderRegistry
+from .detector import AttemptDetector, ATTEMPT_NAMES, DEFAULT_ATTEMPT_LIMIT, DEFAULT_ATTEMPT_WINDOW
+from .polling import PollScheduler
+from .schedule import compile_schedule
+from .websocket import async_register_websocket
+from .lovelace import LovelaceGenerator, DEFAULT_LOVELACE_FILE, LOVELACE_FORMATS
+from .trace import TraceRecorder
+from .clock import ClockWatch
 from .const import (
     DOMAIN,
     LOCK_DOMAIN,
@@ -33,10 +60,17 @@ from .const import (
     CONF_NOTIFY,
     CONF_NOTIFY_DOOR_LEFT_OPEN,
     CONF_NOTIFY_DOOR_OPEN,
+    CONF_NOTIFY_DIGEST,
+    CONF_ATTEMPT_LIMIT,
+    CONF_ATTEMPT_WINDOW,
+    CONF_NOTIFY_ATTEMPTS,
+    CONF_LOCKDOWN,
     CONF_OPEN_DURATION,
     CONF_SENSOR_NAME,
     CONF_SLOTS,
-    CONF_START, CODES_KWIKSET, CONF_NOTIFY_LOCK_GENERAL,
+    CONF_START, CONF_NOTIFY_LOCK_GENERAL,
+    ATTR_LOCK, ATTR_CODE_SLOT, ATTR_SLOTS, RESULT, RESULT_OK, RESULT_ERROR,
+    ATTR_SEN_SET_LOCK_CODE, ATTR_SEN_SET_USER_NAME, CONF_LOCK_GROUP, ATTR_USER_ID, ATTR_CONCURRENCY,
 )
 
 PLATFORMS = ["sensor"]
@@ -50,6 +84,31 @@ SERVICE_CLEAR_SLOT = "clear_slot"
 SERVICE_SLOT_ENABLED = "slot_enabled"
 SERVICE_UPDATE_SETTINGS = "update_settings"
 SERVICE_RESET_LOCK = "reset_lock"
+SERVICE_GET_METRICS = "get_metrics"
+SERVICE_PROFILE = "profile"
+SERVICE_UPDATE_SLOTS = "update_slots"
+SERVICE_IMPORT_SLOTS = "import_slots"
+SERVICE_EXPORT_SLOTS = "export_slots"
+SERVICE_LIST_COLLISIONS = "list_code_collisions"
+SERVICE_SET_USER = "set_user"
+SERVICE_REVOKE_USER = "revoke_user"
+SERVICE_QUERY_ACCESS_LOG = "query_access_log"
+SERVICE_LIST_TIMERS = "list_timers"
+SERVICE_GENERATE_LOVELACE = "generate_lovelace"
+SERVICE_TRACE = "trace"
+
+# Events
+EVENT_METRICS = f"{DOMAIN}_metrics"
+EVENT_UPDATE_SLOTS = f"{DOMAIN}_update_slots"
+EVENT_IMPORT_SLOTS = f"{DOMAIN}_import_slots"
+EVENT_EXPORT_SLOTS = f"{DOMAIN}_export_slots"
+EVENT_CODE_COLLISIONS = f"{DOMAIN}_code_collisions"
+EVENT_ACCESS_LOG = f"{DOMAIN}_access_log"
+EVENT_TIMERS = f"{DOMAIN}_timers"
+EVENT_ALARM = f"{DOMAIN}_alarm"
+EVENT_LOVELACE = f"{DOMAIN}_lovelace"
+EVENT_ATTEMPTS = f"{DOMAIN}_attempts"
+EVENT_CLOCK_CHANGED = f"{DOMAIN}_clock_changed"
 
 # Zwave
 ZWAVE_MANAGER = "manager"
@@ -59,6 +118,13 @@ ZWAVE_INSTANCE_ID = 1
 OZW_STATUS_LEVELS = ["driverAwakeNodesQueried", "driverAllNodesQueriedSomeDead", "driverAllNodesQueried"]
 ZWAVE_NETWORK = "zwave_network"
 
+# Slots of a lock a write_batch could not send, in the lock's result
+FAILED_SLOTS = "failed_slots"
+WRITE_FAILED = "Writing to the lock failed"
+
+# Seconds of bulk work run on the loop before letting other work run
+SLICE_SECONDS = 0.001
+
 ENTRY = "entry"
 ENTRY_TYPE = "type"
 ENTRY_ID = "entry_id"
@@ -66,22 +132,39 @@ INDEX = "index"
 STATUS = "Status"
 VALUE = "value"
 SENSORS = "sensors"
+ACCESS_LOG = "access_log"
+CORRELATOR = "correlator"
+DECODER = "decoder"
+DETECTOR = "detector"
+OPTIONS = "options"
+ADD_ENTITIES = "add_entities"
 UPDATE_LISTENER = "update_listener"
 ATTR_NODE_ID = "node_id"
 ATTR_USER_CODE = "usercode"
-ATTR_CODE_SLOT = "code_slot"
+ATTR_CYCLES = "cycles"
+ATTR_SECONDS = "seconds"
+ATTR_FILENAME = "filename"
+ATTR_FORMAT = "format"
+ATTR_CHUNK_SIZE = "chunk_size"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_LIMIT = "limit"
+ATTR_RECORDS = "records"
+ATTR_ALARM_TYPE = "alarm_type"
+ATTR_ALARM_LEVEL = "alarm_level"
 LOCK_INFO = "lock_info"
 
+# Seconds for an alarm event to follow a lock state change
+LOCK_CHANGED_TIMEOUT = 30
+
+# Options that change the lock or its entity names, anything else is applied in place
+RELOAD_OPTIONS = (CONF_ENTITY_ID, CONF_LOCK_NAME, CONF_LOCK_NAME_SAFE)
+
 # Lock
 LOCK_MANUFACTURER = "manufacturer"
 LOCK_MODEL = "model"
 
-# Code
-CODE_STATUS = "status"
-CODE_USER = "user"
-CODE_NOTIFY = "notify"
-
-DEVICES_WITH_EVENTS = [CONF_ENTITY_ID, CONF_SENSOR_NAME, CONF_ALARM_TYPE]
+DEVICES_WITH_EVENTS = [CONF_ENTITY_ID, CONF_SENSOR_NAME, CONF_ALARM_TYPE, CONF_ALARM_LEVEL]
 
 REFRESH_CODE_SCHEMA = vol.Schema({
     vol.Required(ATTR_ENTITY_ID): cv.entity_domain(LOCK_DOMAIN)
@@ -105,25 +188,97 @@ SLOT_ENABLED_SCHEMA = vol.Schema({
     vol.Required(ATTR_SENSOR_SLOT_ENABLED): bool,
 })
 
+PROFILE_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Exclusive(ATTR_CYCLES, "window"): cv.positive_int,
+        vol.Exclusive(ATTR_SECONDS, "window"): cv.positive_float,
+    }),
+    cv.has_at_least_one_key(ATTR_CYCLES, ATTR_SECONDS)
+)
+
+IMPORT_SLOTS_SCHEMA = vol.Schema({
+    vol.Required(ATTR_FILENAME): cv.string,
+    vol.Optional(ATTR_FORMAT): vol.In(FORMATS),
+    vol.Optional(ATTR_CHUNK_SIZE, default=DEFAULT_CHUNK_SIZE): vol.All(vol.Coerce(int), vol.Range(min=1)),
+})
+
+EXPORT_SLOTS_SCHEMA = vol.Schema({
+    vol.Required(ATTR_FILENAME): cv.string,
+    vol.Optional(ATTR_FORMAT): vol.In(FORMATS),
+    vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+})
+
+TRACE_SCHEMA = vol.Schema({
+    vol.Required(ATTR_SECONDS): cv.positive_float,
+    vol.Optional(ATTR_FILENAME): cv.string,
+})
+
+GENERATE_LOVELACE_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_FILENAME, default=DEFAULT_LOVELACE_FILE): cv.string,
+    vol.Optional(ATTR_FORMAT): vol.In(LOVELACE_FORMATS),
+    vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+})
+
+QUERY_ACCESS_LOG_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_domain(LOCK_DOMAIN),
+    vol.Optional(ATTR_CODE_SLOT): vol.Coerce(int),
+    vol.Optional(ATTR_START): cv.datetime,
+    vol.Optional(ATTR_END): cv.datetime,
+    vol.Optional(ATTR_LIMIT, default=100): cv.positive_int,
+})
+
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class LoopSlice:
+    """Lets other tasks run once SLICE_SECONDS of work has passed since the last pause.
+
+    CPU bound bulk work stays on the loop in short slices. In the executor it
+    would hold the GIL against the loop for whole switch intervals at a time.
+    """
+
+    __slots__ = ("_until",)
+
+    def __init__(self):
+        self._until = time.perf_counter() + SLICE_SECONDS
+
+    async def pause(self) -> None:
+        if time.perf_counter() >= self._until:
+            await asyncio.sleep(0)
+            self._until = time.perf_counter() + SLICE_SECONDS
+
+
 class LockManagerCoordinator:
     """Define an object to hold Lock Manager Data"""
 
     def __init__(self, hass: HomeAssistant):
         """Initialize"""
         self._hass = hass
+        self.metrics = CoordinatorMetrics()
+        self.profiler = CoordinatorProfiler(hass)
+        self.code_index = CodeIndex()
+        self.users = UserManager(hass, self)
+        self.counters = AccessCounters(hass)
+        self.notifications = NotificationQueue(hass, self.metrics)
+        self.timers = TimerManager(hass)
+        self.polling = PollScheduler()
+        self.lovelace = LovelaceGenerator(hass)
+        self.trace = TraceRecorder(hass, ignore=(SERVICE_TRACE, SERVICE_PROFILE))
+        self.decoders = DecoderRegistry()
         self.updater = Updater(hass, self)
+        self.clock = ClockWatch(hass, self._clock_changed)
+        self._reevaluation: Optional[asyncio.Task] = None
+        self._clock_change: Optional[tuple] = None
         self._event_listener = None
+        self._unsub_stop = None
+        self._slot_listeners: List[Callable[[CodeSensor], None]] = []
         self._services = []
         self._entries = {}
         self._event_watch_list = {}
         self._load()
         self._default_notifier = None
-        self._door_timer = None
-        self._lock_timer = None
+        self._write_batch: Optional[Dict[str, Dict[int, tuple]]] = None
 
     @property
     def automation_enabled(self) -> bool:
@@ -156,6 +311,34 @@ class LockManagerCoordinator:
     def add_sensor(self, code_sensor: CodeSensor, entry: ConfigEntry) -> None:
         self._entries[entry.entry_id][SENSORS][f"sensor.{code_sensor.name}"] = code_sensor
 
+    def slot_sensors(self, lock: str = None) -> List[CodeSensor]:
+        """Slots of one lock or of every lock, in lock then slot order"""
+        _sensors = []
+        for _entry_id, _entry in self._entries.items():
+            if lock and _entry[ENTRY].data[CONF_ENTITY_ID] != lock:
+                continue
+            _sensors.extend(sorted(_entry[SENSORS].values(), key=lambda s: s.slot))
+        return _sensors
+
+    def has_sensor(self, code_sensor: CodeSensor) -> bool:
+        """Is the sensor still one of the coordinator's slots"""
+        _entry = self._entries.get(code_sensor.entry_id)
+        return bool(_entry) and _entry[SENSORS].get(f"sensor.{code_sensor.name}") is code_sensor
+
+    def async_listen_slots(self, listener: Callable[[CodeSensor], None]) -> Callable[[], None]:
+        """Call listener with each slot whose state, settings or count changed"""
+        self._slot_listeners.append(listener)
+        return lambda: self._slot_listeners.remove(listener)
+
+    @callback
+    def slot_changed(self, code_sensor: CodeSensor) -> None:
+        for _listener in list(self._slot_listeners):
+            _listener(code_sensor)
+
+    def set_entity_adder(self, entry: ConfigEntry, async_add_entities: Callable) -> None:
+        """Keep the sensor platform's add callback to add slots without reloading the entry"""
+        self._entries[entry.entry_id][ADD_ENTITIES] = async_add_entities
+
     async def _get_device(self, entity_id):
         _entity_registry = await self._hass.helpers.entity_registry.async_get_registry()
         _entity = _entity_registry.async_get(entity_id)
@@ -164,6 +347,12 @@ class LockManagerCoordinator:
         _device = _device_registry.async_get(_device_id)
         return _device
 
+    def update_sync_metrics(self, entry_id: str) -> None:
+        """Refresh the out of sync slot count of a lock"""
+        self.metrics.lock(entry_id).out_of_sync = sum(
+            1 for s in self._entries[entry_id][SENSORS].values() if s.out_of_sync
+        )
+
     def _find_sensor(self, sensor_name: str) -> Optional[CodeSensor]:
         for k, v in self._entries.items():
             if sensor_name in v[SENSORS].keys():
@@ -176,32 +365,58 @@ class LockManagerCoordinator:
                 return v[ENTRY]
         return None
 
+    def lock_entity(self, entry_id: str) -> Optional[str]:
+        """Return the lock entity of an entry"""
+        if entry_id in self._entries:
+            return self._entries[entry_id][ENTRY].data[CONF_ENTITY_ID]
+        return None
+
+    async def _find_slot(self, target: dict) -> Optional[CodeSensor]:
+        """Find a slot by its entity_id or by lock and slot number"""
+        if ATTR_ENTITY_ID in target:
+            return self._find_sensor(target[ATTR_ENTITY_ID])
+
+        entry = await self._find_lock(target[ATTR_LOCK])
+        if entry:
+            return self._entries[entry.entry_id][SENSORS].get(
+                f"sensor.{entry.data[CONF_LOCK_NAME_SAFE]}_code_slot_{target[ATTR_CODE_SLOT]}"
+            )
+        return None
+
     async def load_entry(self, entry: ConfigEntry) -> None:
         """Add a new entry"""
         entry.options = entry.data  # Sync data/options
+        if not self.users.loaded:
+            await self.users.async_load()
+        if not self.counters.loaded:
+            await self.counters.async_load()
+        if not self.decoders.loaded:
+            await self.decoders.async_load(self._hass)
         _device = await self._get_device(entry.data[ATTR_ENTITY_ID])
         self._entries[entry.entry_id] = {
             ENTRY: entry,
+            OPTIONS: dict(entry.data),
             UPDATE_LISTENER: entry.add_update_listener(update_listener),
             SENSORS: {},
+            ACCESS_LOG: AccessLog(self._hass, self._access_log_path(entry.entry_id)),
             LOCK_INFO: {
                 LOCK_MANUFACTURER: _device.manufacturer,
                 LOCK_MODEL: _device.model,
-            }
+            },
+            DECODER: self.decoders.resolve(_device.manufacturer, _device.model),
         }
-
-        # Picking one of the entries notifiers as a fallback notifier
-        if not self._default_notifier and CONF_NOTIFY in entry.data and entry.data[CONF_NOTIFY]:
-            self._default_notifier = entry.data[CONF_NOTIFY]
-
-        # Adding events we want to watch to the watch list
-        for d in DEVICES_WITH_EVENTS:
-            if entry.data[d]:
-                self._event_watch_list[entry.data[d]] = {
-                    ATTR_ENTITY_ID: entry.data[d],
-                    ENTRY_TYPE: d,
-                    ENTRY_ID: entry.entry_id
-                }
+        if not self._entries[entry.entry_id][DECODER]:
+            _LOGGER.error(f"Could not match lock manufacturer {_device.manufacturer} {_device.model}")
+
+        self.code_index.set_group(entry.entry_id, entry.data.get(CONF_LOCK_GROUP))
+        self._set_correlator(entry)
+        self._set_detector(entry)
+        await self._entries[entry.entry_id][ACCESS_LOG].async_load()
+        self._set_notifier(entry)
+        self._watch(entry)
+        self.clock.start()
+        if self._unsub_stop is None:
+            self._unsub_stop = self._hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_stop)
 
         for component in PLATFORMS:
             self._hass.async_create_task(
@@ -220,28 +435,206 @@ class LockManagerCoordinator:
         )
 
         self._entries[entry.entry_id][UPDATE_LISTENER]()
+        await self._entries[entry.entry_id][ACCESS_LOG].async_flush()
         self._entries.pop(entry.entry_id)
+        self.metrics.remove(entry.entry_id)
+        self.code_index.remove_lock(entry.entry_id)
+        self.updater.invalidate(entry.entry_id)
+        self.polling.remove(entry.entry_id)
+        self.lovelace.remove(entry.entry_id)
+        self.timers.cancel_entry(entry.entry_id)
 
         # Remove sensors from watch list
-        for d in DEVICES_WITH_EVENTS:
-            if entry.data[d]:
-                self._event_watch_list.pop(entry.data[d])
+        self._unwatch(entry.data)
 
         if not reload:
             # If we have no more entries remove services and listeners
             if len(self._entries) == 0:
                 await self._unload_services()
                 await self._unload_event_listener()
+                await self.notifications.async_stop()
+                await self.trace.async_stop()
+                self.clock.stop()
+                self.timers.stop()
+                if self._unsub_stop:
+                    self._unsub_stop()
+                    self._unsub_stop = None
 
         return unload_ok
 
+    async def _async_stop(self, _event) -> None:
+        """Write the pending access records, entries are not unloaded when HA stops"""
+        self._unsub_stop = None
+        await asyncio.gather(*[v[ACCESS_LOG].async_flush() for v in self._entries.values()])
+
     async def update_entry(self, entry: ConfigEntry) -> None:
-        """Update an entry"""
-        await self.unload_entry(entry, True)
-        await self.load_entry(entry)
+        """Apply the options that changed, only a new lock or name loads the entry again"""
+        _start = time.perf_counter()
+        _old = self._entries[entry.entry_id][OPTIONS]
+        _changed = {k for k in {**_old, **entry.data} if _old.get(k) != entry.data.get(k)}
+        if not _changed:
+            return
+
+        if _changed.intersection(RELOAD_OPTIONS):
+            await self.unload_entry(entry, True)
+            await self.load_entry(entry)
+            return
+
+        entry.options = entry.data  # Sync data/options
+        self._entries[entry.entry_id][OPTIONS] = dict(entry.data)
+
+        if _changed.intersection(DEVICES_WITH_EVENTS):
+            self._unwatch(_old)
+            self._watch(entry)
+        if _changed.intersection((CONF_ALARM_TYPE, CONF_ALARM_LEVEL)):
+            self._set_correlator(entry)
+        if CONF_LOCK_GROUP in _changed:
+            self.code_index.set_group(entry.entry_id, entry.data.get(CONF_LOCK_GROUP))
+        if _changed.intersection((CONF_ATTEMPT_LIMIT, CONF_ATTEMPT_WINDOW)):
+            self._set_detector(entry)
+        if CONF_LOCKDOWN in _changed and not entry.data[CONF_LOCKDOWN]:
+            await self.end_lockdown(entry.entry_id)
+        if _changed.intersection((CONF_NOTIFY, CONF_NOTIFY_DIGEST)):
+            if self._default_notifier == _old.get(CONF_NOTIFY):
+                self._default_notifier = None
+            self._set_notifier(entry)
+
+        # A running reminder picks up the new duration, the notifier is read when it fires
+        if not entry.data[CONF_NOTIFY_DOOR_LEFT_OPEN]:
+            self.timers.cancel(entry.entry_id, TIMER_DOOR_OPEN)
+        elif CONF_OPEN_DURATION in _changed:
+            _duration = entry.data[CONF_OPEN_DURATION]
+            self.timers.retime(entry.entry_id, TIMER_DOOR_OPEN, _duration, _duration)
+
+        if _changed.intersection((CONF_SLOTS, CONF_START)):
+            self.updater.invalidate(entry.entry_id)
+            await self._resize_slots(entry, _old)
+
+        _LOGGER.debug(
+            f"Updated {entry.data[CONF_LOCK_NAME]} in place ({', '.join(sorted(_changed))}) "
+            f"in {(time.perf_counter() - _start) * 1000:.1f}ms"
+        )
+
+    async def _resize_slots(self, entry: ConfigEntry, old: dict) -> None:
+        """Add and remove slot sensors for a new slot range, the slots in both are left alone"""
+        _old = set(range(old[CONF_START], old[CONF_START] + old[CONF_SLOTS]))
+        _new = set(range(entry.data[CONF_START], entry.data[CONF_START] + entry.data[CONF_SLOTS]))
+        _sensors = self._entries[entry.entry_id][SENSORS]
+        _safe_name = entry.data[CONF_LOCK_NAME_SAFE]
+
+        _registry = await self._hass.helpers.entity_registry.async_get_registry()
+        for _slot in sorted(_old - _new):
+            _sensor = _sensors.pop(f"sensor.{_safe_name}_code_slot_{_slot}", None)
+            if not _sensor:
+                continue
+            # Codes stay on the lock, removing a slot only stops managing it
+            self.code_index.update(entry.entry_id, _slot, None)
+            self.metrics.lock(entry.entry_id).sync_forget(_slot)
+            self.counters.remove(_sensor.unique_id)
+            await _sensor.async_remove()
+            self.slot_changed(_sensor)
+            if _sensor.entity_id and _registry.async_is_registered(_sensor.entity_id):
+                _registry.async_remove(_sensor.entity_id)
+
+        _added = [CodeSensor(self._hass, entry, _slot) for _slot in sorted(_new - _old)]
+        if _added:
+            self._entries[entry.entry_id][ADD_ENTITIES](_added, True)
+        self.update_sync_metrics(entry.entry_id)
+        _LOGGER.info(f"{entry.data[CONF_LOCK_NAME]}: added {len(_added)} slots, removed {len(_old - _new)}")
+
+    def _set_correlator(self, entry: ConfigEntry) -> None:
+        self.timers.cancel(entry.entry_id, TIMER_ALARM_PAIR)
+        self._entries[entry.entry_id].pop(CORRELATOR, None)
+        if entry.data[CONF_ALARM_TYPE] and entry.data[CONF_ALARM_LEVEL]:
+            self._entries[entry.entry_id][CORRELATOR] = AlarmCorrelator(
+                self._hass, self.timers, entry.entry_id,
+                [entry.data[CONF_ALARM_TYPE], entry.data[CONF_ALARM_LEVEL]],
+                self._alarm_callback(entry.entry_id),
+            )
+
+    def _set_detector(self, entry: ConfigEntry) -> None:
+        _limit = entry.data.get(CONF_ATTEMPT_LIMIT, DEFAULT_ATTEMPT_LIMIT)
+        self._entries[entry.entry_id][DETECTOR] = AttemptDetector(
+            _limit, entry.data.get(CONF_ATTEMPT_WINDOW, DEFAULT_ATTEMPT_WINDOW)
+        ) if _limit else None
+
+    def _set_notifier(self, entry: ConfigEntry) -> None:
+        # Picking one of the entries notifiers as a fallback notifier
+        if not self._default_notifier:
+            self._default_notifier = next(
+                (e[ENTRY].data[CONF_NOTIFY] for e in self._entries.values() if e[ENTRY].data.get(CONF_NOTIFY)), None
+            )
+
+        if entry.data.get(CONF_NOTIFY):
+            self.notifications.set_digest(entry.data[CONF_NOTIFY], entry.data.get(CONF_NOTIFY_DIGEST, 0))
+
+    def _watch(self, entry: ConfigEntry) -> None:
+        """Adding events we want to watch to the watch list"""
+        for d in DEVICES_WITH_EVENTS:
+            if entry.data[d]:
+                self._event_watch_list[entry.data[d]] = {
+                    ATTR_ENTITY_ID: entry.data[d],
+                    ENTRY_TYPE: d,
+                    ENTRY_ID: entry.entry_id
+                }
+
+    def _unwatch(self, data: dict) -> None:
+        for d in DEVICES_WITH_EVENTS:
+            if data.get(d):
+                self._event_watch_list.pop(data[d], None)
+
+    def trace_entries(self) -> List[dict]:
+        """The entries, lock devices and configured slots a trace starts from"""
+        return [
+            {
+                ENTRY_ID: entry_id,
+                "data": dict(v[ENTRY].data),
+                "device": dict(v[LOCK_INFO]),
+                "slots": [
+                    {"slot": s.slot, "enabled": s.slot_enabled, "count": s.count, "settings": s.settings}
+                    for s in v[SENSORS].values() if s.settings
+                ],
+            }
+            for entry_id, v in self._entries.items()
+        ]
 
     async def remove_entry(self, entry: ConfigEntry) -> None:
         """Remove an entry"""
+        self.counters.remove_entry(entry.entry_id)
+        await self._hass.async_add_executor_job(remove_log, self._access_log_path(entry.entry_id))
+
+    def _access_log_path(self, entry_id: str) -> str:
+        return self._hass.config.path(ACCESS_LOG_DIR, f"{entry_id}.jsonl")
+
+    def query_access_log(self, entry_id: str, slot: int = None, start=None, end=None,
+                         limit: int = None) -> List[dict]:
+        """Access events of a lock or one of its slots between two datetimes, newest first"""
+        _records = self._entries[entry_id][ACCESS_LOG].query(
+            slot,
+            dt_util.as_utc(start).timestamp() if start else None,
+            dt_util.as_utc(end).timestamp() if end else None,
+            limit,
+        )
+        _safe_name = self._entries[entry_id][ENTRY].data[CONF_LOCK_NAME_SAFE]
+        _results = []
+        for _time, _slot, _type, _level in _records:
+            _sensor = self._find_sensor(f"sensor.{_safe_name}_code_slot_{_slot}") if _slot is not None else None
+            _results.append({
+                "time": dt_util.utc_from_timestamp(_time).isoformat(),
+                ATTR_CODE_SLOT: _slot,
+                ATTR_SEN_SET_USER_NAME: _sensor.user_name if _sensor else None,
+                ATTR_ALARM_TYPE: _type,
+                ATTR_ALARM_LEVEL: _level,
+            })
+        return _results
+
+    async def _timed_state_changed(self, _: Event, args):
+        _start = time.perf_counter()
+        if self.profiler.active:
+            await self.profiler.profile(PROFILE_EVENTS, self.state_changed(_, args))
+        else:
+            await self.state_changed(_, args)
+        self.metrics.lock(args[ENTRY_ID]).event.record(time.perf_counter() - _start)
 
     async def state_changed(self, _: Event, args):
         # Lock state changed
@@ -252,9 +645,19 @@ class LockManagerCoordinator:
         elif args[ENTRY_TYPE] == CONF_SENSOR_NAME:
             _LOGGER.debug("Door State Changed", args)
             await self._door_state_changed(_, args)
-        elif args[ENTRY_TYPE] == CONF_ALARM_TYPE:
+        elif args[ENTRY_TYPE] in (CONF_ALARM_TYPE, CONF_ALARM_LEVEL):
             _LOGGER.debug("Alarm State Changed", args)
-            await self._door_state_changed(_, args)
+            _correlator = self._entries[args[ENTRY_ID]].get(CORRELATOR)
+            if _correlator and _.data['new_state']:
+                _half = HALF_TYPE if args[ENTRY_TYPE] == CONF_ALARM_TYPE else HALF_LEVEL
+                _correlator.half_changed(_half, _.data['new_state'].state)
+
+    def _alarm_callback(self, entry_id: str) -> Callable[[int, int], None]:
+        @callback
+        def _on_alarm(alarm_type: int, alarm_level: int) -> None:
+            if entry_id in self._entries:
+                self._hass.async_create_task(self._alarm_changed(entry_id, alarm_type, alarm_level))
+        return _on_alarm
 
     async def _lock_state_changed(self, _: Event, args):
         """The lock state changed"""
@@ -263,58 +666,156 @@ class LockManagerCoordinator:
         _should_alert = _entry.data[CONF_NOTIFY_DOOR_OPEN]
 
         _LOGGER.debug(f"Lock has been {_.data['new_state'].state}")
+        self.polling.activity(args[ENTRY_ID])
 
         @callback
-        async def _lock_changed(_now) -> None:
+        def _lock_changed() -> None:
             if _notifier and _should_alert:
                 _alert = f"{_entry.data[CONF_LOCK_NAME]} : Lock state changed and change event did not fire.."
                 _LOGGER.error(_alert)
-                await self.notify(_alert, _notifier)
-            return
+                self.notify(_alert, _notifier)
 
-        self._lock_timer = async_call_later(self._hass, 30, _lock_changed)
+        self.timers.schedule(args[ENTRY_ID], TIMER_LOCK_CHANGED, LOCK_CHANGED_TIMEOUT, _lock_changed)
 
-    async def _alarm_level_changed(self,  _: Event, args):
-        _entry: ConfigEntry = self._entries[args[ENTRY_ID]][ENTRY]
+    async def _alarm_changed(self, entry_id: str, _type: int, _level: int):
+        """A correlated alarm_type/alarm_level notification of a lock"""
+        _entry: ConfigEntry = self._entries[entry_id][ENTRY]
         _notifier = _entry.data[CONF_NOTIFY]
         _name = _entry.data[CONF_LOCK_NAME]
         _safe_name = _entry.data[CONF_LOCK_NAME_SAFE]
-        _lock_info = self._entries[args[ENTRY_ID]][LOCK_INFO]
-        _lock_const = {}
-
-        if "kwikset" in _lock_info[LOCK_MANUFACTURER].lower():
-            _lock_const = CODES_KWIKSET
-        elif "schlage" in _lock_info[LOCK_MANUFACTURER].lower():
-            _lock_const = CODES_KWIKSET
-
-        if _lock_const:
-            _type = self._hass.states.get(_entry.data[CONF_ALARM_TYPE])
-            _level = self._hass.states.get(_entry.data[CONF_ALARM_LEVEL])
-
-            _status = _lock_const[CODE_STATUS][_type]
-
-            if _status in _lock_const[CODE_STATUS]:
+        _decoder = self._entries[entry_id][DECODER]
+
+        if _decoder:
+            _code = _decoder.decode(_type)
+            _status = _code.description
+            _slot = _level if _code.user else None
+            self.polling.activity(entry_id)
+            if _code.battery:
+                self.polling.battery_alarm(entry_id, _code.battery, time.monotonic())
+            self._entries[entry_id][ACCESS_LOG].record(dt_util.utcnow().timestamp(), _slot, _type, _level)
+            if _code.attempt:
+                await self._attempted(entry_id, _code.attempt)
+
+            _code_sensor = None
+            if _slot is not None:
                 # Alarm was triggered by a user
-                _user = _level
-                _code_sensor = self._find_sensor(f"sensor.{_safe_name}_code_slot_{_user}")
+                _code_sensor = self._find_sensor(f"sensor.{_safe_name}_code_slot_{_slot}")
                 if _code_sensor:
                     await _code_sensor.increment_counter()
                     if _code_sensor.should_alert and _notifier:
-                        await self.notify(f"{_status} : {_code_sensor.user_name}.", _notifier)
+                        self.notify(f"{_status} : {_code_sensor.user_name}.", _notifier)
 
                 else:
                     _LOGGER.error("Lock state changed via unknown user")
 
             else:
                 _should_alert = _entry.data[CONF_NOTIFY_LOCK_GENERAL]
-                if _should_alert and _type in _lock_const[CODE_NOTIFY] and _notifier:
-                    await self.notify(f"{_name} status changed to {_status}.", _notifier)
-
-            if self._lock_timer:
-                self._lock_timer()
-                self._lock_timer = None
+                if _should_alert and _code.notify and _notifier:
+                    self.notify(f"{_name} status changed to {_status}.", _notifier)
+
+            self.timers.cancel(entry_id, TIMER_LOCK_CHANGED)
+            self._hass.bus.async_fire(EVENT_ALARM, {
+                ATTR_ENTITY_ID: _entry.data[CONF_ENTITY_ID],
+                ATTR_ALARM_TYPE: _type,
+                ATTR_ALARM_LEVEL: _level,
+                "status": _status,
+                ATTR_CODE_SLOT: _slot,
+                ATTR_SEN_SET_USER_NAME: _code_sensor.user_name if _code_sensor else None,
+            })
         else:
-            _LOGGER.error("Could not match lock manufacturer")
+            _LOGGER.debug(f"No alarm decoder for {_entry.data[CONF_ENTITY_ID]}")
+
+    async def _attempted(self, entry_id: str, kind: str) -> None:
+        """A bad or out of schedule code was entered on the keypad"""
+        _detector = self._entries[entry_id][DETECTOR]
+        _now = self._hass.loop.time()
+        if not _detector or not _detector.attempt(kind, _now):
+            return
+
+        _entry: ConfigEntry = self._entries[entry_id][ENTRY]
+        _notifier = _entry.data[CONF_NOTIFY]
+        _attempts = _detector.count(kind, _now)
+        _lockdown = _entry.data.get(CONF_LOCKDOWN, 0)
+        _message = f"{_entry.data[CONF_LOCK_NAME]} : {_attempts} {ATTEMPT_NAMES[kind]} within {_detector.window}s."
+        if _lockdown:
+            _message += f" Codes are suspended for {_lockdown}s."
+        _LOGGER.warning(_message)
+
+        self._hass.bus.async_fire(EVENT_ATTEMPTS, {
+            ATTR_ENTITY_ID: _entry.data[CONF_ENTITY_ID],
+            "kind": kind,
+            "attempts": _attempts,
+            "window": _detector.window,
+            "lockdown": _lockdown,
+        })
+        if _notifier and _entry.data.get(CONF_NOTIFY_ATTEMPTS, True):
+            self.notify(_message, _notifier, True)
+        if _lockdown:
+            await self.start_lockdown(entry_id, _lockdown)
+
+    def locked_down(self, entry_id: str) -> bool:
+        return self.timers.active(entry_id, TIMER_LOCKDOWN)
+
+    async def start_lockdown(self, entry_id: str, seconds: float) -> None:
+        """Suspend every code of a lock for seconds, a running lockdown is extended instead"""
+        if self.timers.retime(entry_id, TIMER_LOCKDOWN, seconds):
+            return
+
+        @callback
+        def _lift() -> None:
+            _LOGGER.info(f"Lockdown of {entry_id} ended")
+            self._hass.async_create_task(self.reevaluate_slots([entry_id]))
+
+        self.timers.schedule(entry_id, TIMER_LOCKDOWN, seconds, _lift)
+        await self.reevaluate_slots([entry_id])
+
+    async def end_lockdown(self, entry_id: str) -> None:
+        if self.timers.cancel(entry_id, TIMER_LOCKDOWN):
+            await self.reevaluate_slots([entry_id])
+
+    async def reevaluate_slots(self, entry_ids: List[str] = None) -> Dict[str, dict]:
+        """Re-evaluate every slot of the locks at one instant, the resulting writes are sent as one batch.
+
+        Returns the sent/failed counts of each lock that was written to.
+        """
+        _now = dt_util.now()
+        _slice = LoopSlice()
+        async with self.write_batch() as results:
+            for _sensor in [
+                s for k, v in self._entries.items() if entry_ids is None or k in entry_ids
+                for s in v[SENSORS].values()
+            ]:
+                await _sensor.refresh_status(_now)
+                await _slice.pause()
+        return results
+
+    @callback
+    def _clock_changed(self, reason: str, moved: float) -> None:
+        """Local time moved, changes landing during a re-evaluation get one more pass after it"""
+        self._clock_change = (reason, moved)
+        if self._reevaluation is None or self._reevaluation.done():
+            self._reevaluation = self._hass.async_create_task(self._reconcile())
+
+    async def _reconcile(self) -> None:
+        while self._clock_change:
+            (_reason, _moved), self._clock_change = self._clock_change, None
+            _start = time.perf_counter()
+            _results = await self.reevaluate_slots()
+            # Read every lock back on the next cycle to repair what the old time left behind
+            for _entry_id in self._entries:
+                self.polling.activity(_entry_id)
+            _LOGGER.info(
+                f"Re-evaluated every slot after a {_reason} of {_moved:.0f}s "
+                f"in {(time.perf_counter() - _start) * 1000:.1f}ms"
+            )
+            self._hass.bus.async_fire(EVENT_CLOCK_CHANGED, {
+                "reason": _reason,
+                "moved": round(_moved, 3),
+                "writes": {
+                    self._entries[k][ENTRY].data[CONF_ENTITY_ID]: v
+                    for k, v in _results.items() if k in self._entries
+                },
+            })
 
     async def _door_state_changed(self, _: Event, args):
         """The lock door changed"""
@@ -324,33 +825,62 @@ class LockManagerCoordinator:
         _name = _entry.data[CONF_LOCK_NAME]
 
         @callback
-        async def _door_remains_open(_now) -> None:
-            await self.notify(f"{_name} has been left open.", _notifier)
-            self._door_timer = async_call_later(self._hass, _entry.data[CONF_OPEN_DURATION], _door_remains_open)
-            return
+        def _door_remains_open() -> None:
+            # Options may have changed since the door opened
+            self.notify(f"{_name} has been left open.", _entry.data[CONF_NOTIFY])
 
         if _.data['new_state'].state == 'on' and _should_alert and _notifier:
-            await self.notify(f"{_name} has been opened.", _notifier)
+            self.notify(f"{_name} has been opened.", _notifier)
 
         if _entry.data[CONF_NOTIFY_DOOR_LEFT_OPEN] and _.data['new_state'].state == 'on':
-            self._door_timer = async_call_later(self._hass, _entry.data[CONF_OPEN_DURATION], _door_remains_open)
+            # Keeps reminding every open duration until the door closes
+            if not self.timers.active(args[ENTRY_ID], TIMER_DOOR_OPEN):
+                _duration = _entry.data[CONF_OPEN_DURATION]
+                self.timers.schedule(args[ENTRY_ID], TIMER_DOOR_OPEN, _duration, _door_remains_open, _duration)
         else:
-            if self._door_timer:
-                self._door_timer()
-                self._door_timer = None
+            self.timers.cancel(args[ENTRY_ID], TIMER_DOOR_OPEN)
 
-    def generate_lovelace(self):
-        return
+    async def generate_lovelace(self, path: str, fmt: str = None, locks: List[str] = None) -> dict:
+        """Write a dashboard with a view per lock, views of unchanged locks come from the cache"""
+        _entries = [
+            (k, v[ENTRY].data) for k, v in self._entries.items()
+            if not locks or v[ENTRY].data[CONF_ENTITY_ID] in locks
+        ]
+        return await self.lovelace.async_write(path, _entries, fmt)
 
     async def reset_lock(self, entity: str):
         _LOGGER.debug("Resetting Lock")
         entry = await self._find_lock(entity)
         if entry:
             sensors = self._entries[entry.entry_id][SENSORS]
-            for s in sensors.values():
-                await s.reset_slot()
+            async with self.write_batch():
+                for s in sensors.values():
+                    await s.reset_slot()
         return
 
+    async def reset_slots(self, targets: List[dict], limit: int = None,
+                          progress: Callable[[str, dict], None] = None) -> List[dict]:
+        """Clear many slots, addressed by entity_id or lock and slot, with one batch of writes"""
+        results = []
+        cleared = []
+        async with self.write_batch(limit, progress) as _written:
+            for i, target in enumerate(targets):
+                _sensor = await self._find_slot(target)
+                if not _sensor:
+                    results.append({"index": i, ATTR_ENTITY_ID: None, RESULT: RESULT_ERROR,
+                                    RESULT_ERROR: "Code slot not found"})
+                    continue
+                _result = {"index": i, ATTR_ENTITY_ID: f"sensor.{_sensor.name}", RESULT: RESULT_OK}
+                results.append(_result)
+                cleared.append((_sensor, _result))
+                await _sensor.reset_slot()
+
+        # The clears are sent as the batch exits
+        for _sensor, _result in cleared:
+            if self.write_failed(_written, _sensor):
+                _result.update({RESULT: RESULT_ERROR, RESULT_ERROR: WRITE_FAILED})
+        return results
+
     async def zwave_refresh_codes(self, entity: str):
         if not self.automation_enabled:
             # Bail if network is not ready
@@ -378,10 +908,11 @@ class LockManagerCoordinator:
 
         _LOGGER.debug("Zwave Refresh Codes call completed.")
 
-    async def zwave_update_code(self, service_data: dict, clear: bool = False):
+    async def zwave_update_code(self, service_data: dict, clear: bool = False) -> bool:
+        """Send a code to the lock, returns whether the service call succeeded"""
         if not self.automation_enabled:
             # Bail if network is not ready
-            return
+            return False
 
         _LOGGER.debug(f"Zwave Code update call started.")
 
@@ -391,7 +922,7 @@ class LockManagerCoordinator:
             domain = ZWAVE_DOMAIN
         else:
             _LOGGER.info("Cannot find the zwave domain")
-            return
+            return False
 
         if clear:
             action = ZWAVE_CLEAR_USERCODE
@@ -400,27 +931,184 @@ class LockManagerCoordinator:
             action = ZWAVE_SET_USERCODE
 
         try:
-            await self._hass.services.async_call(domain, action, service_data)
+            await self._hass.services.async_call(domain, action, service_data, blocking=True)
         except Exception as err:
             _LOGGER.error(
                 f"Error calling {domain}.{action} service call: {str(err)}"
             )
-            pass
+            return False
 
         _LOGGER.debug(f"Zwave Code {domain}.{action} call completed.")
+        return True
+
+    @asynccontextmanager
+    async def write_batch(self, limit: int = None, progress: Callable[[str, dict], None] = None):
+        """Hold back slot writes made inside the block and send them per lock when it exits.
+
+        Repeated writes to a slot are coalesced into the last one, each lock gets its
+        writes one after another while up to limit locks are written in parallel.
+        The yielded dict is filled with the sent/failed counts and the failed slots
+        of each lock on exit, progress is called as each lock finishes. A nested
+        block yields a dict that stays empty, the outer one writes.
+        """
+        results = {}
+        if self._write_batch is not None:
+            # Nested, the outer batch flushes
+            yield results
+            return
+
+        self._write_batch = {}
+        try:
+            yield results
+        finally:
+            _batch, self._write_batch = self._write_batch, None
+            results.update(await self._flush_writes(_batch, limit, progress))
+
+    async def _flush_writes(self, batch: Dict[str, Dict[int, tuple]], limit: int = None,
+                            progress: Callable[[str, dict], None] = None) -> Dict[str, dict]:
+        _semaphore = asyncio.Semaphore(limit) if limit else None
+        # Writes answered without a network round trip would otherwise run back to back,
+        # the locks share one slice so a tick of the loop runs one slice however many are written to
+        _slice = LoopSlice()
+
+        async def _flush_lock(entry_id: str, writes: Dict[int, tuple]):
+            _metrics = self.metrics.lock(entry_id)
+            _result = {"sent": 0, "failed": 0, FAILED_SLOTS: []}
+            for entity, clear in writes.values():
+                _metrics.write_queue -= 1
+                if await self._write_code(entity, clear):
+                    _result["sent"] += 1
+                else:
+                    _result["failed"] += 1
+                    _result[FAILED_SLOTS].append(entity.slot)
+                await _slice.pause()
+            if progress:
+                progress(entry_id, _result)
+            return entry_id, _result
+
+        async def _limited(entry_id: str, writes: Dict[int, tuple]):
+            async with _semaphore:
+                return await _flush_lock(entry_id, writes)
+
+        _flush = _limited if _semaphore else _flush_lock
+        return dict(await asyncio.gather(*[_flush(k, v) for k, v in batch.items()]))
+
+    @staticmethod
+    def write_failed(results: Dict[str, dict], sensor: CodeSensor) -> bool:
+        """Did the write_batch that filled results fail to send the sensor's slot"""
+        return sensor.slot in results.get(sensor.entry_id, {}).get(FAILED_SLOTS, ())
+
+    def slot_owner(self, entry_id: str, slot: int) -> Optional[str]:
+        """Id of the multi-lock user a slot is assigned to"""
+        return self.users.owner(self.lock_entity(entry_id), slot)
+
+    def check_code(self, sensor: CodeSensor, code: int) -> None:
+        """Raise if the code collides with another slot, before anything is sent to the lock"""
+        _conflict = self.code_index.conflict(
+            sensor.entry_id, sensor.slot, code, self.slot_owner(sensor.entry_id, sensor.slot)
+        )
+        if _conflict:
+            raise HomeAssistantError(f"Can not set code on sensor.{sensor.name}: {_conflict}")
+
+    async def update_slots(self, items: List[dict]) -> List[dict]:
+        """Validate many slot configurations up front, then apply them with one batch of writes.
+
+        Validation and schedule compilation run on the loop by design, in slices
+        of SLICE_SECONDS, an executor thread would hold the GIL against the loop.
+        """
+        _slice = LoopSlice()
+        validated = []
+        for i, item in enumerate(items):
+            validated.append(validate_slot_entry(i, item))
+            await _slice.pause()
+        return await self.apply_slots(validated)
+
+    async def apply_slots(self, items: List[tuple], limit: int = None,
+                          progress: Callable[[str, dict], None] = None) -> List[dict]:
+        """Apply (index, validated item, error) tuples in one pass and one batch of writes.
+
+        The work runs on the loop in slices of SLICE_SECONDS so a large batch
+        does not hold it. An item whose write fails is an error and the code it
+        reserved goes back to what the slot held before.
+        """
+        _slice = LoopSlice()
+        results = []
+        targets = []
+        for index, item, error in items:
+            await _slice.pause()
+            _result = {"index": index, ATTR_ENTITY_ID: None, RESULT: RESULT_OK}
+            results.append(_result)
+            _sensor = await self._find_slot(item) if item else None
+            if item and not _sensor:
+                error = "Code slot not found"
+            if _sensor:
+                _settings = item[ATTR_SENSOR_SETTINGS]
+                _code = _settings[ATTR_SEN_SET_LOCK_CODE]
+                _owner = self.slot_owner(_sensor.entry_id, _sensor.slot)
+                _previous = self.code_index.code(_sensor.entry_id, _sensor.slot)
+                error = self.code_index.conflict(_sensor.entry_id, _sensor.slot, _code, _owner)
+                if not error:
+                    # Reserve the code so later items in the batch see it
+                    self.code_index.update(_sensor.entry_id, _sensor.slot, _code, _owner)
+            if error:
+                _result.update({RESULT: RESULT_ERROR, RESULT_ERROR: error})
+                continue
+            _result[ATTR_ENTITY_ID] = f"sensor.{_sensor.name}"
+            targets.append((_sensor, item, _result, _previous, _owner))
+
+        async with self.write_batch(limit, progress) as _written:
+            for _sensor, item, _, _, _ in targets:
+                await _sensor.update_settings(
+                    item[ATTR_SENSOR_SETTINGS], validated=True, enabled=item.get(ATTR_SENSOR_SLOT_ENABLED),
+                    schedule=compile_schedule(item[ATTR_SENSOR_SETTINGS]),
+                )
+                await _slice.pause()
+
+        for _sensor, _, _result, _previous, _owner in targets:
+            await _slice.pause()
+            if self.write_failed(_written, _sensor):
+                _result.update({RESULT: RESULT_ERROR, RESULT_ERROR: WRITE_FAILED})
+                self.code_index.update(_sensor.entry_id, _sensor.slot, _previous, _owner)
+
+        return results
 
     async def entity_update_code(self, entity: CodeSensor, clear: bool = False):
+        self.metrics.lock(entity.entry_id).sync_desired(
+            entity.slot, None if clear else entity.code, time.monotonic()
+        )
+        if self._write_batch is not None:
+            _writes = self._write_batch.setdefault(entity.entry_id, {})
+            if entity.slot not in _writes:
+                self.metrics.lock(entity.entry_id).write_queue += 1
+            _writes[entity.slot] = (entity, clear)
+            return
+        await self._write_code(entity, clear)
+
+    async def _write_code(self, entity: CodeSensor, clear: bool = False) -> bool:
         _LOGGER.debug(f"Entity Code update call started.")
         service_data = {
             ATTR_ENTITY_ID: entity.parent,
             ATTR_CODE_SLOT: entity.slot,
             ATTR_USER_CODE: entity.code
         }
-        await self.zwave_update_code(service_data, clear)
+        _metrics = self.metrics.lock(entity.entry_id)
+        _metrics.write_queue += 1
+        _start = time.perf_counter()
+        try:
+            _sent = await self.zwave_update_code(service_data, clear)
+            if _sent:
+                _metrics.sync_sent(entity.slot, time.monotonic())
+            # Read the slot back soon to confirm the write
+            self.polling.activity(entity.entry_id)
+        finally:
+            _metrics.write_queue -= 1
+            (_metrics.zwave_clear if clear else _metrics.zwave_set).record(time.perf_counter() - _start)
         _LOGGER.debug(f"Entity Code update call finished.")
+        return _sent
 
-    async def notify(self, message: str, service: str = None, important: bool = False):
-        """Used for notifications"""
+    @callback
+    def notify(self, message: str, service: str = None, important: bool = False):
+        """Used for notifications, messages are delivered in the background"""
         if self.automation_enabled:
             _LOGGER.info(message)
 
@@ -428,19 +1116,22 @@ class LockManagerCoordinator:
                 service = self._default_notifier
 
             if service:
-                await self._hass.services.async_call(NOTIFY_DOMAIN, service, {"message": message})
+                self.notifications.enqueue(service, message)
 
             if important:
-                await self._hass.services.async_call(NOTIFY_DOMAIN, "persistent_notification", {"message": message})
+                self.notifications.enqueue(PERSISTENT_NOTIFICATION, message)
 
     def _load(self):
 
         # region Event Listener
-        async def event_listener(_: Event) -> None:
-            if self.automation_enabled:
-                if _.data[ATTR_ENTITY_ID] in self._event_watch_list.keys():
-                    _entry = self._event_watch_list[_.data[ATTR_ENTITY_ID]]
-                    await self.state_changed(_, _entry)
+        @callback
+        def event_listener(_: Event) -> None:
+            # Runs inline for every state change in the instance, filter before doing any work
+            _entry = self._event_watch_list.get(_.data[ATTR_ENTITY_ID])
+            if _entry and self.trace.active:
+                self.trace.record_state(_)
+            if _entry and self.automation_enabled:
+                self._hass.async_create_task(self._timed_state_changed(_, _entry))
 
         self._event_listener = self._hass.bus.async_listen(EVENT_STATE_CHANGED, event_listener)
         # endregion
@@ -476,6 +1167,7 @@ class LockManagerCoordinator:
             _entity: CodeSensor = self._find_sensor(_sensor_name)
 
             if _entity:
+                self.check_code(_entity, _code)
                 await _entity.update_code(_code)
 
         self._services.append(SERVICE_UPDATE_SLOT)
@@ -525,12 +1217,205 @@ class LockManagerCoordinator:
             _entity: CodeSensor = self._find_sensor(_sensor_name)
 
             if _entity:
+                self.check_code(_entity, _settings[ATTR_SEN_SET_LOCK_CODE])
                 await _entity.update_settings(_settings)
 
         self._services.append(SERVICE_UPDATE_SETTINGS)
         self._hass.services.async_register(DOMAIN, SERVICE_UPDATE_SETTINGS, _slot_settings, SLOT_SETTINGS_SCHEMA)
         # endregion
 
+        # region Update many slots
+        async def _update_slots(service):
+            """Update the settings of many slots in one call"""
+            _LOGGER.debug("Updating code slots in bulk")
+            _results = await self.update_slots(service.data[ATTR_SLOTS])
+            _failed = [r for r in _results if r[RESULT] == RESULT_ERROR]
+            if _failed:
+                _LOGGER.warning(f"{len(_failed)} of {len(_results)} code slots were not updated: {_failed}")
+            self._hass.bus.async_fire(EVENT_UPDATE_SLOTS, {ATTR_SLOTS: _results})
+
+        self._services.append(SERVICE_UPDATE_SLOTS)
+        self._hass.services.async_register(DOMAIN, SERVICE_UPDATE_SLOTS, _update_slots, UPDATE_SLOTS_SCHEMA)
+        # endregion
+
+        # region Import/Export slots
+        async def _import_slots(service):
+            """Import slot settings from a file in the config directory"""
+            _path = config_file(self._hass, service.data[ATTR_FILENAME])
+            if not _path:
+                return
+            _LOGGER.debug(f"Importing code slots from {_path}")
+            _summary = await async_import_slots(
+                self._hass, self, _path, service.data.get(ATTR_FORMAT), service.data[ATTR_CHUNK_SIZE]
+            )
+            if _summary["errors"]:
+                _LOGGER.warning(f"{_summary['errors']} rows of {_path} were not imported, see {_summary['report']}")
+            self._hass.bus.async_fire(EVENT_IMPORT_SLOTS, _summary)
+
+        async def _export_slots(service):
+            """Export slot settings to a file in the config directory"""
+            _path = config_file(self._hass, service.data[ATTR_FILENAME])
+            if not _path:
+                return
+            _locks = service.data.get(ATTR_ENTITY_ID)
+            # Entries may be added or unloaded while the export awaits the executor
+            _sensors = [
+                s for v in self._entries.values()
+                if not _locks or v[ENTRY].data[CONF_ENTITY_ID] in _locks
+                for s in v[SENSORS].values()
+            ]
+            _summary = await async_export_slots(self._hass, _sensors, _path, service.data.get(ATTR_FORMAT))
+            self._hass.bus.async_fire(EVENT_EXPORT_SLOTS, _summary)
+
+        self._services.append(SERVICE_IMPORT_SLOTS)
+        self._hass.services.async_register(DOMAIN, SERVICE_IMPORT_SLOTS, _import_slots, IMPORT_SLOTS_SCHEMA)
+        self._services.append(SERVICE_EXPORT_SLOTS)
+        self._hass.services.async_register(DOMAIN, SERVICE_EXPORT_SLOTS, _export_slots, EXPORT_SLOTS_SCHEMA)
+        # endregion
+
+        # region Generate Lovelace
+        async def _generate_lovelace(service):
+            """Write a Lovelace dashboard for the locks to the config directory"""
+            _path = config_file(self._hass, service.data[ATTR_FILENAME])
+            if not _path:
+                return
+            _summary = await self.generate_lovelace(
+                _path, service.data.get(ATTR_FORMAT), service.data.get(ATTR_ENTITY_ID)
+            )
+            _LOGGER.debug(f"Lovelace written to {_path}: {_summary}")
+            self._hass.bus.async_fire(EVENT_LOVELACE, _summary)
+
+        self._services.append(SERVICE_GENERATE_LOVELACE)
+        self._hass.services.async_register(
+            DOMAIN, SERVICE_GENERATE_LOVELACE, _generate_lovelace, GENERATE_LOVELACE_SCHEMA
+        )
+        # endregion
+
+        # region List code collisions
+        async def _list_collisions(service):
+            """Report codes shared by slots of a lock or by users of a lock group"""
+            _collisions = self.code_index.collisions()
+            for c in _collisions:
+                if "entry_id" in c:
+                    c[ATTR_ENTITY_ID] = self._entries[c.pop("entry_id")][ENTRY].data[CONF_ENTITY_ID]
+                else:
+                    c["slots"] = [
+                        f"sensor.{self._entries[e][ENTRY].data[CONF_LOCK_NAME_SAFE]}_code_slot_{s}"
+                        for e, s in c["slots"]
+                    ]
+            if _collisions:
+                _LOGGER.warning(f"Code collisions found: {_collisions}")
+            self._hass.bus.async_fire(EVENT_CODE_COLLISIONS, {"collisions": _collisions})
+
+        self._services.append(SERVICE_LIST_COLLISIONS)
+        self._hass.services.async_register(DOMAIN, SERVICE_LIST_COLLISIONS, _list_collisions)
+        # endregion
+
+        # region Users
+        async def _set_user(service):
+            """Create or update a user on every lock it is assigned to"""
+            _LOGGER.debug("Setting user")
+            await self.users.async_set_user(dict(service.data))
+
+        async def _revoke_user(service):
+            """Clear a user from every lock it is assigned to"""
+            _LOGGER.debug("Revoking user")
+            await self.users.async_revoke_user(service.data[ATTR_USER_ID], service.data[ATTR_CONCURRENCY])
+
+        self._services.append(SERVICE_SET_USER)
+        self._hass.services.async_register(DOMAIN, SERVICE_SET_USER, _set_user, SET_USER_SCHEMA)
+        self._services.append(SERVICE_REVOKE_USER)
+        self._hass.services.async_register(DOMAIN, SERVICE_REVOKE_USER, _revoke_user, REVOKE_USER_SCHEMA)
+        # endregion
+
+        # region Access log
+        async def _query_access_log(service):
+            """Publish the access events of a lock"""
+            _entry = await self._find_lock(service.data[ATTR_ENTITY_ID])
+            if not _entry:
+                _LOGGER.error(f"Unable to find lock {service.data[ATTR_ENTITY_ID]}")
+                return
+            _records = self.query_access_log(
+                _entry.entry_id,
+                service.data.get(ATTR_CODE_SLOT),
+                service.data.get(ATTR_START),
+                service.data.get(ATTR_END),
+                service.data[ATTR_LIMIT],
+            )
+            self._hass.bus.async_fire(EVENT_ACCESS_LOG, {
+                ATTR_ENTITY_ID: service.data[ATTR_ENTITY_ID],
+                ATTR_RECORDS: _records,
+            })
+
+        self._services.append(SERVICE_QUERY_ACCESS_LOG)
+        self._hass.services.async_register(
+            DOMAIN, SERVICE_QUERY_ACCESS_LOG, _query_access_log, QUERY_ACCESS_LOG_SCHEMA
+        )
+        # endregion
+
+        # region List timers
+        async def _list_timers(service):
+            """Publish the pending door and lock timers"""
+            _timers = self.timers.as_list()
+            for t in _timers:
+                _entry_id = t.pop("entry_id")
+                t[ATTR_ENTITY_ID] = self.lock_entity(_entry_id)
+            self._hass.bus.async_fire(EVENT_TIMERS, {"timers": _timers})
+
+        self._services.append(SERVICE_LIST_TIMERS)
+        self._hass.services.async_register(DOMAIN, SERVICE_LIST_TIMERS, _list_timers)
+        # endregion
+
+        # region Metrics
+        async def _get_metrics(service):
+            """Publish the raw performance metrics"""
+            for _id in self._entries:
+                self.update_sync_metrics(_id)
+            _metrics = self.metrics.as_dict()
+            _metrics["notification_queue"] = self.notifications.as_dict()
+            _metrics["polling"] = {
+                self._entries[k][ENTRY].data[CONF_ENTITY_ID]: v
+                for k, v in self.polling.as_dict(time.monotonic()).items() if k in self._entries
+            }
+            _metrics["alarm_correlation"] = {
+                v[ENTRY].data[CONF_ENTITY_ID]: v[CORRELATOR].as_dict()
+                for v in self._entries.values() if CORRELATOR in v
+            }
+            _metrics["keypad_attempts"] = {
+                v[ENTRY].data[CONF_ENTITY_ID]: v[DETECTOR].as_dict()
+                for v in self._entries.values() if v[DETECTOR]
+            }
+            _LOGGER.info(f"Lock Manager metrics: {_metrics}")
+            self._hass.bus.async_fire(EVENT_METRICS, _metrics)
+
+        self._services.append(SERVICE_GET_METRICS)
+        self._hass.services.async_register(DOMAIN, SERVICE_GET_METRICS, _get_metrics)
+        # endregion
+
+        # region Profile
+        async def _profile(service):
+            """Profile the next updater cycles or seconds of event handling"""
+            self.profiler.start(service.data.get(ATTR_CYCLES), service.data.get(ATTR_SECONDS))
+
+        self._services.append(SERVICE_PROFILE)
+        self._hass.services.async_register(DOMAIN, SERVICE_PROFILE, _profile, PROFILE_SCHEMA)
+        # endregion
+
+        # region Trace
+        async def _trace(service):
+            """Record the watched state changes and service calls of the next seconds"""
+            _path = config_file(
+                self._hass,
+                service.data.get(ATTR_FILENAME) or f"{DOMAIN}_trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl",
+            )
+            if not _path:
+                return
+            self.trace.start(_path, service.data[ATTR_SECONDS], self.trace_entries())
+
+        self._services.append(SERVICE_TRACE)
+        self._hass.services.async_register(DOMAIN, SERVICE_TRACE, _trace, TRACE_SCHEMA)
+        # endregion
+
     async def _unload_services(self):
         for s in self._services:
             self._hass.services.remove(s)
@@ -539,6 +1424,13 @@ class LockManagerCoordinator:
         self._event_listener.remove()
 
 
+class SlotValues(NamedTuple):
+    """Z-Wave value handles of the configured slots of a lock"""
+    node_id: int
+    source: Any
+    values: List[tuple]
+
+
 class Updater:
     """The class for handling the data retrieval."""
 
@@ -549,6 +1441,7 @@ class Updater:
         self._enabled = False
         self.update = Throttle(timedelta(seconds=30))(self.update)
         self._coordinator = coordinator
+        self._handles: Dict[str, SlotValues] = {}
 
     @property
     def enabled(self):
@@ -562,6 +1455,50 @@ class Updater:
         """Disable Data Updater"""
         self._enabled = False
 
+    def invalidate(self, entry_id: str = None) -> None:
+        """Forget the value handles of a lock, or of every lock"""
+        if entry_id:
+            self._handles.pop(entry_id, None)
+        else:
+            self._handles.clear()
+
+    def _slot_values(self, entry_id: str, domain: str, node_id: int, source) -> List[tuple]:
+        """The (index, value, sensor name) of each configured slot of a lock.
+
+        Walking every USER_CODE value of the node is only done when the node
+        changed, a re-interview replaces the node's values and the object they
+        hang off. Polls in between read the cached values directly.
+        """
+        _handles = self._handles.get(entry_id)
+        if _handles and _handles.node_id == node_id and _handles.source is source and all(
+                value.index == index for index, value, _ in _handles.values
+        ):
+            return _handles.values
+
+        _entry: ConfigEntry = self._coordinator.entries[entry_id][ENTRY]
+        lower_index = _entry.data[CONF_START]
+        upper_index = _entry.data[CONF_SLOTS] + lower_index - 1
+        if domain == OZW_DOMAIN:
+            lock_values = source.values()
+        else:
+            lock_values = source.get_values(class_id=CommandClass.USER_CODE).values()
+
+        _values = []
+        for value in lock_values:
+            # Skip unwanted values from ozw
+            if domain == OZW_DOMAIN and value.command_class != CommandClass.USER_CODE:
+                continue
+
+            # Skip unused indexes
+            if not (lower_index <= value.index <= upper_index):
+                continue
+
+            _values.append((value.index, value, f"sensor.{_entry.data[CONF_LOCK_NAME_SAFE]}_code_slot_{value.index}"))
+
+        _LOGGER.debug(f"Cached {len(_values)} code slot values of node {node_id}")
+        self._handles[entry_id] = SlotValues(node_id, source, _values)
+        return _values
+
     async def _get_latest_zwave_data(self):
         """Connect and retrieve zwave information"""
 
@@ -571,60 +1508,42 @@ class Updater:
 
         _LOGGER.debug("Starting to fetch codes from zwave")
         entries = self._coordinator.entries
+        polling = self._coordinator.polling
+        _now = time.monotonic()
 
         for entry in entries:
             domain = None
             _entry: ConfigEntry = entries[entry][ENTRY]
             _sensors = entries[entry][SENSORS]
+            _start = time.perf_counter()
             try:
                 state = self._hass.states.get(_entry.data[ATTR_ENTITY_ID])
+                polling.battery_level(entry, state.attributes.get(ATTR_BATTERY_LEVEL))
+                if not polling.due(entry, _now):
+                    continue
                 node_id = state.attributes[ATTR_NODE_ID]
-                lock_values = None
-                lower_index = _entry.data[CONF_START]
-                upper_index = _entry.data[CONF_SLOTS] + lower_index - 1
+                source = None
 
                 if OZW_DOMAIN in self._hass.data:
 
                     domain = OZW_DOMAIN
                     manager = self._hass.data[OZW_DOMAIN][ZWAVE_MANAGER]
-                    lock_values = (
+                    source = (
                         manager
                         .get_instance(ZWAVE_INSTANCE_ID)
                         .get_node(node_id)
                         .get_command_class(CommandClass.USER_CODE)
-                        .values()
                     )
                 elif ZWAVE_NETWORK in self._hass.data:
                     domain = ZWAVE_NETWORK
-                    network = self._hass.data[ZWAVE_NETWORK]
-                    lock_values = (
-                        network
-                        .nodes[node_id]
-                        .get_values(class_id=CommandClass.USER_CODE)
-                        .values()
-                    )
+                    source = self._hass.data[ZWAVE_NETWORK].nodes[node_id]
                 else:
                     _LOGGER.info(f"No available zwave managers")
 
-                if lock_values:
-                    for value in lock_values:
-                        # Skip unwanted values from ozw
-                        if domain == OZW_DOMAIN and value.command_class != CommandClass.USER_CODE:
-                            continue
-
-                        # Skip unused indexes
-                        if not (lower_index <= value.index <= upper_index):
-                            continue
-
-                        # TODO check zwave platform
+                if source is not None:
+                    for index, value, sensor_name in self._slot_values(entry, domain, node_id, source):
                         # Normalize data structure
-                        data = {INDEX: value.index, VALUE: ""}
-                        if domain == OZW_DOMAIN:
-                            data[VALUE] = value.value
-                        else:
-                            data[VALUE] = value.data
-
-                        sensor_name = f"sensor.{_entry.data[CONF_LOCK_NAME_SAFE]}_code_slot_{data[INDEX]}"
+                        data = {INDEX: index, VALUE: value.value if domain == OZW_DOMAIN else value.data}
 
                         _LOGGER.debug(f"{sensor_name} value: {str(data[VALUE])}")
 
@@ -632,11 +1551,17 @@ class Updater:
                             entity: CodeSensor = _sensors[sensor_name]
                             await entity.zwave_code_check(data[VALUE].replace("\x00", ""))
 
+                polling.polled(entry, _now)
+                self._coordinator.metrics.lock(entry).poll.record(time.perf_counter() - _start)
+                self._coordinator.update_sync_metrics(entry)
+                # The zwave values are only safe to read on the loop, let it run between locks
+                await asyncio.sleep(0)
+
             except Exception:
                 _LOGGER.error(f"Error getting codes from {domain} manager", exc_info=True)
                 self._errors += 1
                 if self._errors > 10:
-                    await self._coordinator.notify(
+                    self._coordinator.notify(
                         "Data updater has been disabled due to too many errors.  Check Home Assistant logs.",
                         important=True
                     )
@@ -644,11 +1569,15 @@ class Updater:
         _LOGGER.debug("Finishing to fetch codes from zwave")
 
     async def update(self):
-        await self._get_latest_zwave_data()
+        if self._coordinator.profiler.active:
+            await self._coordinator.profiler.profile(PROFILE_CYCLES, self._get_latest_zwave_data())
+        else:
+            await self._get_latest_zwave_data()
 
 
 async def async_setup(hass: HomeAssistant, config: dict):
     """ Disallow configuration via YAML """
+    async_register_websocket(hass)
     return True
 
 
@@ -0,0 +1,153 @@
+"""Bounded per-lock access log"""
+import asyncio
+import json
+import logging
+import os
+
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN
+
+# Records kept in memory per lock
+ACCESS_LOG_SIZE = 1000
+# Pending records written to the file together
+FLUSH_BATCH = 50
+# Seconds a record may wait before it is written
+FLUSH_DELAY = 30
+# The file is rotated to <file>.1 past this size
+MAX_FILE_SIZE = 1024 * 1024
+
+ACCESS_LOG_DIR = f"{DOMAIN}_access"
+
+# (timestamp, slot, alarm type, alarm level), slot is None when no user was involved
+AccessRecord = Tuple[float, Optional[int], int, int]
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _bisect(records: Deque[AccessRecord], timestamp: float, right: bool = False) -> int:
+    """Position of timestamp in time ordered records"""
+    lo, hi = 0, len(records)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if records[mid][0] < timestamp or (right and records[mid][0] == timestamp):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _read_tail(path: str, size: int) -> List[AccessRecord]:
+    """Last records of the file and its rotation, runs in the executor"""
+    lines = deque(maxlen=size)
+    # The rotation holds the older records, right after a rotation the file alone is short of size
+    for _path in (f"{path}.1", path):
+        if os.path.exists(_path):
+            with open(_path) as f:
+                lines.extend(f)
+    records = []
+    for line in lines:
+        try:
+            records.append(tuple(json.loads(line)))
+        except ValueError:
+            _LOGGER.warning(f"Skipping corrupt access log line in {path}")
+    return records
+
+
+def _append(path: str, records: List[AccessRecord]) -> None:
+    """Append records to the file, runs in the executor"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path) and os.path.getsize(path) > MAX_FILE_SIZE:
+        os.replace(path, f"{path}.1")
+    with open(path, "a") as f:
+        f.writelines(json.dumps(r) + "\n" for r in records)
+
+
+def remove_log(path: str) -> None:
+    """Delete the file and its rotation, runs in the executor"""
+    for _path in (path, f"{path}.1"):
+        if os.path.exists(_path):
+            os.remove(_path)
+
+
+class AccessLog:
+    """Ring buffer of the access events of one lock with a per-slot index.
+
+    Records are appended in time order, so the ring and every slot queue stay sorted
+    and a time range is two bisections. A record leaving the ring is always the
+    oldest of its slot, so the slot index is trimmed from the left in O(1). New
+    records are appended to a file in batches and the ring is refilled from it on load.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str, size: int = ACCESS_LOG_SIZE):
+        self._hass = hass
+        self.path = path
+        self._records: Deque[AccessRecord] = deque(maxlen=size)
+        self._slots: Dict[int, Deque[AccessRecord]] = {}
+        self._pending: List[AccessRecord] = []
+        self._timer = None
+        # Flushes append in order and one at a time around a rotation
+        self._write_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _index(self, record: AccessRecord) -> None:
+        if len(self._records) == self._records.maxlen:
+            _slot = self._records[0][1]
+            if _slot is not None:
+                _records = self._slots[_slot]
+                _records.popleft()
+                if not _records:
+                    del self._slots[_slot]
+        self._records.append(record)
+        if record[1] is not None:
+            self._slots.setdefault(record[1], deque()).append(record)
+
+    async def async_load(self) -> None:
+        for record in await self._hass.async_add_executor_job(_read_tail, self.path, self._records.maxlen):
+            self._index(record)
+
+    @callback
+    def record(self, timestamp: float, slot: Optional[int], alarm_type: int, alarm_level: int) -> None:
+        """Add an access event"""
+        # Keep the ring sorted if the clock steps back
+        if self._records and timestamp < self._records[-1][0]:
+            timestamp = self._records[-1][0]
+        _record = (timestamp, slot, alarm_type, alarm_level)
+        self._index(_record)
+        self._pending.append(_record)
+        if len(self._pending) >= FLUSH_BATCH:
+            self._hass.async_create_task(self.async_flush())
+        elif self._timer is None:
+            self._timer = async_call_later(self._hass, FLUSH_DELAY, self._async_flush_later)
+
+    @callback
+    def _async_flush_later(self, _now) -> None:
+        self._timer = None
+        self._hass.async_create_task(self.async_flush())
+
+    async def async_flush(self) -> None:
+        """Write the pending records to the file"""
+        if self._timer:
+            self._timer()
+            self._timer = None
+        async with self._write_lock:
+            if not self._pending:
+                return
+            _pending, self._pending = self._pending, []
+            await self._hass.async_add_executor_job(_append, self.path, _pending)
+
+    def query(self, slot: int = None, start: float = None, end: float = None,
+              limit: int = None) -> List[AccessRecord]:
+        """Records of a slot, or of the whole lock, between start and end, newest first"""
+        records = self._records if slot is None else self._slots.get(slot, deque())
+        lo = _bisect(records, start) if start is not None else 0
+        hi = _bisect(records, end, True) if end is not None else len(records)
+        if limit:
+            lo = max(lo, hi - limit)
+        return [records[i] for i in range(hi - 1, lo - 1, -1)]
@@ -0,0 +1,1046 @@
+"""Benchmarks for the Lock Manager hot paths.
+
+Drives ``LockManagerCoordinator``, ``Updater`` and ``CodeSensor`` through a
+lightweight fake hass backed by the simulated lock network, and writes the
+results as JSON so runs can be compared. The exit status is 1 when a metric
+regressed against the baseline or is over its budget in ``LIMITS``, which is
+how CI checks wall clock figures such as the loop lag of a bulk update.
+
+    python -m custom_components.lock_manager.benchmark --output bench.json
+    python -m custom_components.lock_manager.benchmark --baseline old.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from homeassistant.const import (
+    ATTR_DOMAIN,
+    ATTR_SERVICE,
+    ATTR_SERVICE_DATA,
+    EVENT_CALL_SERVICE,
+    EVENT_STATE_CHANGED,
+)
+from homeassistant.core import CoreState, Event, ServiceCall, State
+import homeassistant.util.dt as dt_util
+
+from . import LockManagerCoordinator, SENSORS, EVENT_ALARM, EVENT_ATTEMPTS, EVENT_CLOCK_CHANGED
+from . import sensor as sensor_platform
+from .const import (
+    DOMAIN,
+    ATTR_DAYS,
+    ATTR_DAYS_OF_WEEK,
+    ATTR_ENABLED,
+    ATTR_END_TIME,
+    ATTR_ENTITY_ID,
+    ATTR_INCLUSIVE,
+    ATTR_LIMIT,
+    ATTR_SEN_SET_BY_ACCESS_COUNT,
+    ATTR_SEN_SET_BY_DOW,
+    ATTR_SENSOR_SETTINGS,
+    ATTR_SEN_SET_LOCK_CODE,
+    ATTR_SEN_SET_USER_NAME,
+    ATTR_START_TIME,
+    CONF_ALARM_LEVEL,
+    CONF_ALARM_TYPE,
+    CONF_ATTEMPT_LIMIT,
+    CONF_ATTEMPT_WINDOW,
+    CONF_ENTITY_ID,
+    CONF_LOCKDOWN,
+    CONF_LOCK_NAME,
+    CONF_LOCK_NAME_SAFE,
+    CONF_NOTIFY,
+    CONF_NOTIFY_DOOR_LEFT_OPEN,
+    CONF_NOTIFY_DOOR_OPEN,
+    CONF_NOTIFY_LOCK_GENERAL,
+    CONF_OPEN_DURATION,
+    CONF_SENSOR_NAME,
+    CONF_SLOTS,
+    CONF_START,
+)
+from .correlator import CORRELATION_WINDOW
+from .detector import ATTEMPT_BAD_CODE, AttemptDetector
+from .polling import ACTIVE_INTERVAL as POLL_ACTIVE_INTERVAL, PollScheduler
+from .simulator import LatencyModel, SimulatedNetwork
+
+_LOGGER = logging.getLogger(__name__)
+
+# Metrics where a larger value is a regression, everything else is higher-is-better
+LOWER_IS_BETTER = ("_us", "_ms", "_bytes")
+# Correctness counts, any other value fails whatever the baseline
+MUST_BE_ZERO = ("mismatched",)
+# Longest stall of the loop accepted while update_slots configures the whole fleet
+LOOP_LAG_LIMIT_US = 8000
+# Absolute budgets checked on every run, whatever the baseline
+LIMITS = {"loop_lag.lag_max_us": LOOP_LAG_LIMIT_US}
+# Generation 2 threshold that keeps full collections out of a measurement
+FULL_COLLECTION_DEFERRED = 1 << 30
+
+
+class FakeStates:
+    """Minimal state machine"""
+
+    def __init__(self, hass: "FakeHass"):
+        self._hass = hass
+        self._states: Dict[str, State] = {}
+
+    def get(self, entity_id: str) -> Optional[State]:
+        return self._states.get(entity_id)
+
+    def async_entity_ids(self, domain: str = None) -> List[str]:
+        if domain is None:
+            return list(self._states)
+        return [e for e in self._states if e.startswith(f"{domain}.")]
+
+    def async_all(self) -> List[State]:
+        return list(self._states.values())
+
+    def async_set(self, entity_id, new_state, attributes=None, force_update=False, context=None) -> None:
+        old_state = self._states.get(entity_id)
+        new_state = str(new_state)
+        attributes = dict(attributes or {})
+        if (
+                old_state is not None and not force_update
+                and old_state.state == new_state and old_state.attributes == attributes
+        ):
+            return
+        state = State(entity_id, new_state, attributes)
+        self._states[entity_id] = state
+        self._hass.bus.async_fire(
+            EVENT_STATE_CHANGED,
+            {ATTR_ENTITY_ID: entity_id, "old_state": old_state, "new_state": state},
+        )
+
+
+class FakeBus:
+    """Minimal event bus, coroutine listeners run as tasks like on the real bus"""
+
+    def __init__(self, hass: "FakeHass"):
+        self._hass = hass
+        self._listeners: Dict[str, List[Callable]] = {}
+
+    def async_listen(self, event_type: str, listener: Callable) -> Callable:
+        self._listeners.setdefault(event_type, []).append(listener)
+
+        def _remove():
+            self._listeners[event_type].remove(listener)
+
+        return _remove
+
+    def async_listen_once(self, event_type: str, listener: Callable) -> Callable:
+        def _once(event):
+            _remove()
+            return listener(event)
+
+        _remove = self.async_listen(event_type, _once)
+        return _remove
+
+    def async_fire(self, event_type: str, event_data: dict = None) -> None:
+        listeners = self._listeners.get(event_type, []) + self._listeners.get("*", [])
+        if not listeners:
+            return
+        event = Event(event_type, event_data or {})
+        for listener in listeners:
+            result = listener(event)
+            if asyncio.iscoroutine(result):
+                self._hass.async_create_task(result)
+
+
+class FakeServices:
+    """Minimal service registry"""
+
+    def __init__(self, hass: "FakeHass"):
+        self._hass = hass
+        self._services: Dict[str, Dict[str, tuple]] = {}
+        self.calls = 0
+
+    def async_services(self) -> Dict[str, Dict[str, tuple]]:
+        return self._services
+
+    def has_service(self, domain: str, service: str) -> bool:
+        return service in self._services.get(domain, {})
+
+    def async_register(self, domain, service, service_func, schema=None) -> None:
+        self._services.setdefault(domain, {})[service] = (service_func, schema)
+
+    def async_remove(self, domain, service) -> None:
+        self._services.get(domain, {}).pop(service, None)
+
+    async def async_call(self, domain, service, service_data=None, blocking=False, context=None):
+        self.calls += 1
+        self._hass.bus.async_fire(EVENT_CALL_SERVICE, {
+            ATTR_DOMAIN: domain, ATTR_SERVICE: service, ATTR_SERVICE_DATA: service_data,
+        })
+        handler = self._services.get(domain, {}).get(service)
+        if handler is None:
+            return None
+        service_func, schema = handler
+        data = schema(dict(service_data or {})) if schema else dict(service_data or {})
+        call = ServiceCall(domain, service, data)
+        if blocking:
+            await service_func(call)
+        else:
+            self._hass.async_create_task(service_func(call))
+        return None
+
+
+class FakeRegistry:
+    """Entity and device registry in one, keyed by lock entity_id"""
+
+    def __init__(self):
+        self._entities = {}
+        self._devices = {}
+
+    async def async_get_registry(self):
+        return self
+
+    def add(self, entity_id: str, manufacturer: str, model: str) -> None:
+        device_id = f"device_{entity_id}"
+        self._entities[entity_id] = SimpleNamespace(entity_id=entity_id, device_id=device_id)
+        self._devices[device_id] = SimpleNamespace(id=device_id, manufacturer=manufacturer, model=model)
+
+    def async_get(self, key):
+        return self._entities.get(key) or self._devices.get(key)
+
+    def async_is_registered(self, entity_id: str) -> bool:
+        return entity_id in self._entities
+
+    def async_remove(self, entity_id: str) -> None:
+        self._entities.pop(entity_id, None)
+
+
+class FakeConfigEntries:
+    """Forwards entry setup to the sensor platform"""
+
+    def __init__(self, hass: "FakeHass"):
+        self._hass = hass
+        self.entities = []
+
+    async def async_forward_entry_setup(self, entry, component) -> bool:
+        def _add_entities(entities, update_before_add=False):
+            for entity in entities:
+                entity.hass = self._hass
+                entity.entity_id = f"sensor.{entity.name}"
+                self.entities.append(entity)
+                self._hass.states.async_set(entity.entity_id, entity.state, entity.device_state_attributes)
+
+        await sensor_platform.async_setup_entry(self._hass, entry, _add_entities)
+        return True
+
+    async def async_forward_entry_unload(self, entry, component) -> bool:
+        return True
+
+
+class FakeConfigEntry:
+    """The parts of a ConfigEntry the coordinator uses"""
+
+    def __init__(self, entry_id: str, data: dict):
+        self.entry_id = entry_id
+        self.title = data[CONF_LOCK_NAME]
+        self.data = data
+        self.options = dict(data)
+        self._listeners = []
+
+    def add_update_listener(self, listener):
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+
+class FakeHass:
+    """Just enough of HomeAssistant to run the coordinator"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None, config_dir: str = None):
+        self.loop = loop or asyncio.get_event_loop()
+        self.state = CoreState.running
+        self.data = {}
+        self.states = FakeStates(self)
+        self.bus = FakeBus(self)
+        self.services = FakeServices(self)
+        self.config_entries = FakeConfigEntries(self)
+        self.registry = FakeRegistry()
+        self.helpers = SimpleNamespace(entity_registry=self.registry, device_registry=self.registry)
+        self.config = SimpleNamespace(
+            config_dir=config_dir or os.getcwd(),
+            path=lambda *p: os.path.join(config_dir or os.getcwd(), *p),
+            time_zone="UTC",
+        )
+        self._tasks = set()
+
+    def async_create_task(self, target):
+        task = self.loop.create_task(target)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def async_add_job(self, target, *args):
+        if asyncio.iscoroutine(target):
+            return self.async_create_task(target)
+        result = target(*args)
+        if asyncio.iscoroutine(result):
+            return self.async_create_task(result)
+        return None
+
+    def async_add_executor_job(self, target, *args):
+        return self.loop.run_in_executor(None, target, *args)
+
+    async def async_block_till_done(self) -> None:
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+def entry_data(name: str, slots: int) -> dict:
+    """Config entry data for a simulated lock"""
+    return {
+        CONF_ENTITY_ID: f"lock.{name}",
+        CONF_SLOTS: slots,
+        CONF_START: 1,
+        CONF_LOCK_NAME: name,
+        CONF_LOCK_NAME_SAFE: name,
+        CONF_SENSOR_NAME: f"binary_sensor.{name}_door",
+        CONF_ALARM_LEVEL: f"sensor.{name}_alarm_level",
+        CONF_ALARM_TYPE: f"sensor.{name}_alarm_type",
+        CONF_NOTIFY: None,
+        CONF_NOTIFY_DOOR_OPEN: False,
+        CONF_NOTIFY_DOOR_LEFT_OPEN: False,
+        CONF_NOTIFY_LOCK_GENERAL: False,
+        CONF_OPEN_DURATION: 300,
+    }
+
+
+def slot_settings(slot: int) -> dict:
+    return {ATTR_SEN_SET_LOCK_CODE: 100000 + slot, ATTR_SEN_SET_USER_NAME: f"User {slot}"}
+
+
+class Bench:
+    """A fake hass with a simulated network and a loaded coordinator"""
+
+    def __init__(self, locks: int, slots: int, lock_slots: int = None, **lock_kwargs):
+        self.hass = FakeHass()
+        self.network = SimulatedNetwork(self.hass)
+        self.coordinator: Optional[LockManagerCoordinator] = None
+        self.entries = []
+        for i in range(locks):
+            name = f"bench_{i}"
+            node = self.network.add_lock(f"lock.{name}", slots=lock_slots or slots, **lock_kwargs)
+            self.hass.registry.add(node.entity_id, node.manufacturer, node.model)
+            self.entries.append(FakeConfigEntry(f"entry_{i}", entry_data(name, slots)))
+
+    async def async_setup(self) -> None:
+        self.network.install()
+        self.coordinator = LockManagerCoordinator(self.hass)
+        self.hass.data[DOMAIN] = self.coordinator
+        for entry in self.entries:
+            await self.coordinator.load_entry(entry)
+        await self.hass.async_block_till_done()
+        self.coordinator.updater.enable()
+
+    def sensors(self, entry=None):
+        entries = [entry] if entry else self.entries
+        return [
+            s for e in entries for s in self.coordinator.entries[e.entry_id][SENSORS].values()
+        ]
+
+    async def async_configure_slots(self) -> None:
+        for sensor in self.sensors():
+            await sensor.update_settings(slot_settings(sensor.slot))
+        await self.hass.async_block_till_done()
+
+    async def async_teardown(self) -> None:
+        await self.hass.async_block_till_done()
+        self.network.uninstall()
+
+
+def _summary(samples: List[float]) -> dict:
+    """Percentiles of a list of durations in seconds, reported in microseconds"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def _pct(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1e6
+
+    return {
+        "count": len(ordered),
+        "mean_us": sum(ordered) / len(ordered) * 1e6,
+        "p50_us": _pct(0.50),
+        "p95_us": _pct(0.95),
+        "p99_us": _pct(0.99),
+        "max_us": ordered[-1] * 1e6,
+    }
+
+
+async def bench_event_dispatch(events: int = 20000, locks: int = 5) -> dict:
+    """Cost of a state change on an entity the coordinator does not watch"""
+    bench = Bench(locks, 10)
+    await bench.async_setup()
+
+    start = time.perf_counter()
+    for i in range(events):
+        bench.hass.states.async_set("sensor.unrelated", i)
+        await bench.hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+
+    await bench.async_teardown()
+    return {"events": events, "per_event_us": elapsed / events * 1e6}
+
+
+async def bench_alarm_handling(events: int = 2000, slots: int = 30) -> dict:
+    """Latency from an alarm pair landing in the state machine to the handler finishing"""
+    bench = Bench(1, slots)
+    await bench.async_setup()
+    await bench.async_configure_slots()
+    lock = bench.entries[0].data[CONF_ENTITY_ID]
+
+    samples = []
+    for i in range(events):
+        start = time.perf_counter()
+        bench.network.emit(lock, "keypad_unlock", (i % slots) + 1)
+        await bench.hass.async_block_till_done()
+        samples.append(time.perf_counter() - start)
+
+    await bench.async_teardown()
+    return {"events": events, **_summary(samples)}
+
+
+async def bench_alarm_replay(rounds: int = 500, locks: int = 6, slots: int = 30, duplicates: float = 0.2,
+                             seed: int = 0) -> dict:
+    """Decoding of interleaved, out of order and duplicated alarm halves from several locks at full rate.
+
+    Locks report type first, level first or in a random order per notification.
+    The fixed order locks also repeat the closing half of some notifications late.
+    Every notification should be decoded once and attributed to the right pair.
+    """
+    bench = Bench(locks, slots)
+    await bench.async_setup()
+    rng = random.Random(seed)
+    entities = [e.data[CONF_ENTITY_ID] for e in bench.entries]
+    operations = ["keypad_unlock", "keypad_lock", "manual_lock", "manual_unlock"]
+
+    decoded = {e: [] for e in entities}
+    bench.hass.bus.async_listen(EVENT_ALARM, lambda event: decoded[event.data[ATTR_ENTITY_ID]].append(
+        (event.data["alarm_type"], event.data["alarm_level"])
+    ))
+
+    expected = {e: [] for e in entities}
+    halves = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        # One notification per lock, locks interleaved at random
+        streams = []
+        for i, entity in enumerate(entities):
+            pair = bench.network.alarm_halves(entity, rng.choice(operations), rng.randint(1, slots))
+            # Identical back to back notifications are treated as repeats of one report
+            while expected[entity] and expected[entity][-1] == (pair[0][1], pair[1][1]):
+                pair = bench.network.alarm_halves(entity, rng.choice(operations), rng.randint(1, slots))
+            expected[entity].append((pair[0][1], pair[1][1]))
+            if i % 3 == 1 or (i % 3 == 2 and rng.random() < 0.5):
+                pair.reverse()
+            if i % 3 != 2 and rng.random() < duplicates:
+                pair.append(pair[-1])
+            streams.append(pair)
+        while streams:
+            stream = rng.choice(streams)
+            bench.hass.states.async_set(*stream.pop(0), force_update=True)
+            halves += 1
+            if not stream:
+                streams.remove(stream)
+        await bench.hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+
+    # Let any lone half complete
+    await asyncio.sleep(CORRELATION_WINDOW * 2)
+    await bench.hass.async_block_till_done()
+
+    mismatched = 0
+    for entity in entities:
+        mismatched += sum(1 for a, b in zip(expected[entity], decoded[entity]) if a != b)
+        mismatched += abs(len(expected[entity]) - len(decoded[entity]))
+    await bench.async_teardown()
+    return {
+        "notifications": rounds * locks,
+        "halves": halves,
+        "decoded": sum(len(d) for d in decoded.values()),
+        "mismatched": mismatched,
+        "halves_per_s": halves / elapsed,
+    }
+
+
+async def bench_attempt_burst(events: int = 5000, slots: int = 30, lockdown: int = 300) -> dict:
+    """A brute force burst of bad codes on one lock.
+
+    Reports the rate attempts are handled at, the alerts raised and how much the
+    traced memory moved over the second half of the burst, which should not
+    grow with the number of attempts. The first alert locks the keypad down,
+    the rest of the burst only extends the lockdown.
+    """
+    bench = Bench(1, slots)
+    bench.entries[0].data.update({CONF_ATTEMPT_LIMIT: 5, CONF_ATTEMPT_WINDOW: 60, CONF_LOCKDOWN: lockdown})
+    await bench.async_setup()
+    await bench.async_configure_slots()
+    for sensor in bench.sensors():
+        await sensor.enable()
+    await bench.hass.async_block_till_done()
+    lock = bench.entries[0].data[CONF_ENTITY_ID]
+    entry_id = bench.entries[0].entry_id
+    stats = bench.network.stats
+    alerts = []
+    bench.hass.bus.async_listen(EVENT_ATTEMPTS, alerts.append)
+
+    writes = stats["writes"]
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(events):
+        if i == events // 2:
+            await bench.hass.async_block_till_done()
+            gc.collect()
+            half_bytes = tracemalloc.get_traced_memory()[0]
+        bench.network.emit(lock, "bad_code")
+        if i % 100 == 99:
+            await bench.hass.async_block_till_done()
+    await bench.hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    end_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    suspended = sum(1 for s in bench.sensors() if not s.granted)
+    lockdown_writes = stats["writes"] - writes
+    await bench.coordinator.end_lockdown(entry_id)
+    await bench.hass.async_block_till_done()
+    restored = sum(1 for s in bench.sensors() if s.granted)
+    await bench.async_teardown()
+
+    detector = AttemptDetector()
+    count = 100000
+    detector_start = time.perf_counter()
+    for i in range(count):
+        detector.attempt(ATTEMPT_BAD_CODE, i * 0.001)
+
+    return {
+        "attempts": events,
+        "attempts_per_s": events / elapsed,
+        "alerts": len(alerts),
+        "suspended_slots": suspended,
+        "lockdown_writes": lockdown_writes,
+        "restored_slots": restored,
+        "second_half_growth_bytes": end_bytes - half_bytes,
+        "detector_attempt_ns": (time.perf_counter() - detector_start) / count * 1e9,
+    }
+
+
+async def bench_unlock_burst(events: int = 1000, slots: int = 30) -> dict:
+    """Cost per unlock of a burst of keypad unlocks on slots with an access limit"""
+    bench = Bench(1, slots)
+    await bench.async_setup()
+    for sensor in bench.sensors():
+        await sensor.update_settings({
+            **slot_settings(sensor.slot),
+            ATTR_SEN_SET_BY_ACCESS_COUNT: {ATTR_ENABLED: True, ATTR_LIMIT: events},
+        }, enabled=True)
+    await bench.hass.async_block_till_done()
+    lock = bench.entries[0].data[CONF_ENTITY_ID]
+
+    evaluations = 0
+    for sensor in bench.sensors():
+        def _counted(check=sensor._check_current_status):
+            nonlocal evaluations
+            evaluations += 1
+            return check()
+        sensor._check_current_status = _counted
+    writes = bench.network.stats["writes"]
+    states = 0
+
+    def _count_states(event):
+        nonlocal states
+        if "_code_slot_" in event.data[ATTR_ENTITY_ID]:
+            states += 1
+    bench.hass.bus.async_listen(EVENT_STATE_CHANGED, _count_states)
+
+    # The first slot reaches its limit during the burst
+    first = bench.sensors()[0]
+    first._set_count(events - events // 2)
+
+    start = time.perf_counter()
+    for i in range(events):
+        bench.network.emit(lock, "keypad_unlock", first.slot if i % 2 else (i % slots) + 1)
+        await bench.hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+
+    await bench.async_teardown()
+    return {
+        "events": events,
+        "per_unlock_us": elapsed / events * 1e6,
+        "evaluations": evaluations,
+        "sensor_state_writes": states,
+        "lock_writes": bench.network.stats["writes"] - writes,
+    }
+
+
+async def bench_reconfigure(slots: int = 250, extra: int = 10) -> dict:
+    """Options changes on a large lock applied in place against a full unload and load"""
+    bench = Bench(1, slots)
+    await bench.async_setup()
+    await bench.async_configure_slots()
+    entry = bench.entries[0]
+    coordinator = bench.coordinator
+    writes = bench.network.stats["writes"]
+
+    async def _update(**changes) -> float:
+        entry.data = {**entry.data, **changes}
+        start = time.perf_counter()
+        await coordinator.update_entry(entry)
+        await bench.hass.async_block_till_done()
+        return time.perf_counter() - start
+
+    results = {
+        "slots": slots,
+        "options_ms": await _update(**{CONF_OPEN_DURATION: 120, CONF_NOTIFY_DOOR_LEFT_OPEN: True}) * 1000,
+        "add_slots_ms": await _update(**{CONF_SLOTS: slots + extra}) * 1000,
+        "remove_slots_ms": await _update(**{CONF_SLOTS: slots}) * 1000,
+    }
+    results["sensors"] = len(bench.sensors())
+    results["lock_writes"] = bench.network.stats["writes"] - writes
+
+    start = time.perf_counter()
+    await coordinator.unload_entry(entry, True)
+    await coordinator.load_entry(entry)
+    await bench.hass.async_block_till_done()
+    results["reload_ms"] = (time.perf_counter() - start) * 1000
+
+    await bench.async_teardown()
+    return results
+
+
+async def bench_poll_cycle(locks: int, slots: int, cycles: int = 20) -> dict:
+    """Time and memory of a full Updater cycle"""
+    tracemalloc.start()
+    bench = Bench(locks, slots)
+    await bench.async_setup()
+    await bench.async_configure_slots()
+    setup_bytes = tracemalloc.get_traced_memory()[0]
+
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    await bench.coordinator.updater._get_latest_zwave_data()
+    await bench.hass.async_block_till_done()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    samples = []
+    for _ in range(cycles):
+        start = time.perf_counter()
+        await bench.coordinator.updater._get_latest_zwave_data()
+        await bench.hass.async_block_till_done()
+        samples.append(time.perf_counter() - start)
+
+    await bench.async_teardown()
+    summary = _summary(samples)
+    return {
+        "locks": locks,
+        "slots": slots,
+        "cycle_ms": summary["mean_us"] / 1000,
+        "cycle_p95_ms": summary["p95_us"] / 1000,
+        "setup_bytes": setup_bytes,
+        "cycle_peak_bytes": peak_bytes,
+    }
+
+
+async def bench_poll_subset(lock_slots: int = 250, slots: int = 20, cycles: int = 50) -> dict:
+    """Updater cycles on a large lock of which only a few slots are managed"""
+    bench = Bench(1, slots, lock_slots=lock_slots)
+    await bench.async_setup()
+    await bench.async_configure_slots()
+    updater = bench.coordinator.updater
+    stats = bench.network.stats
+
+    # The first cycle builds the value handles
+    await updater._get_latest_zwave_data()
+    walked = stats["values_walked"]
+    start = time.perf_counter()
+    for _ in range(cycles):
+        await updater._get_latest_zwave_data()
+    elapsed = time.perf_counter() - start
+    cached_walked = stats["values_walked"] - walked
+
+    # A re-interview replaces the values, the next cycle walks the node again
+    bench.network.lock(bench.entries[0].data[CONF_ENTITY_ID]).reinterview()
+    walked = stats["values_walked"]
+    await updater._get_latest_zwave_data()
+    reinterview_walked = stats["values_walked"] - walked
+
+    start = time.perf_counter()
+    for _ in range(cycles):
+        updater.invalidate()
+        await updater._get_latest_zwave_data()
+    uncached = time.perf_counter() - start
+
+    await bench.async_teardown()
+    return {
+        "lock_slots": lock_slots,
+        "slots": slots,
+        "cycle_us": elapsed / cycles * 1e6,
+        "uncached_cycle_us": uncached / cycles * 1e6,
+        "values_walked_cached": cached_walked,
+        "values_walked_after_reinterview": reinterview_walked,
+    }
+
+
+async def bench_adaptive_polling(hours: int = 24, busy_every: int = 600) -> dict:
+    """Polls over a simulated day against the fixed interval, for a busy, an idle and a low battery lock"""
+    scheduler = PollScheduler()
+    locks = ("busy", "idle", "low_battery")
+    scheduler.battery_level("low_battery", 15)
+    cycles = hours * 3600 // POLL_ACTIVE_INTERVAL
+    for cycle in range(cycles):
+        now = float(cycle * POLL_ACTIVE_INTERVAL)
+        if now % busy_every == 0:
+            scheduler.activity("busy")
+        for lock in locks:
+            if scheduler.due(lock, now):
+                scheduler.polled(lock, now)
+
+    counters = scheduler.as_dict(cycles * POLL_ACTIVE_INTERVAL)
+    polls = sum(c["polls"] for c in counters.values())
+    fixed = sum(c["fixed_interval_polls"] for c in counters.values())
+    return {
+        **{f"{lock}_polls": counters[lock]["polls"] for lock in locks},
+        "fixed_interval_polls": fixed,
+        "poll_ratio": polls / fixed,
+    }
+
+
+async def bench_convergence(slots: int = 30, cycles: int = 40, interval: float = 0.05) -> dict:
+    """Time for newly enabled codes to be read back, on a good lock and on one at the edge of the mesh.
+
+    The weak lock is slow to acknowledge and to apply writes and loses a share
+    of its frames, so some slots only converge after a dirty read and a rewrite.
+    """
+    locks = {
+        "good": {},
+        "weak": {
+            "write_latency": LatencyModel(0.02, 0.01),
+            "read_latency": LatencyModel(0.1, 0.05),
+            "drop_rate": 0.25,
+        },
+    }
+    results = {}
+    for name, kwargs in locks.items():
+        bench = Bench(1, slots, **kwargs)
+        await bench.async_setup()
+        await bench.async_configure_slots()
+        entry_id = bench.entries[0].entry_id
+        for sensor in bench.sensors():
+            await sensor.enable()
+        await bench.hass.async_block_till_done()
+
+        metrics = bench.coordinator.metrics.lock(entry_id)
+        for _ in range(cycles):
+            if not metrics.converging:
+                break
+            await asyncio.sleep(interval)
+            bench.coordinator.polling.activity(entry_id)
+            await bench.coordinator.updater._get_latest_zwave_data()
+            await bench.hass.async_block_till_done()
+
+        convergence = metrics.convergence.as_dict()
+        results[name] = {
+            "converged": convergence["count"],
+            "converging": metrics.converging,
+            "write_retries": metrics.retries,
+            "convergence_p50_ms": convergence["p50"],
+            "convergence_p95_ms": convergence["p95"],
+            "read_back_p95_ms": metrics.read_back.as_dict()["p95"],
+        }
+        await bench.async_teardown()
+    return results
+
+
+async def bench_services(calls: int = 2000, slots: int = 30) -> dict:
+    """Throughput of the slot services"""
+    bench = Bench(1, slots)
+    await bench.async_setup()
+    await bench.async_configure_slots()
+    name = bench.entries[0].data[CONF_LOCK_NAME_SAFE]
+    lock = bench.entries[0].data[CONF_ENTITY_ID]
+    services = bench.hass.services
+    results = {}
+
+    async def _run(service, payload: Callable[[int], dict], count: int):
+        start = time.perf_counter()
+        for i in range(count):
+            await services.async_call(DOMAIN, service, payload(i), blocking=True)
+        await bench.hass.async_block_till_done()
+        elapsed = time.perf_counter() - start
+        results[service] = {"calls": count, "calls_per_s": count / elapsed, "per_call_us": elapsed / count * 1e6}
+
+    await _run("update_slot", lambda i: {
+        ATTR_ENTITY_ID: f"sensor.{name}_code_slot_{(i % slots) + 1}",
+        "usercode": 200000 + i,
+    }, calls)
+    await _run("update_settings", lambda i: {
+        ATTR_ENTITY_ID: f"sensor.{name}_code_slot_{(i % slots) + 1}",
+        ATTR_SENSOR_SETTINGS: slot_settings(i),
+    }, calls)
+    await _run("reset_lock", lambda i: {ATTR_ENTITY_ID: lock}, max(1, calls // slots))
+
+    await bench.async_teardown()
+    return results
+
+
+class LoopLagProbe:
+    """How late a timer scheduled every interval ran, the gap still open at stop counts too"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float = 0.001):
+        self._loop = loop
+        self._interval = interval
+        self._handle = None
+        self._last = 0.0
+        self.samples: List[float] = []
+
+    def _tick(self) -> None:
+        now = self._loop.time()
+        self.samples.append(max(0.0, now - self._last - self._interval))
+        self._last = now
+        self._handle = self._loop.call_later(self._interval, self._tick)
+
+    def start(self) -> None:
+        self._last = self._loop.time()
+        self._handle = self._loop.call_later(self._interval, self._tick)
+
+    def stop(self) -> dict:
+        self._handle.cancel()
+        self.samples.append(max(0.0, self._loop.time() - self._last - self._interval))
+        return _summary(self.samples)
+
+
+async def bench_loop_lag(locks: int = 40, slots: int = 250) -> dict:
+    """Event loop lag while update_slots configures every slot of the fleet in one call"""
+    bench = Bench(locks, slots)
+    await bench.async_setup()
+    items = [
+        {ATTR_ENTITY_ID: f"sensor.{sensor.name}", ATTR_SENSOR_SETTINGS: {
+            **slot_settings(sensor.slot + i * slots),
+            ATTR_SEN_SET_BY_DOW: {ATTR_ENABLED: True, ATTR_DAYS: {day: {
+                ATTR_START_TIME: "06:00:00", ATTR_END_TIME: "22:00:00", ATTR_INCLUSIVE: True,
+            } for day in ATTR_DAYS_OF_WEEK}},
+        }}
+        for i, entry in enumerate(bench.entries) for sensor in bench.sensors(entry)
+    ]
+
+    # Young collections stay on, they are what the call's own garbage costs. A full collection
+    # walks every object of the process, its pause is the size of the heap around the call
+    gc.collect()
+    thresholds = gc.get_threshold()
+    gc.set_threshold(thresholds[0], thresholds[1], FULL_COLLECTION_DEFERRED)
+    try:
+        probe = LoopLagProbe(bench.hass.loop)
+        probe.start()
+        start = time.perf_counter()
+        await bench.hass.services.async_call(DOMAIN, "update_slots", {"slots": items}, blocking=True)
+        await bench.hass.async_block_till_done()
+        elapsed = time.perf_counter() - start
+        lag = probe.stop()
+    finally:
+        gc.set_threshold(*thresholds)
+    await bench.async_teardown()
+    return {
+        "slots": len(items),
+        "update_slots_ms": elapsed * 1000,
+        "lag_p99_us": lag.get("p99_us", 0),
+        "lag_max_us": lag.get("max_us", 0),
+    }
+
+
+async def bench_time_zone_change(locks: int = 10, slots: int = 30) -> dict:
+    """Reconciliation of the fleet when HA's time zone moves every slot out of its hours.
+
+    Every slot is open for the two hours around the current UTC time. Moving
+    the time zone twelve hours closes all of them, which the clock watch should
+    turn into one re-evaluation and one batch of writes.
+    """
+    time_zone = dt_util.DEFAULT_TIME_ZONE
+    dt_util.set_default_time_zone(timezone.utc)
+    bench = Bench(locks, slots)
+    await bench.async_setup()
+    now = datetime.now(timezone.utc)
+    start_time = max(now - timedelta(hours=1), now.replace(hour=0, minute=0, second=0))
+    end_time = min(now + timedelta(hours=1), now.replace(hour=23, minute=59, second=59))
+    hours = {day: {
+        ATTR_START_TIME: start_time.strftime("%H:%M:%S"),
+        ATTR_END_TIME: end_time.strftime("%H:%M:%S"),
+        ATTR_INCLUSIVE: True,
+    } for day in ATTR_DAYS_OF_WEEK}
+    for sensor in bench.sensors():
+        await sensor.update_settings({
+            **slot_settings(sensor.slot),
+            ATTR_SEN_SET_BY_DOW: {ATTR_ENABLED: True, ATTR_DAYS: hours},
+        }, enabled=True)
+    await bench.hass.async_block_till_done()
+    granted = sum(1 for s in bench.sensors() if s.granted)
+
+    changes = []
+    bench.hass.bus.async_listen(EVENT_CLOCK_CHANGED, changes.append)
+    writes = bench.network.stats["writes"]
+    probe = LoopLagProbe(bench.hass.loop)
+    probe.start()
+    start = time.perf_counter()
+    dt_util.set_default_time_zone(timezone(timedelta(hours=12)))
+    # The core config update reports the new zone, the next check finds nothing new
+    bench.coordinator.clock.check()
+    bench.coordinator.clock.check()
+    await bench.hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+    lag = probe.stop()
+
+    result = {
+        "slots": locks * slots,
+        "granted_before": granted,
+        "granted_after": sum(1 for s in bench.sensors() if s.granted),
+        "reevaluations": len(changes),
+        "zwave_writes": bench.network.stats["writes"] - writes,
+        "reconcile_ms": elapsed * 1000,
+        "lag_max_us": lag.get("max_us", 0),
+    }
+    dt_util.set_default_time_zone(time_zone)
+    await bench.async_teardown()
+    return result
+
+
+async def bench_cold_start(locks: int = 5, slots: int = 30) -> dict:
+    """Time from an empty coordinator to every entry and sensor loaded"""
+    bench = Bench(locks, slots)
+    start = time.perf_counter()
+    await bench.async_setup()
+    elapsed = time.perf_counter() - start
+    loaded = len(bench.sensors())
+    await bench.async_teardown()
+    return {"locks": locks, "slots": slots, "sensors": loaded, "cold_start_ms": elapsed * 1000}
+
+
+async def run(args) -> dict:
+    results = {
+        "event_dispatch": await bench_event_dispatch(args.events),
+        "alarm_handling": await bench_alarm_handling(max(1, args.events // 10)),
+        "unlock_burst": await bench_unlock_burst(),
+        "attempt_burst": await bench_attempt_burst(),
+        "alarm_replay": await bench_alarm_replay(),
+        "poll_cycle": [
+            await bench_poll_cycle(locks, slots)
+            for locks in args.locks for slots in args.slots
+        ],
+        "poll_subset": await bench_poll_subset(),
+        "adaptive_polling": await bench_adaptive_polling(),
+        "convergence": await bench_convergence(),
+        "services": await bench_services(args.calls),
+        "reconfigure": await bench_reconfigure(max(args.slots)),
+        "loop_lag": await bench_loop_lag(),
+        "time_zone_change": await bench_time_zone_change(),
+        "cold_start": await bench_cold_start(max(args.locks), max(args.slots)),
+    }
+    return results
+
+
+def _flatten(results, prefix="") -> Dict[str, float]:
+    flat = {}
+    if isinstance(results, dict):
+        for k, v in results.items():
+            flat.update(_flatten(v, f"{prefix}{k}."))
+    elif isinstance(results, list):
+        for item in results:
+            key = ".".join(f"{k}{item[k]}" for k in ("locks", "slots") if k in item)
+            flat.update(_flatten(item, f"{prefix}{key}."))
+    elif isinstance(results, (int, float)):
+        flat[prefix[:-1]] = results
+    return flat
+
+
+def over_limits(current: dict) -> List[str]:
+    """Return the metrics over their budget in LIMITS"""
+    now = _flatten(current["results"])
+    return [
+        f"{key}: {now[key]:.3f} (limit {limit})"
+        for key, limit in LIMITS.items() if now.get(key, 0) > limit
+    ]
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Return the metrics that regressed by more than the tolerance"""
+    regressions = []
+    now = _flatten(current["results"])
+    then = _flatten(baseline["results"])
+    for key, new in now.items():
+        if key.endswith(MUST_BE_ZERO) and new:
+            regressions.append(f"{key}: {new} (must be 0)")
+    for key, old in then.items():
+        new = now.get(key)
+        if new is None or not old:
+            continue
+        if key.endswith(LOWER_IS_BETTER):
+            ratio = new / old
+        elif key.endswith("_per_s"):
+            ratio = old / new if new else float("inf")
+        else:
+            continue
+        if ratio > 1 + tolerance:
+            regressions.append(f"{key}: {old:.3f} -> {new:.3f} ({(ratio - 1) * 100:+.1f}%)")
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Lock Manager benchmarks")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--baseline", help="Previous results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--locks", type=_int_list, default=[1, 5, 20])
+    parser.add_argument("--slots", type=_int_list, default=[10, 30, 250])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.CRITICAL)
+    gc.collect()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        results = loop.run_until_complete(run(args))
+    finally:
+        loop.close()
+
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    regressions = over_limits(report)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions += compare(report, json.load(f), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""Streaming bulk import and export of slot configurations.
+
+Files live in the config directory and are CSV or JSON lines. Each JSON line is
+an ``update_slots`` item, CSV rows use the columns in ``CSV_COLUMNS`` with the
+nested settings (access_count, date_range, day_of_week) as JSON. Reading,
+parsing, validation and writing run in the executor one chunk at a time.
+"""
+import csv
+import json
+import logging
+import os
+
+from typing import Iterable, List, Optional
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    ATTR_CODE_SLOT,
+    ATTR_ENTITY_ID,
+    ATTR_LOCK,
+    ATTR_SEN_SET_BY_ACCESS_COUNT,
+    ATTR_SEN_SET_BY_DATE_RANGE,
+    ATTR_SEN_SET_BY_DOW,
+    ATTR_SEN_SET_LOCK_CODE,
+    ATTR_SEN_SET_NOTIFICATION,
+    ATTR_SEN_SET_USER_NAME,
+    ATTR_SENSOR_SETTINGS,
+    ATTR_SENSOR_SLOT_ENABLED,
+    RESULT,
+    RESULT_ERROR,
+)
+from .schema import validate_slot_item
+
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+FORMATS = [FORMAT_CSV, FORMAT_JSONL]
+
+DEFAULT_CHUNK_SIZE = 500
+ERROR_REPORT_SUFFIX = ".errors.jsonl"
+
+CSV_TARGET_COLUMNS = [ATTR_ENTITY_ID, ATTR_LOCK, ATTR_CODE_SLOT, ATTR_SENSOR_SLOT_ENABLED]
+CSV_SETTINGS_COLUMNS = [
+    ATTR_SEN_SET_LOCK_CODE,
+    ATTR_SEN_SET_USER_NAME,
+    ATTR_SEN_SET_NOTIFICATION,
+    ATTR_SEN_SET_BY_ACCESS_COUNT,
+    ATTR_SEN_SET_BY_DATE_RANGE,
+    ATTR_SEN_SET_BY_DOW,
+]
+CSV_JSON_COLUMNS = [ATTR_SEN_SET_BY_ACCESS_COUNT, ATTR_SEN_SET_BY_DATE_RANGE, ATTR_SEN_SET_BY_DOW]
+CSV_COLUMNS = CSV_TARGET_COLUMNS + CSV_SETTINGS_COLUMNS
+
+_TRUE = ("1", "true", "yes", "on")
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def file_format(path: str, fmt: Optional[str] = None) -> str:
+    """Format from the argument or the file extension"""
+    if fmt:
+        return fmt
+    return FORMAT_CSV if path.lower().endswith(".csv") else FORMAT_JSONL
+
+
+def _csv_to_item(row: dict) -> dict:
+    """Turn a flat CSV row into an update_slots item"""
+    item = {k: row[k] for k in (ATTR_ENTITY_ID, ATTR_LOCK, ATTR_CODE_SLOT) if row.get(k)}
+    if row.get(ATTR_SENSOR_SLOT_ENABLED):
+        item[ATTR_SENSOR_SLOT_ENABLED] = row[ATTR_SENSOR_SLOT_ENABLED].strip().lower() in _TRUE
+
+    settings = {}
+    for column in CSV_SETTINGS_COLUMNS:
+        value = row.get(column)
+        if value in (None, ""):
+            continue
+        if column in CSV_JSON_COLUMNS:
+            value = json.loads(value)
+        elif column == ATTR_SEN_SET_LOCK_CODE:
+            value = int(value)
+        elif column == ATTR_SEN_SET_NOTIFICATION:
+            value = value.strip().lower() in _TRUE
+        settings[column] = value
+    item[ATTR_SENSOR_SETTINGS] = settings
+    return item
+
+
+def _item_to_csv(item: dict) -> dict:
+    row = {k: item.get(k, "") for k in CSV_TARGET_COLUMNS}
+    for column in CSV_SETTINGS_COLUMNS:
+        value = item[ATTR_SENSOR_SETTINGS].get(column, "")
+        row[column] = json.dumps(value) if column in CSV_JSON_COLUMNS and value != "" else value
+    return row
+
+
+class SlotFileReader:
+    """Reads and validates a slot file a chunk at a time, every method runs in the executor"""
+
+    def __init__(self, path: str, fmt: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._path = path
+        self._format = fmt
+        self._chunk_size = chunk_size
+        self._file = None
+        self._rows: Optional[Iterable] = None
+        self._row = 0
+
+    def open(self) -> None:
+        self._file = open(self._path, newline="")
+        self._rows = csv.DictReader(self._file) if self._format == FORMAT_CSV else self._file
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def read_chunk(self) -> List[tuple]:
+        """Next (row number, validated item, error) tuples, empty at the end of the file"""
+        chunk = []
+        for raw in self._rows:
+            self._row += 1
+            if self._format == FORMAT_JSONL and not raw.strip():
+                continue
+            try:
+                item = _csv_to_item(raw) if self._format == FORMAT_CSV else json.loads(raw)
+                chunk.append((self._row, validate_slot_item(item), None))
+            except (vol.Invalid, ValueError, TypeError) as err:
+                chunk.append((self._row, None, str(err)))
+            if len(chunk) >= self._chunk_size:
+                break
+        return chunk
+
+
+class ErrorReport:
+    """Append-only per-row error report, opened on the first error"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def write(self, errors: List[dict]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "w")
+        for error in errors:
+            self._file.write(json.dumps(error) + "\n")
+        self.count += len(errors)
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def _write_chunk(path: str, fmt: str, items: List[dict], first: bool) -> None:
+    with open(path, "w" if first else "a", newline="") as f:
+        if fmt == FORMAT_CSV:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+            if first:
+                writer.writeheader()
+            writer.writerows(_item_to_csv(i) for i in items)
+        else:
+            f.writelines(json.dumps(i) + "\n" for i in items)
+
+
+def _remove_report(path: str) -> None:
+    """Delete the error report of an earlier import, runs in the executor"""
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def config_file(hass: HomeAssistant, filename: str) -> Optional[str]:
+    """Resolve a file name inside the config directory"""
+    _root = os.path.realpath(hass.config.config_dir)
+    _path = os.path.realpath(hass.config.path(filename))
+    if os.path.commonpath([_root, _path]) != _root:
+        _LOGGER.error(f"{filename} is outside of the config directory")
+        return None
+    return _path
+
+
+async def async_import_slots(hass: HomeAssistant, coordinator, path: str, fmt: str = None,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """Stream a slot file into the coordinator, returns a summary"""
+    reader = SlotFileReader(path, file_format(path, fmt), chunk_size)
+    report = ErrorReport(f"{path}{ERROR_REPORT_SUFFIX}")
+    rows = 0
+    await hass.async_add_executor_job(reader.open)
+    try:
+        while True:
+            chunk = await hass.async_add_executor_job(reader.read_chunk)
+            if not chunk:
+                break
+            rows += len(chunk)
+            errors = [r for r in await coordinator.apply_slots(chunk) if r[RESULT] == RESULT_ERROR]
+            if errors:
+                await hass.async_add_executor_job(report.write, errors)
+    finally:
+        await hass.async_add_executor_job(reader.close)
+        await hass.async_add_executor_job(report.close)
+    if not report.count:
+        # A clean import leaves no report of an earlier run behind
+        await hass.async_add_executor_job(_remove_report, report.path)
+
+    return {
+        "path": path,
+        "rows": rows,
+        "applied": rows - report.count,
+        "errors": report.count,
+        "report": report.path if report.count else None,
+    }
+
+
+async def async_export_slots(hass: HomeAssistant, sensors: List, path: str, fmt: str = None,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """Stream the configured slots to a file, returns a summary.
+
+    sensors is a snapshot taken by the caller, entries may be added or unloaded
+    while chunks are written. The file is written next to path and replaces it
+    once complete, a failed export leaves the previous one in place.
+    """
+    fmt = file_format(path, fmt)
+    _partial = f"{path}.partial"
+    chunk = []
+    rows = 0
+    first = True
+    for sensor in sensors:
+        if not sensor.settings:
+            continue
+        chunk.append({
+            ATTR_LOCK: sensor.parent,
+            ATTR_CODE_SLOT: sensor.slot,
+            ATTR_SENSOR_SLOT_ENABLED: sensor.slot_enabled,
+            ATTR_SENSOR_SETTINGS: dict(sensor.settings),
+        })
+        if len(chunk) >= chunk_size:
+            await hass.async_add_executor_job(_write_chunk, _partial, fmt, chunk, first)
+            rows += len(chunk)
+            chunk, first = [], False
+
+    if chunk or first:
+        await hass.async_add_executor_job(_write_chunk, _partial, fmt, chunk, first)
+        rows += len(chunk)
+    await hass.async_add_executor_job(os.replace, _partial, path)
+
+    return {"path": path, "rows": rows}
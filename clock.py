@@ -0,0 +1,105 @@
+"""Detection of wall clock jumps and time zone changes"""
+import logging
+import time
+
+from datetime import timedelta
+from typing import Callable, Optional
+
+from homeassistant.const import EVENT_CORE_CONFIG_UPDATE
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+import homeassistant.util.dt as dt_util
+
+# Seconds between two comparisons of the clocks
+CLOCK_CHECK_INTERVAL = 60
+# Seconds the wall clock may drift from the monotonic clock between two checks
+CLOCK_JUMP_TOLERANCE = 30
+
+# Why the local time moved
+CHANGE_CLOCK_JUMP = "clock_jump"
+CHANGE_TIME_ZONE = "time_zone"
+CHANGE_UTC_OFFSET = "utc_offset"
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ClockWatch:
+    """Compares the wall clock with the loop's monotonic clock every interval.
+
+    An NTP step, a manual change or a resume from suspend shows as the two
+    clocks moving apart, a DST shift as a new UTC offset of local time and a
+    new HA time zone as a different default zone, also checked as soon as the
+    core config changes. Each change calls on_change once with the reason and
+    the seconds local time moved by.
+    """
+
+    def __init__(self, hass: HomeAssistant, on_change: Callable[[str, float], None]):
+        self._hass = hass
+        self._on_change = on_change
+        self._wall = 0.0
+        self._monotonic = 0.0
+        self._time_zone = None
+        self._offset: Optional[timedelta] = None
+        self._timer = None
+        self._unsub_config = None
+        self.changes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._timer is not None
+
+    def _snapshot(self) -> None:
+        self._wall = time.time()
+        self._monotonic = self._hass.loop.time()
+        self._time_zone = dt_util.DEFAULT_TIME_ZONE
+        self._offset = dt_util.now().utcoffset()
+
+    @callback
+    def start(self) -> None:
+        if self.running:
+            return
+        self._snapshot()
+        self._unsub_config = self._hass.bus.async_listen(EVENT_CORE_CONFIG_UPDATE, self._config_updated)
+        self._timer = async_call_later(self._hass, CLOCK_CHECK_INTERVAL, self._tick)
+
+    @callback
+    def stop(self) -> None:
+        if self._timer:
+            self._timer()
+            self._timer = None
+        if self._unsub_config:
+            self._unsub_config()
+            self._unsub_config = None
+
+    @callback
+    def _tick(self, _now) -> None:
+        self._timer = async_call_later(self._hass, CLOCK_CHECK_INTERVAL, self._tick)
+        self.check()
+
+    @callback
+    def _config_updated(self, _event) -> None:
+        self.check()
+
+    @callback
+    def check(self) -> Optional[str]:
+        """Compare the clocks with the last check, returns the reason if local time moved"""
+        _wall, _monotonic = self._wall, self._monotonic
+        _time_zone, _offset = self._time_zone, self._offset
+        self._snapshot()
+
+        _drift = (self._wall - _wall) - (self._monotonic - _monotonic)
+        if abs(_drift) > CLOCK_JUMP_TOLERANCE:
+            _reason = CHANGE_CLOCK_JUMP
+        elif self._time_zone != _time_zone:
+            _reason = CHANGE_TIME_ZONE
+        elif self._offset != _offset:
+            _reason = CHANGE_UTC_OFFSET
+        else:
+            return None
+
+        # Local time moved by the drift and any change of the offset
+        _moved = _drift + (self._offset - _offset).total_seconds()
+        self.changes += 1
+        _LOGGER.info(f"Local time moved by {_moved:.0f}s ({_reason})")
+        self._on_change(_reason, _moved)
+        return _reason
@@ -0,0 +1,108 @@
+"""Index of configured codes per lock and per lock group"""
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+# Index keys
+SlotKey = Tuple[str, int]
+# Who holds a code in a group, a multi-lock user id or the slot itself
+Owner = Union[str, SlotKey]
+
+
+class CodeIndex:
+    """Hash index of the codes configured on every slot.
+
+    A code may only be on one slot of a lock. Within a lock group the same code
+    may be shared across locks by one multi-lock user, but not by different
+    users or by slots that belong to none. Owners are user ids, never names,
+    two people may go by the same name.
+    """
+
+    def __init__(self):
+        self._slots: Dict[SlotKey, Tuple[int, Owner]] = {}
+        self._locks: Dict[str, Dict[int, Set[int]]] = {}
+        self._groups: Dict[str, Dict[int, Dict[Owner, Set[SlotKey]]]] = {}
+        self._lock_groups: Dict[str, str] = {}
+
+    def set_group(self, entry_id: str, group: Optional[str]) -> None:
+        """Assign a lock to a group, moving any indexed codes with it"""
+        _slots = [(k, v) for k, v in self._slots.items() if k[0] == entry_id]
+        for key, _ in _slots:
+            self.update(key[0], key[1], None)
+        if group:
+            self._lock_groups[entry_id] = group
+        else:
+            self._lock_groups.pop(entry_id, None)
+        for key, (code, owner) in _slots:
+            self.update(key[0], key[1], code, owner if owner != key else None)
+
+    def remove_lock(self, entry_id: str) -> None:
+        for key in [k for k in self._slots if k[0] == entry_id]:
+            self.update(key[0], key[1], None)
+        self._locks.pop(entry_id, None)
+        self._lock_groups.pop(entry_id, None)
+
+    def code(self, entry_id: str, slot: int) -> Optional[int]:
+        """Code indexed for a slot"""
+        _current = self._slots.get((entry_id, slot))
+        return _current[0] if _current else None
+
+    def update(self, entry_id: str, slot: int, code: Optional[int], user_id: Optional[str] = None) -> None:
+        """Record the code of a slot and the multi-lock user it belongs to, None removes it"""
+        key = (entry_id, slot)
+        owner = user_id or key
+        current = self._slots.get(key)
+        if current == ((code, owner) if code is not None else None):
+            return
+
+        group = self._lock_groups.get(entry_id)
+        if current:
+            _code, _owner = current
+            del self._slots[key]
+            _slots = self._locks[entry_id][_code]
+            _slots.discard(slot)
+            if not _slots:
+                del self._locks[entry_id][_code]
+            if group:
+                _owners = self._groups[group][_code]
+                _owners[_owner].discard(key)
+                if not _owners[_owner]:
+                    del _owners[_owner]
+                if not _owners:
+                    del self._groups[group][_code]
+
+        if code is not None:
+            self._slots[key] = (code, owner)
+            self._locks.setdefault(entry_id, {}).setdefault(code, set()).add(slot)
+            if group:
+                self._groups.setdefault(group, {}).setdefault(code, {}).setdefault(owner, set()).add(key)
+
+    def conflict(self, entry_id: str, slot: int, code: int, user_id: Optional[str] = None) -> Optional[str]:
+        """Describe why code can not go on this slot, None if it can"""
+        _slots = self._locks.get(entry_id, {}).get(code)
+        if _slots and (len(_slots) > 1 or slot not in _slots):
+            return f"Code is already used by slot {min(s for s in _slots if s != slot)} of this lock"
+
+        group = self._lock_groups.get(entry_id)
+        if group:
+            _owner = user_id or (entry_id, slot)
+            _others = [o for o in self._groups.get(group, {}).get(code, {}) if o != _owner]
+            if _others:
+                _other = f"user {_others[0]}" if isinstance(_others[0], str) else "a slot of another lock"
+                return f"Code is already used by {_other} in lock group {group}"
+        return None
+
+    def collisions(self) -> List[dict]:
+        """Every code currently shared by slots of a lock or users of a group"""
+        _collisions = []
+        for entry_id, codes in self._locks.items():
+            for code, slots in codes.items():
+                if len(slots) > 1:
+                    _collisions.append({"entry_id": entry_id, "slots": sorted(slots)})
+        for group, codes in self._groups.items():
+            for code, owners in codes.items():
+                if len(owners) > 1:
+                    _collisions.append({
+                        "group": group,
+                        "users": sorted(o for o in owners if isinstance(o, str)),
+                        "slots": sorted(k for keys in owners.values() for k in keys),
+                    })
+        return _collisions
@@ -4,13 +4,11 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.components.binary_sensor import DOMAIN as BINARY_DOMAIN
-from homeassistant.components.sensor import DOMAIN as SENSORS_DOMAIN
 from homeassistant.components.notify import DOMAIN as NOTIFY_DOMAIN
 from homeassistant.core import callback
 
 from .const import (
     DOMAIN,
-    LOCK_DOMAIN,
     CONF_ALARM_LEVEL,
     CONF_ALARM_TYPE,
     CONF_ENTITY_ID,
@@ -22,8 +20,11 @@ from .const import (
     CONF_OPEN_DURATION,
     CONF_SENSOR_NAME,
     CONF_SLOTS,
-    CONF_START, CONF_NOTIFY_LOCK_GENERAL,
+    CONF_START, CONF_NOTIFY_LOCK_GENERAL, CONF_LOCK_GROUP, CONF_NOTIFY_DIGEST,
+    CONF_ATTEMPT_LIMIT, CONF_ATTEMPT_WINDOW, CONF_NOTIFY_ATTEMPTS, CONF_LOCKDOWN,
 )
+from .detector import DEFAULT_ATTEMPT_LIMIT, DEFAULT_ATTEMPT_WINDOW
+from .discovery import get_discovery
 
 # DEFAULT Values
 DEFAULT_START = 1
@@ -33,24 +34,9 @@ DEFAULT_SENSOR = "binary_sensor.fake"
 _LOGGER = logging.getLogger(__name__)
 
 
-async def _setup(obj):
-    entities = obj.hass.states.async_entity_ids(SENSORS_DOMAIN)
-
-    locks = obj.hass.states.async_entity_ids(LOCK_DOMAIN)
-    notifiers = list(obj.hass.services.async_services().get(NOTIFY_DOMAIN).keys())
-    door_sensors = obj.hass.states.async_entity_ids(BINARY_DOMAIN)
-    door_sensors.append(DEFAULT_SENSOR)
-
-    alarm_types = [
-        entity for entity in entities if entity.find("alarm_type") != -1 or entity.find("access_control") != -1
-    ]
-
-    alarm_levels = [
-        entity for entity in entities if entity.find("alarm_level") != -1 or entity.find("alarm_level") != -1
-    ]
-
-    # Create schema with any options already present
-    merged_data = {**{
+def _defaults(obj) -> dict:
+    """Create schema with any options already present"""
+    return {**{
         CONF_ENTITY_ID: None,
         CONF_SLOTS: DEFAULT_CODE_SLOTS,
         CONF_START: DEFAULT_START,
@@ -63,22 +49,73 @@ async def _setup(obj):
         CONF_NOTIFY_DOOR_LEFT_OPEN: None,
         CONF_NOTIFY_LOCK_GENERAL: None,
         CONF_OPEN_DURATION: 300,
+        CONF_LOCK_GROUP: "",
+        CONF_NOTIFY_DIGEST: 0,
+        CONF_ATTEMPT_LIMIT: DEFAULT_ATTEMPT_LIMIT,
+        CONF_ATTEMPT_WINDOW: DEFAULT_ATTEMPT_WINDOW,
+        CONF_NOTIFY_ATTEMPTS: True,
+        CONF_LOCKDOWN: 0,
     }, **obj.data}
 
+
+async def _setup(obj):
+    """First step, the lock and its slots"""
+    locks = await get_discovery(obj.hass).async_locks()
+    merged_data = _defaults(obj)
+
     obj._schema = vol.Schema({
         vol.Required(CONF_ENTITY_ID, default=merged_data[CONF_ENTITY_ID]): vol.In(locks),
         vol.Required(CONF_SLOTS, default=merged_data[CONF_SLOTS]): vol.Coerce(int),
         vol.Required(CONF_START, default=merged_data[CONF_START]): vol.Coerce(int),
         vol.Required(CONF_LOCK_NAME, default=merged_data[CONF_LOCK_NAME]): str,
         # vol.Optional(CONF_LOCK_NAME_SAFE): str, Hiding this so it doesn't show on config page
+        vol.Optional(CONF_LOCK_GROUP, default=merged_data[CONF_LOCK_GROUP]): str,
+    }, extra=vol.REMOVE_EXTRA)
+
+
+async def _setup_entities(obj):
+    """Second step, the sensors of the chosen lock and notifications"""
+    discovery = get_discovery(obj.hass)
+    lock = obj.data[CONF_ENTITY_ID]
+    merged_data = _defaults(obj)
+
+    notifiers = list(obj.hass.services.async_services().get(NOTIFY_DOMAIN, {}).keys())
+
+    # Door sensors are rarely on the lock's device and may not be registered
+    door_sensors = await discovery.async_device_entities(lock, BINARY_DOMAIN)
+    door_sensors += [e for e in obj.hass.states.async_entity_ids(BINARY_DOMAIN) if e not in door_sensors]
+    door_sensors.append(DEFAULT_SENSOR)
+
+    alarms = await discovery.async_alarm_entities(lock)
+    for option, (candidates, match) in alarms.items():
+        # Keep a configured sensor that still belongs to the lock, otherwise select the lock's own
+        if merged_data[option] not in candidates:
+            merged_data[option] = match
+    alarm_levels = alarms[CONF_ALARM_LEVEL][0]
+    alarm_types = alarms[CONF_ALARM_TYPE][0]
+
+    obj._schema = vol.Schema({
         vol.Optional(CONF_SENSOR_NAME, default=merged_data[CONF_SENSOR_NAME]): vol.In(door_sensors),
         vol.Optional(CONF_ALARM_LEVEL, default=merged_data[CONF_ALARM_LEVEL]): vol.In(alarm_levels),
         vol.Optional(CONF_ALARM_TYPE, default=merged_data[CONF_ALARM_TYPE]): vol.In(alarm_types),
         vol.Optional(CONF_NOTIFY, default=merged_data[CONF_NOTIFY]): vol.In(notifiers),
         vol.Optional(CONF_NOTIFY_DOOR_OPEN, default=merged_data[CONF_NOTIFY_DOOR_OPEN]): bool,
-        vol.Optional(CONF_NOTIFY_DOOR_LEFT_OPEN, default=merged_data[CONF_NOTIFY_DOOR_OPEN]): bool,
+        vol.Optional(CONF_NOTIFY_DOOR_LEFT_OPEN, default=merged_data[CONF_NOTIFY_DOOR_LEFT_OPEN]): bool,
         vol.Optional(CONF_NOTIFY_LOCK_GENERAL, default=merged_data[CONF_NOTIFY_LOCK_GENERAL]): bool,
         vol.Optional(CONF_OPEN_DURATION, default=merged_data[CONF_OPEN_DURATION]): vol.Coerce(int),
+        vol.Optional(CONF_NOTIFY_DIGEST, default=merged_data[CONF_NOTIFY_DIGEST]): vol.All(
+            vol.Coerce(int), vol.Range(min=0)
+        ),
+        vol.Optional(CONF_ATTEMPT_LIMIT, default=merged_data[CONF_ATTEMPT_LIMIT]): vol.All(
+            vol.Coerce(int), vol.Range(min=0)
+        ),
+        vol.Optional(CONF_ATTEMPT_WINDOW, default=merged_data[CONF_ATTEMPT_WINDOW]): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+        vol.Optional(CONF_NOTIFY_ATTEMPTS, default=merged_data[CONF_NOTIFY_ATTEMPTS]): bool,
+        vol.Optional(CONF_LOCKDOWN, default=merged_data[CONF_LOCKDOWN]): vol.All(
+            vol.Coerce(int), vol.Range(min=0)
+        ),
     }, extra=vol.REMOVE_EXTRA)
 
 
@@ -109,11 +146,21 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             self.data.update(user_input)
             user_input[CONF_LOCK_NAME_SAFE] = user_input[CONF_LOCK_NAME].lower().replace(" ", "_")
             self.data.update({**self.data, **user_input})
-            return self.async_create_entry(title=self.data[CONF_LOCK_NAME], data=self.data)
+            return await self.async_step_entities()
 
         await _setup(self)
         return self.async_show_form(step_id="user", data_schema=self._schema, errors=self._errors)
 
+    async def async_step_entities(self, user_input=None):
+        """Pick the lock's sensors."""
+
+        if user_input is not None:
+            self.data.update(user_input)
+            return self.async_create_entry(title=self.data[CONF_LOCK_NAME], data=self.data)
+
+        await _setup_entities(self)
+        return self.async_show_form(step_id="entities", data_schema=self._schema, errors=self._errors)
+
     @staticmethod
     @callback
     def async_get_options_flow(config_entry):
@@ -144,9 +191,19 @@ class OptionsFlow(config_entries.OptionsFlow):
         if user_input is not None:
             user_input[CONF_LOCK_NAME_SAFE] = user_input[CONF_LOCK_NAME].lower().replace(" ", "_")
             self.data.update({**self.data, **user_input})
-            return self.async_create_entry(title=self.data[CONF_LOCK_NAME], data=self.data)
+            return await self.async_step_entities()
 
         await _setup(self)
         return self.async_show_form(step_id="init", data_schema=self._schema, errors=self._errors)
 
+    async def async_step_entities(self, user_input=None):
+        """Manage the lock's sensors."""
+
+        if user_input is not None:
+            self.data.update(user_input)
+            return self.async_create_entry(title=self.data[CONF_LOCK_NAME], data=self.data)
+
+        await _setup_entities(self)
+        return self.async_show_form(step_id="entities", data_schema=self._schema, errors=self._errors)
+
 # TODO Cant get translations to work
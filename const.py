@@ -24,6 +24,17 @@ ATTR_SEN_SET_NOTIFICATION = "notifications"
 
 # Attributes
 ATTR_ENTITY_ID = "entity_id"
+ATTR_LOCK = "lock"
+ATTR_CODE_SLOT = "code_slot"
+ATTR_SLOTS = "slots"
+ATTR_USER_ID = "user_id"
+ATTR_NAME = "name"
+ATTR_CODE = "code"
+ATTR_ASSIGNMENTS = "assignments"
+ATTR_CONCURRENCY = "concurrency"
+
+# Locks written in parallel when fanning out a user
+DEFAULT_CONCURRENCY = 4
 ATTR_LIMIT = "limit"
 ATTR_ENABLED = "enabled"
 ATTR_INCLUSIVE = "inclusive"
@@ -35,6 +46,11 @@ ATTR_END_DATE = "end_date"
 ATTR_START_TIME = "begin_time"
 ATTR_END_TIME = "end_time"
 
+# Results of bulk operations
+RESULT = "result"
+RESULT_OK = "ok"
+RESULT_ERROR = "error"
+
 
 # Configuration Properties
 CONF_ALARM_LEVEL = "alarm_level"
@@ -50,6 +66,12 @@ CONF_NOTIFY_DOOR_OPEN = "notify_door_opened"
 CONF_NOTIFY_DOOR_LEFT_OPEN = "notify_left_open"
 CONF_NOTIFY_LOCK_GENERAL = "notify_lock_general"
 CONF_OPEN_DURATION = "duration"
+CONF_LOCK_GROUP = "lock_group"
+CONF_NOTIFY_DIGEST = "notify_digest"
+CONF_ATTEMPT_LIMIT = "attempt_limit"
+CONF_ATTEMPT_WINDOW = "attempt_window"
+CONF_NOTIFY_ATTEMPTS = "notify_attempts"
+CONF_LOCKDOWN = "lockdown_duration"
 
 
 # LOCK VALUES
@@ -90,6 +112,19 @@ CODES_KWIKSET = {
         24,
         25,
         167
+    ],
+    "battery_low": [
+        167
+    ],
+    "battery_critical": [
+        168,
+        169
+    ],
+    "bad_code": [
+        161
+    ],
+    "out_of_schedule": [
+        162
     ]
 }
 
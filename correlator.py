@@ -0,0 +1,133 @@
+"""Pairs the alarm_type and alarm_level halves of a lock notification"""
+import logging
+
+from typing import Callable, List, Optional
+
+from homeassistant.core import HomeAssistant, callback
+
+from .timers import TimerManager, TIMER_ALARM_PAIR
+
+# Seconds a half waits for the other one before the missing half is read from the state machine
+CORRELATION_WINDOW = 0.5
+# Seconds after a notification during which a repeat of one of its halves is a late duplicate
+LATE_WINDOW = 1.0
+
+# Pairs needed before a lock is known to report its halves in a fixed order
+ORDER_SAMPLES = 10
+# Share of pairs in the other order that marks the lock as unordered
+ORDER_TOLERANCE = 0.1
+
+HALF_TYPE = 0
+HALF_LEVEL = 1
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class AlarmCorrelator:
+    """Turns the alarm_type and alarm_level state changes of one lock into single notifications.
+
+    The halves of a notification land as two state changes in either order. A
+    half waits ``CORRELATION_WINDOW`` for the other one. A lone half is completed
+    with the last value seen for the other entity, since an unchanged value fires
+    no state change, unless it repeats the previous notification and is a late
+    copy of it. Locks report their halves in a fixed order, while the lock keeps
+    to one a copy of the half that closed the previous notification is dropped
+    as soon as it arrives, otherwise it could be paired with the next one.
+    """
+
+    def __init__(self, hass: HomeAssistant, timers: TimerManager, entry_id: str,
+                 entities: List[str], on_alarm: Callable[[int, int], None]):
+        self._hass = hass
+        self._timers = timers
+        self._entry_id = entry_id
+        self._entities = entities
+        self._on_alarm = on_alarm
+        self._pending: List[Optional[int]] = [None, None]
+        self._seen: List[Optional[int]] = [None, None]
+        self._last: List[Optional[int]] = [None, None]
+        self._last_at = 0.0
+        self._closing: Optional[int] = None
+        self._openings = [0, 0]
+        self.pairs = 0
+        self.completed = 0
+        self.late = 0
+
+    def as_dict(self) -> dict:
+        return {"pairs": self.pairs, "completed_from_last_seen": self.completed, "late_dropped": self.late}
+
+    @property
+    def ordered(self) -> bool:
+        """Does the lock send its halves in a fixed order"""
+        _total = sum(self._openings)
+        return _total < ORDER_SAMPLES or min(self._openings) <= _total * ORDER_TOLERANCE
+
+    def _is_late(self, half: int, value: int) -> bool:
+        return value == self._last[half] and self._hass.loop.time() - self._last_at < LATE_WINDOW
+
+    @callback
+    def half_changed(self, half: int, state: str) -> None:
+        """A new alarm_type (HALF_TYPE) or alarm_level (HALF_LEVEL) state"""
+        _value = _int(state)
+        if _value is None:
+            return
+
+        _other = 1 - half
+        if self._pending[half] is None and self._pending[_other] is None:
+            if half == self._closing and self.ordered and self._is_late(half, _value):
+                self._closing = None
+                self.late += 1
+                _LOGGER.debug(f"Dropping late alarm half {self._entities[half]}={_value}")
+                return
+        elif self._pending[half] is not None:
+            # The other half of the previous notification never came
+            self._flush()
+
+        self._pending[half] = _value
+        if self._pending[_other] is not None:
+            self._timers.cancel(self._entry_id, TIMER_ALARM_PAIR)
+            self._openings[_other] += 1
+            if sum(self._openings) >= ORDER_SAMPLES * 8:
+                self._openings = [n // 2 for n in self._openings]
+            self._emit(half)
+        else:
+            self._timers.schedule(self._entry_id, TIMER_ALARM_PAIR, CORRELATION_WINDOW, self._flush)
+
+    @callback
+    def _flush(self) -> None:
+        """Resolve a lone half"""
+        self._timers.cancel(self._entry_id, TIMER_ALARM_PAIR)
+        _half = HALF_TYPE if self._pending[HALF_TYPE] is not None else HALF_LEVEL
+        _missing = 1 - _half
+        if self._is_late(_half, self._pending[_half]):
+            self._seen[_half] = self._pending[_half]
+            self._pending = [None, None]
+            self.late += 1
+            return
+
+        if self._seen[_missing] is None:
+            _state = self._hass.states.get(self._entities[_missing])
+            self._seen[_missing] = _int(_state.state) if _state else None
+        if self._seen[_missing] is None:
+            _LOGGER.warning(f"Dropping alarm half, {self._entities[_missing]} has no usable state")
+            self._pending = [None, None]
+            return
+        self._pending[_missing] = self._seen[_missing]
+        self.completed += 1
+        self._emit(_missing)
+
+    def _emit(self, closing: int) -> None:
+        _type, _level = self._pending
+        self._pending = [None, None]
+        self._seen = [_type, _level]
+        self._last = [_type, _level]
+        self._last_at = self._hass.loop.time()
+        self._closing = closing
+        self.pairs += 1
+        self._on_alarm(_type, _level)
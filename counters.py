@@ -0,0 +1,53 @@
+"""Write-behind persistence of the slot access counters"""
+from typing import Dict
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.counters"
+
+# Seconds a burst of unlocks is collected before the counters are written
+COUNTER_SAVE_DELAY = 10
+
+
+class AccessCounters:
+    """Access counts by sensor unique_id.
+
+    Counts live in memory and are written by the Store after a quiet period, the
+    Store also writes any pending save when Home Assistant stops.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._counts: Dict[str, int] = {}
+        self.loaded = False
+
+    async def async_load(self) -> None:
+        self._counts = await self._store.async_load() or {}
+        self.loaded = True
+
+    def get(self, unique_id: str, default: int = 0) -> int:
+        return self._counts.get(unique_id, default)
+
+    @callback
+    def set(self, unique_id: str, count: int) -> None:
+        if self._counts.get(unique_id) == count:
+            return
+        self._counts[unique_id] = count
+        self._store.async_delay_save(lambda: self._counts, COUNTER_SAVE_DELAY)
+
+    @callback
+    def remove(self, unique_id: str) -> None:
+        if self._counts.pop(unique_id, None) is not None:
+            self._store.async_delay_save(lambda: self._counts, COUNTER_SAVE_DELAY)
+
+    @callback
+    def remove_entry(self, entry_id: str) -> None:
+        """Forget the counters of a config entry"""
+        _prefix = f"{entry_id}_"
+        for unique_id in [k for k in self._counts if k.startswith(_prefix)]:
+            del self._counts[unique_id]
+        self._store.async_delay_save(lambda: self._counts, COUNTER_SAVE_DELAY)
@@ -0,0 +1,155 @@
+"""Vendor alarm code decoders.
+
+A lock's profile is resolved once when its entry loads, decoding an alarm type
+is then a single dict lookup. Profiles for other vendors or models can be added
+in ``lock_manager_vendors.json`` in the config directory, a list of objects::
+
+    [{"name": "yale", "manufacturers": ["yale"], "models": [],
+      "status": {"21": "Manual Lock"}, "user": [19], "notify": [21],
+      "battery_low": [167], "battery_critical": [168],
+      "bad_code": [161], "out_of_schedule": [162]}]
+
+Profiles from the file are tried before the built-in ones, profiles listing
+models before those matching on the manufacturer only.
+"""
+import json
+import logging
+import os
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, CODES_KWIKSET, CODES_SCHLAGE
+from .detector import ATTEMPTS
+from .polling import BATTERY_CRITICAL, BATTERY_LOW, BATTERY_OK
+
+VENDORS_FILE = f"{DOMAIN}_vendors.json"
+
+# Keys of a code table
+CODE_STATUS = "status"
+CODE_USER = "user"
+CODE_NOTIFY = "notify"
+CODE_BATTERY_LOW = "battery_low"
+CODE_BATTERY_CRITICAL = "battery_critical"
+
+VENDOR_PROFILE_SCHEMA = vol.Schema({
+    vol.Required("name"): str,
+    vol.Required("manufacturers"): [vol.All(str, vol.Lower)],
+    vol.Optional("models", default=[]): [vol.All(str, vol.Lower)],
+    vol.Required(CODE_STATUS): {vol.Coerce(int): str},
+    vol.Optional(CODE_USER, default=[]): [vol.Coerce(int)],
+    vol.Optional(CODE_NOTIFY, default=[]): [vol.Coerce(int)],
+    vol.Optional(CODE_BATTERY_LOW, default=[]): [vol.Coerce(int)],
+    vol.Optional(CODE_BATTERY_CRITICAL, default=[]): [vol.Coerce(int)],
+    **{vol.Optional(kind, default=[]): [vol.Coerce(int)] for kind in ATTEMPTS},
+})
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class AlarmCode(NamedTuple):
+    description: str
+    user: bool
+    notify: bool
+    battery: int = BATTERY_OK
+    # Kind of failed keypad attempt the code reports, if any
+    attempt: Optional[str] = None
+
+
+class VendorProfile:
+    """Precompiled alarm code table of a vendor"""
+
+    __slots__ = ("name", "manufacturers", "models", "_codes")
+
+    def __init__(self, name: str, manufacturers: List[str], table: dict, models: List[str] = None):
+        self.name = name
+        self.manufacturers = manufacturers
+        self.models = models or []
+        _user = set(table.get(CODE_USER, []))
+        _notify = set(table.get(CODE_NOTIFY, []))
+        _battery = {
+            **{code: BATTERY_LOW for code in table.get(CODE_BATTERY_LOW, [])},
+            **{code: BATTERY_CRITICAL for code in table.get(CODE_BATTERY_CRITICAL, [])},
+        }
+        _attempt = {code: kind for kind in ATTEMPTS for code in table.get(kind, [])}
+        self._codes: Dict[int, AlarmCode] = {
+            code: AlarmCode(
+                description, code in _user, code in _notify, _battery.get(code, BATTERY_OK), _attempt.get(code)
+            )
+            for code, description in table[CODE_STATUS].items()
+        }
+        # Codes flagged without a description
+        for code in (_user | _notify | set(_battery) | set(_attempt)) - set(self._codes):
+            self._codes[code] = AlarmCode(
+                str(code), code in _user, code in _notify, _battery.get(code, BATTERY_OK), _attempt.get(code)
+            )
+
+    def matches(self, manufacturer: str, model: str) -> bool:
+        if not any(m in manufacturer for m in self.manufacturers):
+            return False
+        return not self.models or any(m in model for m in self.models)
+
+    def decode(self, alarm_type: int) -> AlarmCode:
+        _code = self._codes.get(alarm_type)
+        if _code is None:
+            _code = self._codes[alarm_type] = AlarmCode(str(alarm_type), False, False)
+        return _code
+
+
+BUILTIN_PROFILES = [
+    VendorProfile("kwikset", ["kwikset"], CODES_KWIKSET),
+    VendorProfile("schlage", ["schlage"], CODES_SCHLAGE),
+]
+
+
+def _read_profiles(path: str) -> List[dict]:
+    """Profiles from the vendors file, runs in the executor"""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+class DecoderRegistry:
+    """Vendor profiles and the profile resolved for each manufacturer and model"""
+
+    def __init__(self):
+        self._profiles: List[VendorProfile] = list(BUILTIN_PROFILES)
+        self._resolved: Dict[Tuple[str, str], Optional[VendorProfile]] = {}
+        self.loaded = False
+
+    def register(self, profile: VendorProfile) -> None:
+        """Add a profile ahead of the built-in ones"""
+        self._profiles.insert(0, profile)
+        self._resolved.clear()
+
+    async def async_load(self, hass: HomeAssistant) -> None:
+        """Register the profiles of the vendors file in the config directory"""
+        self.loaded = True
+        _path = hass.config.path(VENDORS_FILE)
+        try:
+            _data = await hass.async_add_executor_job(_read_profiles, _path)
+        except (OSError, ValueError) as err:
+            _LOGGER.error(f"Unable to read {_path}: {err}")
+            return
+
+        for _raw in reversed(_data if isinstance(_data, list) else []):
+            try:
+                _profile = VENDOR_PROFILE_SCHEMA(_raw)
+            except vol.Invalid as err:
+                _LOGGER.error(f"Invalid vendor profile in {_path}: {err}")
+                continue
+            self.register(VendorProfile(_profile["name"], _profile["manufacturers"], _profile, _profile["models"]))
+            _LOGGER.info(f"Loaded vendor profile {_profile['name']}")
+
+    def resolve(self, manufacturer: Optional[str], model: Optional[str]) -> Optional[VendorProfile]:
+        """Profile for a device, None if no vendor matches"""
+        _key = ((manufacturer or "").lower(), (model or "").lower())
+        if _key not in self._resolved:
+            _matches = [p for p in self._profiles if p.matches(*_key)]
+            _specific = [p for p in _matches if p.models]
+            self._resolved[_key] = (_specific or _matches or [None])[0]
+        return self._resolved[_key]
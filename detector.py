@@ -0,0 +1,74 @@
+"""Sliding window detection of repeated bad and out of schedule keypad codes"""
+from collections import deque
+from typing import Deque, Dict
+
+# Attempt kinds, also the keys listing their alarm types in a vendor code table
+ATTEMPT_BAD_CODE = "bad_code"
+ATTEMPT_OUT_OF_SCHEDULE = "out_of_schedule"
+ATTEMPTS = (ATTEMPT_BAD_CODE, ATTEMPT_OUT_OF_SCHEDULE)
+ATTEMPT_NAMES = {
+    ATTEMPT_BAD_CODE: "bad codes",
+    ATTEMPT_OUT_OF_SCHEDULE: "codes outside their schedule",
+}
+
+# Attempts within the window that trip the detector, 0 turns it off
+DEFAULT_ATTEMPT_LIMIT = 5
+# Seconds of the sliding window
+DEFAULT_ATTEMPT_WINDOW = 60
+
+
+class RateWindow:
+    """Trips when limit attempts fall within window seconds.
+
+    Only the last limit timestamps are kept, the oldest of them is the one that
+    decides, so memory is fixed however fast attempts arrive. After tripping it
+    stays quiet for a window, an attack in progress alerts once per window
+    rather than on every attempt.
+    """
+
+    __slots__ = ("limit", "window", "_times", "_quiet_until", "attempts", "trips")
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._times: Deque[float] = deque(maxlen=limit)
+        self._quiet_until = 0.0
+        self.attempts = 0
+        self.trips = 0
+
+    def hit(self, now: float) -> bool:
+        """Record an attempt, True when it trips the window"""
+        self.attempts += 1
+        self._times.append(now)
+        if len(self._times) < self.limit or now - self._times[0] > self.window or now < self._quiet_until:
+            return False
+        self._quiet_until = now + self.window
+        self.trips += 1
+        return True
+
+    def count(self, now: float) -> int:
+        """Attempts within the window, at most limit"""
+        return sum(1 for t in self._times if now - t <= self.window)
+
+
+class AttemptDetector:
+    """Bad code and out of schedule attempts of one lock"""
+
+    __slots__ = ("_windows",)
+
+    def __init__(self, limit: int = DEFAULT_ATTEMPT_LIMIT, window: float = DEFAULT_ATTEMPT_WINDOW):
+        self._windows: Dict[str, RateWindow] = {kind: RateWindow(limit, window) for kind in ATTEMPTS}
+
+    @property
+    def window(self) -> float:
+        return self._windows[ATTEMPT_BAD_CODE].window
+
+    def attempt(self, kind: str, now: float) -> bool:
+        """Record an attempt of a kind, True when it trips the kind's window"""
+        return self._windows[kind].hit(now)
+
+    def count(self, kind: str, now: float) -> int:
+        return self._windows[kind].count(now)
+
+    def as_dict(self) -> dict:
+        return {kind: {"attempts": w.attempts, "trips": w.trips} for kind, w in self._windows.items()}
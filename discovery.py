@@ -0,0 +1,100 @@
+"""Entity candidates for the config flow, read from the entity registry"""
+import logging
+
+from typing import Dict, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, Event, callback
+from homeassistant.helpers.device_registry import EVENT_DEVICE_REGISTRY_UPDATED
+from homeassistant.helpers.entity_registry import EVENT_ENTITY_REGISTRY_UPDATED
+
+from .const import DOMAIN, LOCK_DOMAIN, SENSOR_DOMAIN, CONF_ALARM_LEVEL, CONF_ALARM_TYPE
+
+DISCOVERY = f"{DOMAIN}_discovery"
+
+# Substrings of the entity_id of a lock's alarm sensors
+ALARM_KEYS = {
+    CONF_ALARM_TYPE: ("alarm_type", "access_control"),
+    CONF_ALARM_LEVEL: ("alarm_level",),
+}
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class EntityDiscovery:
+    """Registry entities indexed by domain and by device.
+
+    The index is built the first time a form needs it and dropped whenever the
+    entity or device registry changes, so opening a form does not walk every
+    entity of the instance.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._by_domain: Optional[Dict[str, List[str]]] = None
+        self._by_device: Dict[str, List[str]] = {}
+        self._device_of: Dict[str, str] = {}
+        hass.bus.async_listen(EVENT_ENTITY_REGISTRY_UPDATED, self._invalidate)
+        hass.bus.async_listen(EVENT_DEVICE_REGISTRY_UPDATED, self._invalidate)
+
+    @callback
+    def _invalidate(self, _: Event) -> None:
+        self._by_domain = None
+
+    async def _async_index(self) -> Dict[str, List[str]]:
+        if self._by_domain is None:
+            _registry = await self._hass.helpers.entity_registry.async_get_registry()
+            _by_domain: Dict[str, List[str]] = {}
+            self._by_device = {}
+            self._device_of = {}
+            for _entity in _registry.entities.values():
+                if _entity.disabled_by:
+                    continue
+                _by_domain.setdefault(_entity.domain, []).append(_entity.entity_id)
+                if _entity.device_id:
+                    self._device_of[_entity.entity_id] = _entity.device_id
+                    self._by_device.setdefault(_entity.device_id, []).append(_entity.entity_id)
+            for _entities in _by_domain.values():
+                _entities.sort()
+            self._by_domain = _by_domain
+            _LOGGER.debug(f"Indexed {len(_registry.entities)} registry entities")
+        return self._by_domain
+
+    async def async_entities(self, domain: str) -> List[str]:
+        """Registered entities of a domain"""
+        return list((await self._async_index()).get(domain, []))
+
+    async def async_locks(self) -> List[str]:
+        """Registered locks, then locks that only have a state, like YAML configured ones"""
+        _locks = await self.async_entities(LOCK_DOMAIN)
+        _locks += [e for e in self._hass.states.async_entity_ids(LOCK_DOMAIN) if e not in _locks]
+        return _locks
+
+    async def async_device_entities(self, entity_id: str, domain: str) -> List[str]:
+        """Entities of a domain on the same device as entity_id"""
+        await self._async_index()
+        _prefix = f"{domain}."
+        return sorted(e for e in self._by_device.get(self._device_of.get(entity_id), []) if e.startswith(_prefix))
+
+    async def async_alarm_entities(self, lock: str) -> Dict[str, Tuple[List[str], Optional[str]]]:
+        """Candidates for each alarm option of a lock and the one to select.
+
+        The sensors of the lock's device are offered with the likely alarm
+        sensors first. A lock without a device is offered every alarm sensor
+        and none is selected.
+        """
+        _sensors = await self.async_device_entities(lock, SENSOR_DOMAIN)
+        _all = _sensors or await self.async_entities(SENSOR_DOMAIN)
+        _results = {}
+        for _option, _keys in ALARM_KEYS.items():
+            _matches = [e for e in _all if any(k in e for k in _keys)]
+            _others = [e for e in _sensors if e not in _matches]
+            _results[_option] = (_matches + _others, _matches[0] if _matches and _sensors else None)
+        return _results
+
+
+@callback
+def get_discovery(hass: HomeAssistant) -> EntityDiscovery:
+    """The shared discovery cache, created on first use"""
+    if DISCOVERY not in hass.data:
+        hass.data[DISCOVERY] = EntityDiscovery(hass)
+    return hass.data[DISCOVERY]
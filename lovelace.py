@@ -0,0 +1,151 @@
+"""Lovelace dashboard generation.
+
+The dashboard has a view per lock. A view only depends on the lock's options,
+so each rendered view is cached under a hash of them and only the views of
+locks whose options changed are rendered again. The file is written a view at
+a time in the executor and swapped in when complete.
+"""
+import hashlib
+import json
+import logging
+import os
+
+from typing import AsyncIterator, Dict, Iterable, List, Tuple
+
+import yaml
+
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    CONF_ALARM_LEVEL,
+    CONF_ALARM_TYPE,
+    CONF_ENTITY_ID,
+    CONF_LOCK_NAME,
+    CONF_LOCK_NAME_SAFE,
+    CONF_SENSOR_NAME,
+    CONF_SLOTS,
+    CONF_START,
+)
+
+FORMAT_YAML = "yaml"
+FORMAT_JSON = "json"
+LOVELACE_FORMATS = [FORMAT_YAML, FORMAT_JSON]
+
+DEFAULT_LOVELACE_FILE = "lock_manager_lovelace.yaml"
+DASHBOARD_TITLE = "Lock Manager"
+# Slots per entities card, a single card with hundreds of rows is slow to render
+SLOTS_PER_CARD = 50
+# Door sensor the config flow uses when there is none
+NO_DOOR_SENSOR = "binary_sensor.fake"
+
+# Options a view is built from
+VIEW_OPTIONS = (
+    CONF_ENTITY_ID, CONF_LOCK_NAME, CONF_LOCK_NAME_SAFE, CONF_SENSOR_NAME,
+    CONF_ALARM_TYPE, CONF_ALARM_LEVEL, CONF_SLOTS, CONF_START,
+)
+
+_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def lovelace_format(path: str, fmt: str = None) -> str:
+    """Format from the argument or the file extension"""
+    if fmt:
+        return fmt
+    return FORMAT_JSON if path.lower().endswith(".json") else FORMAT_YAML
+
+
+def _options_hash(data: dict) -> str:
+    return hashlib.sha1(json.dumps([data.get(k) for k in VIEW_OPTIONS], default=str).encode()).hexdigest()
+
+
+def build_view(data: dict) -> dict:
+    """The view of one lock"""
+    _safe_name = data[CONF_LOCK_NAME_SAFE]
+    _lock_entities = [data[CONF_ENTITY_ID]]
+    for _option in (CONF_SENSOR_NAME, CONF_ALARM_TYPE, CONF_ALARM_LEVEL):
+        if data.get(_option) and data[_option] != NO_DOOR_SENSOR:
+            _lock_entities.append(data[_option])
+
+    _cards = [{"type": "entities", "title": data[CONF_LOCK_NAME], "entities": _lock_entities}]
+    _first = data[CONF_START]
+    _last = _first + data[CONF_SLOTS] - 1
+    for _start in range(_first, _last + 1, SLOTS_PER_CARD):
+        _end = min(_start + SLOTS_PER_CARD - 1, _last)
+        _cards.append({
+            "type": "entities",
+            "title": f"Slots {_start}-{_end}",
+            "show_header_toggle": False,
+            "entities": [
+                {"entity": f"sensor.{_safe_name}_code_slot_{slot}", "name": f"Slot {slot}"}
+                for slot in range(_start, _end + 1)
+            ],
+        })
+    return {"title": data[CONF_LOCK_NAME], "path": _safe_name, "cards": _cards}
+
+
+def _render(data: dict, fmt: str) -> str:
+    """Build and render a view, runs in the executor"""
+    _view = build_view(data)
+    if fmt == FORMAT_JSON:
+        return json.dumps(_view)
+    return yaml.dump([_view], Dumper=_DUMPER, default_flow_style=False, sort_keys=False)
+
+
+def _write(path: str, chunks: List[str], first: bool) -> None:
+    with open(path, "w" if first else "a") as f:
+        f.writelines(chunks)
+
+
+class LovelaceGenerator:
+    """Rendered views by config entry, kept while the entry's options hash is unchanged"""
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._views: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+    def remove(self, entry_id: str) -> None:
+        for _key in [k for k in self._views if k[0] == entry_id]:
+            del self._views[_key]
+
+    async def async_view(self, entry_id: str, data: dict, fmt: str) -> Tuple[str, bool]:
+        """The rendered view of a lock and whether it came from the cache"""
+        _hash = _options_hash(data)
+        _cached = self._views.get((entry_id, fmt))
+        if _cached and _cached[0] == _hash:
+            return _cached[1], True
+        _text = await self._hass.async_add_executor_job(_render, dict(data), fmt)
+        self._views[(entry_id, fmt)] = (_hash, _text)
+        return _text, False
+
+    async def _async_chunks(self, entries: Iterable[Tuple[str, dict]], fmt: str,
+                            summary: dict) -> AsyncIterator[str]:
+        if fmt == FORMAT_JSON:
+            yield json.dumps({"title": DASHBOARD_TITLE})[:-1] + ', "views": ['
+        else:
+            yield f"title: {DASHBOARD_TITLE}\nviews:\n"
+        for _i, (_entry_id, _data) in enumerate(entries):
+            _text, _cached = await self.async_view(_entry_id, _data, fmt)
+            summary["cached" if _cached else "rendered"] += 1
+            yield (", " if _i and fmt == FORMAT_JSON else "") + _text
+        if fmt == FORMAT_JSON:
+            yield "]}\n"
+
+    async def async_write(self, path: str, entries: Iterable[Tuple[str, dict]], fmt: str = None) -> dict:
+        """Write the dashboard of the (entry_id, options) pairs, returns a summary"""
+        fmt = lovelace_format(path, fmt)
+        _summary = {"path": path, "format": fmt, "rendered": 0, "cached": 0, "bytes": 0}
+        _partial = f"{path}.partial"
+        _first = True
+        try:
+            async for _chunk in self._async_chunks(entries, fmt, _summary):
+                await self._hass.async_add_executor_job(_write, _partial, [_chunk], _first)
+                _summary["bytes"] += len(_chunk)
+                _first = False
+            await self._hass.async_add_executor_job(os.replace, _partial, path)
+        except OSError as err:
+            _LOGGER.error(f"Unable to write {path}: {err}")
+            _summary["error"] = str(err)
+        _summary["locks"] = _summary["rendered"] + _summary["cached"]
+        return _summary
@@ -0,0 +1,194 @@
+"""Runtime performance metrics for Lock Manager"""
+import time
+
+from bisect import bisect_left
+from typing import Dict, Optional, Sequence
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# A code reaches the lock in seconds but is only read back on a poll, minutes apart when idle
+CONVERGENCE_BUCKETS = (
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+    120.0, 300.0, 600.0, 1800.0, 3600.0,
+)
+
+# Metric names
+METRIC_POLL = "poll_duration"
+METRIC_ZWAVE_SET = "zwave_set_latency"
+METRIC_ZWAVE_CLEAR = "zwave_clear_latency"
+METRIC_EVENT = "event_latency"
+METRIC_NOTIFY = "notification_time"
+METRIC_WRITE_QUEUE = "write_queue"
+METRIC_OUT_OF_SYNC = "out_of_sync_slots"
+METRIC_CONVERGENCE = "convergence_time"
+METRIC_CONVERGING = "converging_slots"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, recording is a bisect and a few adds"""
+
+    __slots__ = ("buckets", "counts", "count", "total", "max")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile"""
+        if not self.count:
+            return 0.0
+        rank = p * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def as_dict(self) -> dict:
+        """Summary in milliseconds"""
+        return {
+            "count": self.count,
+            "mean": round(self.mean * 1000, 3),
+            "p50": round(self.percentile(0.50) * 1000, 3),
+            "p95": round(self.percentile(0.95) * 1000, 3),
+            "p99": round(self.percentile(0.99) * 1000, 3),
+            "max": round(self.max * 1000, 3),
+            "buckets": dict(zip([*self.buckets, "inf"], self.counts)),
+        }
+
+
+class PendingSync:
+    """A slot waiting for the lock to report the code it should have"""
+
+    __slots__ = ("code", "desired_at", "sent_at", "writes")
+
+    def __init__(self, code: Optional[int], desired_at: float):
+        self.code = code
+        self.desired_at = desired_at
+        self.sent_at: Optional[float] = None
+        self.writes = 0
+
+
+class LockMetrics:
+    """Metrics kept for a single lock.
+
+    A slot is converging from the moment its desired code changes until a
+    read-back reports that code. Writes repeated for the same code, after a
+    lost frame or a dirty read, count as retries of the same convergence.
+    """
+
+    __slots__ = (
+        "poll", "zwave_set", "zwave_clear", "event", "write_queue", "out_of_sync",
+        "convergence", "read_back", "retries", "pending",
+    )
+
+    def __init__(self):
+        self.poll = Histogram()
+        self.zwave_set = Histogram()
+        self.zwave_clear = Histogram()
+        self.event = Histogram()
+        self.write_queue = 0
+        self.out_of_sync = 0
+        # Desired change to confirmed, and last write to confirmed
+        self.convergence = Histogram(CONVERGENCE_BUCKETS)
+        self.read_back = Histogram(CONVERGENCE_BUCKETS)
+        self.retries = 0
+        self.pending: Dict[int, PendingSync] = {}
+
+    @property
+    def converging(self) -> int:
+        return len(self.pending)
+
+    def sync_desired(self, slot: int, code: Optional[int], now: float) -> None:
+        """The slot should now hold code, None for an empty slot"""
+        _pending = self.pending.get(slot)
+        if _pending is None or _pending.code != code:
+            self.pending[slot] = PendingSync(code, now)
+
+    def sync_sent(self, slot: int, now: float) -> None:
+        _pending = self.pending.get(slot)
+        if _pending:
+            _pending.sent_at = now
+            _pending.writes += 1
+            if _pending.writes > 1:
+                self.retries += 1
+
+    def sync_check(self, slot: int, code: Optional[int], now: float) -> None:
+        """A read-back of the slot, completes its convergence if it reports the desired code"""
+        _pending = self.pending.get(slot)
+        if _pending is None or _pending.code != code:
+            return
+        del self.pending[slot]
+        self.convergence.record(now - _pending.desired_at)
+        if _pending.sent_at is not None:
+            self.read_back.record(now - _pending.sent_at)
+
+    def sync_forget(self, slot: int) -> None:
+        self.pending.pop(slot, None)
+
+    def as_dict(self) -> dict:
+        _now = time.monotonic()
+        return {
+            METRIC_POLL: self.poll.as_dict(),
+            METRIC_ZWAVE_SET: self.zwave_set.as_dict(),
+            METRIC_ZWAVE_CLEAR: self.zwave_clear.as_dict(),
+            METRIC_EVENT: self.event.as_dict(),
+            METRIC_WRITE_QUEUE: self.write_queue,
+            METRIC_OUT_OF_SYNC: self.out_of_sync,
+            METRIC_CONVERGENCE: self.convergence.as_dict(),
+            "read_back_time": self.read_back.as_dict(),
+            "write_retries": self.retries,
+            METRIC_CONVERGING: self.converging,
+            "converging_unsent": sum(1 for p in self.pending.values() if p.sent_at is None),
+            "oldest_converging_s": round(_now - min(p.desired_at for p in self.pending.values()), 3)
+            if self.pending else None,
+        }
+
+
+class CoordinatorMetrics:
+    """All metrics kept by the coordinator"""
+
+    def __init__(self):
+        self.locks: Dict[str, LockMetrics] = {}
+        self.notify: Dict[str, Histogram] = {}
+
+    def lock(self, entry_id: str) -> LockMetrics:
+        _metrics = self.locks.get(entry_id)
+        if _metrics is None:
+            _metrics = self.locks[entry_id] = LockMetrics()
+        return _metrics
+
+    def notifier(self, service: str) -> Histogram:
+        _histogram = self.notify.get(service)
+        if _histogram is None:
+            _histogram = self.notify[service] = Histogram()
+        return _histogram
+
+    def remove(self, entry_id: str) -> None:
+        self.locks.pop(entry_id, None)
+
+    def as_dict(self) -> dict:
+        return {
+            "locks": {k: v.as_dict() for k, v in self.locks.items()},
+            METRIC_NOTIFY: {k: v.as_dict() for k, v in self.notify.items()},
+        }
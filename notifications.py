@@ -0,0 +1,160 @@
+"""Background delivery of Lock Manager notifications"""
+import asyncio
+import logging
+import time
+
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import NOTIFY_DOMAIN
+from .metrics import CoordinatorMetrics
+
+# Identical messages to a notifier within this many seconds are dropped
+DEDUPE_WINDOW = 60
+# Messages a notifier may send back to back, refilled at RATE_LIMIT per second
+RATE_BURST = 5
+RATE_LIMIT = 10 / 60
+# Messages waiting per notifier before the oldest are dropped
+MAX_BACKLOG = 100
+# Recent messages remembered before expired ones are pruned
+MAX_RECENT = 1000
+
+PERSISTENT_NOTIFICATION = "persistent_notification"
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class NotifierQueue:
+    """Pending messages, rate limit and counters of one notifier"""
+
+    __slots__ = (
+        "pending", "limited", "digest", "tokens", "updated", "task",
+        "sent", "failed", "digests", "dropped_duplicate", "dropped_overflow",
+    )
+
+    def __init__(self, limited: bool = True):
+        self.pending: Deque[str] = deque()
+        self.limited = limited
+        self.digest = 0
+        self.tokens = float(RATE_BURST)
+        self.updated = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.failed = 0
+        self.digests = 0
+        self.dropped_duplicate = 0
+        self.dropped_overflow = 0
+
+    def take(self) -> float:
+        """Take a token, returns the seconds to wait if there is none"""
+        now = time.monotonic()
+        self.tokens = min(RATE_BURST, self.tokens + (now - self.updated) * RATE_LIMIT)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / RATE_LIMIT
+
+    def as_dict(self) -> dict:
+        return {
+            "backlog": len(self.pending),
+            "sent": self.sent,
+            "failed": self.failed,
+            "digests": self.digests,
+            "dropped_duplicate": self.dropped_duplicate,
+            "dropped_overflow": self.dropped_overflow,
+        }
+
+
+class NotificationQueue:
+    """Queues notifications and delivers them from one worker task per notifier.
+
+    Enqueueing never waits on a notifier, so event handlers return straight
+    away however slow the notify service is.
+    """
+
+    def __init__(self, hass: HomeAssistant, metrics: CoordinatorMetrics):
+        self._hass = hass
+        self._metrics = metrics
+        self._notifiers: Dict[str, NotifierQueue] = {}
+        self._recent: Dict[Tuple[str, str], float] = {}
+
+    def _queue(self, service: str) -> NotifierQueue:
+        _queue = self._notifiers.get(service)
+        if _queue is None:
+            _queue = self._notifiers[service] = NotifierQueue(service != PERSISTENT_NOTIFICATION)
+        return _queue
+
+    def set_digest(self, service: str, interval: int) -> None:
+        """Batch the messages of a notifier into one every interval seconds, 0 sends them as they come"""
+        self._queue(service).digest = interval
+
+    def stats(self, service: str) -> Optional[dict]:
+        _queue = self._notifiers.get(service)
+        return _queue.as_dict() if _queue else None
+
+    def as_dict(self) -> dict:
+        return {k: v.as_dict() for k, v in self._notifiers.items()}
+
+    @callback
+    def enqueue(self, service: str, message: str) -> bool:
+        """Queue a message, returns False if it was dropped as a repeat"""
+        _queue = self._queue(service)
+        _now = time.monotonic()
+        _key = (service, message)
+        _last = self._recent.get(_key)
+        if _last is not None and _now - _last < DEDUPE_WINDOW:
+            _queue.dropped_duplicate += 1
+            return False
+        self._recent[_key] = _now
+        if len(self._recent) > MAX_RECENT:
+            self._recent = {k: v for k, v in self._recent.items() if _now - v < DEDUPE_WINDOW}
+
+        if len(_queue.pending) >= MAX_BACKLOG:
+            _queue.pending.popleft()
+            _queue.dropped_overflow += 1
+        _queue.pending.append(message)
+        if _queue.task is None:
+            _queue.task = self._hass.loop.create_task(self._async_worker(service, _queue))
+        return True
+
+    async def _async_worker(self, service: str, queue: NotifierQueue) -> None:
+        try:
+            while queue.pending:
+                if queue.digest:
+                    await asyncio.sleep(queue.digest)
+                    _messages = list(queue.pending)
+                    queue.pending.clear()
+                    if len(_messages) > 1:
+                        queue.digests += 1
+                    await self._async_send(service, queue, "\n".join(_messages))
+                    continue
+
+                if queue.limited:
+                    _wait = queue.take()
+                    if _wait:
+                        await asyncio.sleep(_wait)
+                        continue
+                await self._async_send(service, queue, queue.pending.popleft())
+        finally:
+            queue.task = None
+
+    async def _async_send(self, service: str, queue: NotifierQueue, message: str) -> None:
+        _start = time.perf_counter()
+        try:
+            await self._hass.services.async_call(NOTIFY_DOMAIN, service, {"message": message}, blocking=True)
+        except Exception as err:
+            queue.failed += 1
+            _LOGGER.error(f"Unable to notify {service}: {err}")
+            return
+        queue.sent += 1
+        self._metrics.notifier(service).record(time.perf_counter() - _start)
+
+    async def async_stop(self) -> None:
+        """Stop the workers, dropping anything still queued"""
+        for _queue in self._notifiers.values():
+            if _queue.task:
+                _queue.task.cancel()
+            _queue.pending.clear()
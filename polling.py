@@ -0,0 +1,119 @@
+"""Per-lock poll intervals that follow activity and battery"""
+from typing import Dict, Optional
+
+# Seconds between polls of a busy lock, the Updater does not run more often
+ACTIVE_INTERVAL = 30
+# Polls at the active interval after a write or keypad activity before backing off
+ACTIVE_POLLS = 4
+# Longest interval of an idle lock with a good battery
+MAX_INTERVAL = 30 * 60
+
+# Battery states
+BATTERY_OK = 0
+BATTERY_LOW = 1
+BATTERY_CRITICAL = 2
+
+# Intervals are stretched by this factor for each battery state
+BATTERY_FACTOR = {BATTERY_OK: 1, BATTERY_LOW: 4, BATTERY_CRITICAL: 16}
+# battery_level attribute of the lock entity at or below which the battery is low or critical
+BATTERY_LOW_LEVEL = 20
+BATTERY_CRITICAL_LEVEL = 10
+# Seconds a battery alarm holds when the lock reports no battery level
+BATTERY_ALARM_HOLD = 24 * 60 * 60
+
+
+class LockPolling:
+    """Poll schedule and counters of one lock"""
+
+    __slots__ = ("next_at", "idle_polls", "battery", "battery_alarm", "battery_alarm_at", "polls", "skipped")
+
+    def __init__(self):
+        self.next_at = 0.0
+        self.idle_polls = 0
+        self.battery: Optional[int] = None
+        self.battery_alarm = BATTERY_OK
+        self.battery_alarm_at = 0.0
+        self.polls = 0
+        self.skipped = 0
+
+    def battery_state(self, now: float) -> int:
+        """The reported battery level wins, a battery alarm holds for a while otherwise"""
+        if self.battery is not None:
+            if self.battery <= BATTERY_CRITICAL_LEVEL:
+                return BATTERY_CRITICAL
+            return BATTERY_LOW if self.battery <= BATTERY_LOW_LEVEL else BATTERY_OK
+        if now - self.battery_alarm_at < BATTERY_ALARM_HOLD:
+            return self.battery_alarm
+        return BATTERY_OK
+
+    def interval(self, now: float) -> float:
+        _interval = ACTIVE_INTERVAL
+        if self.idle_polls >= ACTIVE_POLLS:
+            _interval = min(ACTIVE_INTERVAL * 2 ** (self.idle_polls - ACTIVE_POLLS + 1), MAX_INTERVAL)
+        return _interval * BATTERY_FACTOR[self.battery_state(now)]
+
+
+class PollScheduler:
+    """Decides which locks an Updater cycle reads.
+
+    A lock is read on every cycle for ``ACTIVE_POLLS`` cycles after a write or
+    any activity it reports, then the interval doubles each poll up to
+    ``MAX_INTERVAL``. A low or critical battery stretches every interval. Each
+    cycle that reaches a lock counts as a poll a fixed interval would have made.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, LockPolling] = {}
+
+    def _lock(self, entry_id: str) -> LockPolling:
+        _lock = self._locks.get(entry_id)
+        if _lock is None:
+            _lock = self._locks[entry_id] = LockPolling()
+        return _lock
+
+    def remove(self, entry_id: str) -> None:
+        self._locks.pop(entry_id, None)
+
+    def activity(self, entry_id: str) -> None:
+        """The lock was written to or reported activity, read it on the next cycle"""
+        _lock = self._lock(entry_id)
+        _lock.idle_polls = 0
+        _lock.next_at = 0.0
+
+    def battery_alarm(self, entry_id: str, state: int, now: float) -> None:
+        _lock = self._lock(entry_id)
+        _lock.battery_alarm = state
+        _lock.battery_alarm_at = now
+
+    def battery_level(self, entry_id: str, level) -> None:
+        """battery_level attribute of the lock entity, None if it has none"""
+        try:
+            self._lock(entry_id).battery = int(level) if level is not None else None
+        except (TypeError, ValueError):
+            self._lock(entry_id).battery = None
+
+    def due(self, entry_id: str, now: float) -> bool:
+        _lock = self._lock(entry_id)
+        # Cycles are not exactly ACTIVE_INTERVAL apart
+        if now + ACTIVE_INTERVAL / 2 >= _lock.next_at:
+            return True
+        _lock.skipped += 1
+        return False
+
+    def polled(self, entry_id: str, now: float) -> None:
+        _lock = self._lock(entry_id)
+        _lock.polls += 1
+        _lock.idle_polls += 1
+        _lock.next_at = now + _lock.interval(now)
+
+    def as_dict(self, now: float) -> dict:
+        return {
+            entry_id: {
+                "polls": lock.polls,
+                "skipped": lock.skipped,
+                "fixed_interval_polls": lock.polls + lock.skipped,
+                "interval": lock.interval(now),
+                "battery": lock.battery_state(now),
+            }
+            for entry_id, lock in self._locks.items()
+        }
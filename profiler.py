@@ -0,0 +1,136 @@
+"""On-demand profiling of the Lock Manager coordinator"""
+import cProfile
+import io
+import logging
+import pstats
+
+from datetime import datetime
+from typing import Awaitable, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN
+
+# What is being profiled
+PROFILE_CYCLES = "cycles"
+PROFILE_EVENTS = "events"
+
+# Number of functions in the summary
+PROFILE_TOP = 25
+
+EVENT_PROFILE = f"{DOMAIN}_profile"
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CoordinatorProfiler:
+    """Runs cProfile over the next N updater cycles or T seconds of event handling.
+
+    Callers check ``active`` before wrapping their work, so nothing is paid while
+    no profile is running. The profile is enabled only while the wrapped coroutine
+    runs, tasks interleaving with it on the loop are included in the result.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self.active = False
+        self._kind = None
+        self._profile: Optional[cProfile.Profile] = None
+        # The profile currently collecting, None between wrapped coroutines
+        self._enabled: Optional[cProfile.Profile] = None
+        self._depth = 0
+        self._remaining = 0
+        self._samples = 0
+        self._timer = None
+
+    def start(self, cycles: int = None, seconds: float = None) -> bool:
+        """Start a profile, returns False if one is already running"""
+        if self.active:
+            _LOGGER.warning("A profile is already running")
+            return False
+
+        # Coroutines of a stopped profile may still be running, _depth stays theirs until they finish
+        self._profile = cProfile.Profile()
+        self._samples = 0
+        if cycles:
+            self._kind = PROFILE_CYCLES
+            self._remaining = cycles
+        else:
+            self._kind = PROFILE_EVENTS
+            self._timer = async_call_later(self._hass, seconds, self._async_timeout)
+        self.active = True
+        _LOGGER.info(f"Profiling the next {cycles} cycles" if cycles else f"Profiling {seconds}s of events")
+        return True
+
+    async def profile(self, kind: str, target: Awaitable):
+        """Await target, profiling it if it is the kind being profiled"""
+        if kind != self._kind:
+            return await target
+
+        # The profile may be stopped, or replaced by a new one, while target runs
+        _profile = self._profile
+        if self._enabled is not _profile:
+            _profile.enable()
+            self._enabled = _profile
+        self._depth += 1
+        try:
+            return await target
+        finally:
+            self._depth -= 1
+            _current = _profile is self._profile
+            if self._depth == 0 and self._enabled is _profile:
+                _profile.disable()
+                self._enabled = None
+            if _current:
+                self._samples += 1
+            if _current and kind == PROFILE_CYCLES:
+                self._remaining -= 1
+                if self._remaining <= 0 and self.active:
+                    await self.async_stop()
+
+    @callback
+    def _async_timeout(self, _now) -> None:
+        self._timer = None
+        if self.active:
+            self._hass.async_create_task(self.async_stop())
+
+    async def async_stop(self) -> None:
+        """Stop the running profile and write the results to the config directory"""
+        if not self.active:
+            return
+
+        self.active = False
+        if self._timer:
+            self._timer()
+            self._timer = None
+        if self._enabled:
+            self._enabled.disable()
+            self._enabled = None
+        _profile, self._profile = self._profile, None
+        _kind, self._kind = self._kind, None
+
+        if not self._samples:
+            _LOGGER.warning(f"Profile finished without capturing any {_kind}")
+            return
+
+        _path = self._hass.config.path(f"{DOMAIN}_{_kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof")
+        _summary = await self._hass.async_add_executor_job(_write_profile, _profile, _path)
+        _LOGGER.info(f"Profile of {self._samples} {_kind} written to {_path}\n{_summary}")
+        self._hass.bus.async_fire(EVENT_PROFILE, {
+            "path": _path,
+            "kind": _kind,
+            "samples": self._samples,
+            "summary": _summary,
+        })
+
+
+def _write_profile(profile: cProfile.Profile, path: str) -> str:
+    """Dump the stats and a text summary of the top functions, runs in the executor"""
+    profile.dump_stats(path)
+    _stream = io.StringIO()
+    pstats.Stats(profile, stream=_stream).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP)
+    _summary = _stream.getvalue()
+    with open(f"{path}.txt", "w") as f:
+        f.write(_summary)
+    return _summary
@@ -0,0 +1,241 @@
+"""Replay of a recorded trace through the coordinator.
+
+Loads the trace's entries and slots into ``LockManagerCoordinator`` on the
+benchmark's fake hass with a simulated lock network, then pushes every state
+change and service call back through it, at the recorded pace or as fast as
+possible. Reports the throughput, the latency of each handler and the Z-Wave
+commands the coordinator sent, so runs against a changed tree can be compared.
+
+    python -m custom_components.lock_manager.replay trace.jsonl --output replay.json
+    python -m custom_components.lock_manager.replay trace.jsonl --speed 1
+    python -m custom_components.lock_manager.replay trace.jsonl --baseline old_replay.json
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+import tempfile
+import time
+
+from typing import Dict, List, Optional
+
+from . import (
+    ATTR_NODE_ID,
+    DEVICES_WITH_EVENTS,
+    ENTRY_ID,
+    LOCK_MANUFACTURER,
+    LOCK_MODEL,
+    SENSORS,
+    LockManagerCoordinator,
+)
+from .benchmark import FakeConfigEntry, FakeHass, _summary, compare
+from .const import (
+    DOMAIN,
+    ATTR_ENTITY_ID,
+    CONF_ENTITY_ID,
+    CONF_LOCK_NAME_SAFE,
+    CONF_SLOTS,
+    CONF_START,
+)
+from .simulator import SimulatedNetwork
+from .trace import RECORD_HEADER, RECORD_SERVICE, RECORD_STATE, read_trace
+
+# Simulated network actions that are commands sent to a lock
+COMMAND_ACTIONS = ("write", "send_value")
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TraceReplay:
+    """A fake hass and simulated network loaded with the state at the start of a trace"""
+
+    def __init__(self, records: List[dict], config_dir: str, speed: float = 0.0):
+        if not records or records[0].get("type") != RECORD_HEADER:
+            raise ValueError("The trace does not start with a header")
+        self.header = records[0]
+        self.records = records[1:]
+        self.speed = speed
+        self.hass = FakeHass(config_dir=config_dir)
+        self.network = SimulatedNetwork(self.hass)
+        self.coordinator: Optional[LockManagerCoordinator] = None
+        self.entries = []
+        # Watched entity -> the option it is watched for, which picks its handler
+        self.handlers: Dict[str, str] = {}
+        self._nodes: Dict[str, int] = {}
+
+        for _entry in self.header["entries"]:
+            _data = _entry["data"]
+            _device = _entry["device"]
+            _node = self.network.add_lock(
+                _data[CONF_ENTITY_ID],
+                slots=_data[CONF_START] + _data[CONF_SLOTS] - 1,
+                manufacturer=_device[LOCK_MANUFACTURER],
+                model=_device[LOCK_MODEL],
+            )
+            self._nodes[_node.entity_id] = _node.node_id
+            self.hass.registry.add(_node.entity_id, _node.manufacturer, _node.model)
+            self.entries.append(FakeConfigEntry(_entry[ENTRY_ID], _data))
+            for _option in DEVICES_WITH_EVENTS:
+                if _data.get(_option):
+                    self.handlers[_data[_option]] = _option
+
+    async def async_setup(self) -> None:
+        self.network.install()
+        self.coordinator = LockManagerCoordinator(self.hass)
+        self.hass.data[DOMAIN] = self.coordinator
+        for entry in self.entries:
+            await self.coordinator.load_entry(entry)
+        await self.hass.async_block_till_done()
+
+        for _entry in self.header["entries"]:
+            _sensors = self.coordinator.entries[_entry[ENTRY_ID]][SENSORS]
+            _safe_name = _entry["data"][CONF_LOCK_NAME_SAFE]
+            for _slot in _entry["slots"]:
+                _sensor = _sensors.get(f"sensor.{_safe_name}_code_slot_{_slot['slot']}")
+                if _sensor:
+                    _sensor._set_count(_slot["count"])
+                    await _sensor.update_settings(_slot["settings"], enabled=_slot["enabled"])
+        await self.hass.async_block_till_done()
+        self.coordinator.updater.enable()
+
+        # Only what the trace causes is reported
+        self.network.log.clear()
+        for _stat in self.network.stats:
+            self.network.stats[_stat] = 0
+
+    async def _state(self, record: dict) -> None:
+        _attributes = dict(record["attributes"] or {})
+        if record[ATTR_ENTITY_ID] in self._nodes:
+            # The Updater finds the lock by the node id of its state
+            _attributes[ATTR_NODE_ID] = self._nodes[record[ATTR_ENTITY_ID]]
+        self.hass.states.async_set(record[ATTR_ENTITY_ID], record["state"], _attributes, force_update=True)
+        await self.hass.async_block_till_done()
+
+    async def _service(self, record: dict) -> None:
+        await self.hass.services.async_call(DOMAIN, record["service"], record["data"], blocking=True)
+        await self.hass.async_block_till_done()
+
+    async def async_run(self) -> dict:
+        """Push the trace through the coordinator and report on it"""
+        _loop = self.hass.loop
+        _samples: Dict[str, List[float]] = {}
+        _counts = {RECORD_STATE: 0, RECORD_SERVICE: 0}
+        _replay_start = _loop.time()
+        _start = time.perf_counter()
+
+        for _record in self.records:
+            if self.speed:
+                _delay = _replay_start + _record["t"] / self.speed - _loop.time()
+                if _delay > 0:
+                    await asyncio.sleep(_delay)
+
+            if _record["type"] == RECORD_STATE:
+                if _record["state"] is None:
+                    continue
+                _handler = self.handlers.get(_record[ATTR_ENTITY_ID], "unwatched")
+                _call = self._state(_record)
+            elif _record["type"] == RECORD_SERVICE:
+                _handler = f"service.{_record['service']}"
+                _call = self._service(_record)
+            else:
+                continue
+
+            _t = time.perf_counter()
+            await _call
+            _samples.setdefault(_handler, []).append(time.perf_counter() - _t)
+            _counts[_record["type"]] += 1
+
+        _elapsed = time.perf_counter() - _start
+        _entities = {n.node_id: n.entity_id for n in self.network.nodes.values()}
+        _commands = [
+            [round((t - _replay_start) * 1000, 3), action, _entities[node_id], slot, code]
+            for t, action, node_id, slot, code in self.network.log if action in COMMAND_ACTIONS
+        ]
+        _events = _counts[RECORD_STATE] + _counts[RECORD_SERVICE]
+        return {
+            "results": {
+                "state_events": _counts[RECORD_STATE],
+                "service_calls": _counts[RECORD_SERVICE],
+                "replay_ms": _elapsed * 1000,
+                "events_per_s": _events / _elapsed if _elapsed else 0,
+                "handlers": {k: _summary(v) for k, v in sorted(_samples.items())},
+                "zwave": {**self.network.stats, "commands": len(_commands)},
+            },
+            "commands_digest": command_digest(_commands),
+            "commands": _commands,
+        }
+
+    async def async_teardown(self) -> None:
+        await self.hass.async_block_till_done()
+        self.network.uninstall()
+
+
+def command_digest(commands: List[list]) -> str:
+    """Hash of the command sequence without its timing"""
+    return hashlib.sha1(json.dumps([c[1:] for c in commands]).encode()).hexdigest()
+
+
+def first_difference(current: List[list], baseline: List[list]) -> Optional[str]:
+    """Where two command sequences part, None if they are the same"""
+    for i, (new, old) in enumerate(zip(current, baseline)):
+        if new[1:] != old[1:]:
+            return f"command {i}: {old[1:]} -> {new[1:]}"
+    if len(current) != len(baseline):
+        return f"{len(baseline)} commands -> {len(current)}"
+    return None
+
+
+async def replay(path: str, speed: float = 0.0) -> dict:
+    """Replay a trace file on a fresh fake hass"""
+    with tempfile.TemporaryDirectory() as _config_dir:
+        _replay = TraceReplay(read_trace(path), _config_dir, speed)
+        await _replay.async_setup()
+        try:
+            return await _replay.async_run()
+        finally:
+            await _replay.async_teardown()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a Lock Manager trace")
+    parser.add_argument("trace")
+    parser.add_argument("--output", default="replay_output.json")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Multiple of the recorded pace, 0 replays as fast as possible")
+    parser.add_argument("--baseline", help="Previous replay to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.CRITICAL)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        report = loop.run_until_complete(replay(args.trace, args.speed))
+    finally:
+        loop.close()
+
+    report["meta"] = {"timestamp": time.time(), "trace": args.trace, "speed": args.speed}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    _results = report["results"]
+    print(f"{_results['state_events']} state changes, {_results['service_calls']} service calls, "
+          f"{_results['events_per_s']:.0f}/s, {_results['zwave']['commands']} zwave commands")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        _difference = first_difference(report["commands"], baseline["commands"])
+        if _difference:
+            regressions.append(f"zwave commands differ at {_difference}")
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
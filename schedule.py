@@ -0,0 +1,63 @@
+"""Slot schedules parsed once instead of on every evaluation"""
+import datetime
+
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from .const import (
+    ATTR_BEGIN_DATE,
+    ATTR_DAYS,
+    ATTR_DAYS_OF_WEEK,
+    ATTR_ENABLED,
+    ATTR_END_DATE,
+    ATTR_END_TIME,
+    ATTR_INCLUSIVE,
+    ATTR_SEN_SET_BY_DATE_RANGE,
+    ATTR_SEN_SET_BY_DOW,
+    ATTR_START_TIME,
+)
+
+# Day names by datetime.weekday(), strftime("%A") follows the locale
+WEEKDAYS = (*ATTR_DAYS_OF_WEEK[1:], ATTR_DAYS_OF_WEEK[0])
+
+# (start, end, inclusive) of a day
+DayWindow = Tuple[datetime.time, datetime.time, bool]
+
+
+class Schedule(NamedTuple):
+    """Enabled restrictions of a slot, None when a restriction is off"""
+    dates: Optional[Tuple[datetime.date, datetime.date]]
+    days: Optional[Dict[str, DayWindow]]
+
+
+NO_SCHEDULE = Schedule(None, None)
+
+
+def compile_schedule(settings: Optional[dict]) -> Schedule:
+    """Parse the date range and day of week settings of validated slot settings.
+
+    The schema stores dates and times as ISO strings, which fromisoformat reads
+    much faster than strptime.
+    """
+    _dates = None
+    _days = None
+    _by_date_range = (settings or {}).get(ATTR_SEN_SET_BY_DATE_RANGE)
+    if _by_date_range and _by_date_range[ATTR_ENABLED]:
+        _dates = (
+            datetime.date.fromisoformat(_by_date_range[ATTR_BEGIN_DATE]),
+            datetime.date.fromisoformat(_by_date_range[ATTR_END_DATE]),
+        )
+
+    _by_dow = (settings or {}).get(ATTR_SEN_SET_BY_DOW)
+    if _by_dow and _by_dow[ATTR_ENABLED]:
+        _days = {
+            day: (
+                datetime.time.fromisoformat(window[ATTR_START_TIME]),
+                datetime.time.fromisoformat(window[ATTR_END_TIME]),
+                window[ATTR_INCLUSIVE],
+            )
+            for day, window in _by_dow[ATTR_DAYS].items()
+        }
+
+    if _dates is None and _days is None:
+        return NO_SCHEDULE
+    return Schedule(_dates, _days)
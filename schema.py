@@ -2,13 +2,19 @@ import voluptuous as vol
 import homeassistant.helpers.config_validation as cv
 
 from .const import (
+    ATTR_ASSIGNMENTS,
     ATTR_BEGIN_DATE,
+    ATTR_CODE,
+    ATTR_CONCURRENCY,
     ATTR_DAYS,
     ATTR_DAYS_OF_WEEK,
     ATTR_ENABLED,
     ATTR_END_DATE,
     ATTR_END_TIME,
+    ATTR_CODE_SLOT,
     ATTR_ENTITY_ID,
+    ATTR_LOCK,
+    ATTR_NAME,
     ATTR_INCLUSIVE,
     ATTR_LIMIT,
     ATTR_SEN_SET_BY_ACCESS_COUNT,
@@ -22,7 +28,11 @@ from .const import (
     ATTR_SENSOR_ICON,
     ATTR_SENSOR_SETTINGS,
     ATTR_SENSOR_SLOT_ENABLED,
+    ATTR_SLOTS,
     ATTR_START_TIME,
+    ATTR_USER_ID,
+    DEFAULT_CONCURRENCY,
+    LOCK_DOMAIN,
 )
 
 ACCESS_COUNT_SCHEMA = vol.Schema({
@@ -72,3 +82,57 @@ SLOT_SETTINGS_SCHEMA = vol.Schema({
     vol.Required(ATTR_ENTITY_ID): vol.All(cv.entity_id, vol.Match(r'^sensor\..*_code_slot_\d*$')),
     vol.Required(ATTR_SENSOR_SETTINGS): vol.Schema(CODE_SENSOR_SETTINGS_SCHEMA)
 })
+
+# Settings are validated per item so one bad entry does not reject the whole batch
+SLOT_TARGET_SCHEMA = vol.All(vol.Schema({
+    vol.Exclusive(ATTR_ENTITY_ID, "target"): vol.All(cv.entity_id, vol.Match(r'^sensor\..*_code_slot_\d*$')),
+    vol.Exclusive(ATTR_LOCK, "target"): cv.entity_domain(LOCK_DOMAIN),
+    vol.Optional(ATTR_CODE_SLOT): vol.Coerce(int),
+    vol.Required(ATTR_SENSOR_SETTINGS): dict,
+    vol.Optional(ATTR_SENSOR_SLOT_ENABLED): bool,
+}), cv.has_at_least_one_key(ATTR_ENTITY_ID, ATTR_LOCK), vol.Any(
+    vol.Schema({vol.Required(ATTR_ENTITY_ID): str}, extra=vol.ALLOW_EXTRA),
+    vol.Schema({vol.Required(ATTR_CODE_SLOT): int}, extra=vol.ALLOW_EXTRA),
+    msg="A lock needs a code_slot",
+))
+
+# Items are checked one by one in update_slots, a list of many thousands is not walked here
+UPDATE_SLOTS_SCHEMA = vol.Schema({
+    vol.Required(ATTR_SLOTS): cv.ensure_list,
+})
+
+ASSIGNMENT_SCHEMA = vol.Schema({
+    vol.Required(ATTR_LOCK): cv.entity_domain(LOCK_DOMAIN),
+    vol.Required(ATTR_CODE_SLOT): vol.Coerce(int),
+})
+
+# Settings hold the schedule, the code and name come from the user
+SET_USER_SCHEMA = vol.Schema({
+    vol.Required(ATTR_USER_ID): cv.string,
+    vol.Required(ATTR_NAME): cv.string,
+    vol.Required(ATTR_CODE): vol.Coerce(int),
+    vol.Optional(ATTR_SENSOR_SETTINGS, default={}): dict,
+    vol.Required(ATTR_ASSIGNMENTS): vol.All(cv.ensure_list, [ASSIGNMENT_SCHEMA]),
+    vol.Optional(ATTR_SENSOR_SLOT_ENABLED, default=True): bool,
+    vol.Optional(ATTR_CONCURRENCY, default=DEFAULT_CONCURRENCY): vol.All(vol.Coerce(int), vol.Range(min=1)),
+})
+
+REVOKE_USER_SCHEMA = vol.Schema({
+    vol.Required(ATTR_USER_ID): cv.string,
+    vol.Optional(ATTR_CONCURRENCY, default=DEFAULT_CONCURRENCY): vol.All(vol.Coerce(int), vol.Range(min=1)),
+})
+
+
+def validate_slot_item(item: dict) -> dict:
+    """Validate the target and settings of a single slot item"""
+    _item = SLOT_TARGET_SCHEMA(item)
+    _item[ATTR_SENSOR_SETTINGS] = CODE_SENSOR_SETTINGS_SCHEMA(_item[ATTR_SENSOR_SETTINGS])
+    return _item
+
+
+def validate_slot_entry(index: int, item: dict) -> tuple:
+    """(index, validated item, error) of a bulk item"""
+    try:
+        return index, validate_slot_item(item), None
+    except vol.Invalid as err:
+        return index, None, str(err)
@@ -2,28 +2,57 @@
 
 import logging
 import datetime
+import time
 
 from typing import Any, Dict, Optional
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.typing import StateType
 from homeassistant.core import HomeAssistant, callback
+import homeassistant.util.dt as dt_util
 from .const import (
     DOMAIN,
     CONF_SLOTS, CONF_START, CONF_LOCK_NAME_SAFE, CONF_NOTIFY, CONF_ENTITY_ID,
 
-    ATTR_BEGIN_DATE, ATTR_END_DATE, ATTR_START_TIME, ATTR_INCLUSIVE,
-    ATTR_LIMIT, ATTR_END_TIME, ATTR_ENABLED, ATTR_DAYS,
+    ATTR_LIMIT, ATTR_ENABLED,
     ATTR_SENSOR_SETTINGS, ATTR_SENSOR_SLOT_ENABLED, ATTR_SEN_SET_BY_ACCESS_COUNT, ATTR_SENSOR_COUNT,
-    ATTR_SEN_SET_BY_DATE_RANGE, ATTR_SEN_SET_BY_DOW, ATTR_SEN_SET_LOCK_CODE, ATTR_SEN_SET_NOTIFICATION,
-    ATTR_SEN_SET_USER_NAME,
+    ATTR_SEN_SET_LOCK_CODE, ATTR_SEN_SET_NOTIFICATION, ATTR_SEN_SET_USER_NAME,
 )
 
 from .schema import CODE_SENSOR_SCHEMA, CODE_SENSOR_SETTINGS_SCHEMA
+from .schedule import NO_SCHEDULE, WEEKDAYS, Schedule, compile_schedule
+from .metrics import (
+    Histogram,
+    METRIC_CONVERGENCE,
+    METRIC_CONVERGING,
+    METRIC_EVENT,
+    METRIC_NOTIFY,
+    METRIC_OUT_OF_SYNC,
+    METRIC_POLL,
+    METRIC_WRITE_QUEUE,
+    METRIC_ZWAVE_CLEAR,
+    METRIC_ZWAVE_SET,
+)
 
 # SETTABLE PARAMS
 PARAM_OUT_OF_SYNC_COUNT = 5
 ICON = "mdi:lock-smart"
+ICON_METRIC = "mdi:speedometer"
+UNIT_MILLISECONDS = "ms"
+
+# Diagnostic sensors and the LockMetrics field they read
+METRIC_SENSORS = {
+    METRIC_POLL: "poll",
+    METRIC_ZWAVE_SET: "zwave_set",
+    METRIC_ZWAVE_CLEAR: "zwave_clear",
+    METRIC_EVENT: "event",
+    METRIC_WRITE_QUEUE: "write_queue",
+    METRIC_OUT_OF_SYNC: "out_of_sync",
+    METRIC_CONVERGENCE: "convergence",
+    METRIC_CONVERGING: "converging",
+    METRIC_NOTIFY: None,
+}
 
 # STATUSES
 STATUS_UNKNOWN = "Unknown"
@@ -34,6 +63,7 @@ STATUS_NOT_TIME_PERIOD = "This user does not have permission during this time."
 STATUS_NOT_DATE = "This user does not have permission on this date."
 STATUS_COUNT_EXCEEDED = "This user has reached the amount of allowed logins."
 STATUS_DISABLED = "This user has been disabled."
+STATUS_LOCKDOWN = "Codes are suspended after repeated failed attempts."
 
 # STATES
 STATE_ENABLED = "Enabled"
@@ -52,6 +82,10 @@ async def async_setup_entry(hass, entry: ConfigEntry, async_add_entities):
     for x in range(_start_from, _start_from + _slots):
         _entities.append(CodeSensor(hass, entry, x))
 
+    for metric in METRIC_SENSORS:
+        _entities.append(MetricSensor(hass, entry, metric))
+
+    hass.data[DOMAIN].set_entity_adder(entry, async_add_entities)
     async_add_entities(_entities, True)
 
 
@@ -67,14 +101,13 @@ class CodeSensor(RestoreEntity):
         self._slot = slot
         self._name = f"{entry.data[CONF_LOCK_NAME_SAFE]}_code_slot_{slot}"
         self._status = STATUS_UNKNOWN
-        self._code = None
 
         self._state = STATE_DISABLE
         self._previous_state = STATE_DISABLE
         self._error_count = 0
         self._zwave_code = None
-
-        self._notify = entry.data[CONF_NOTIFY]
+        # Compiled from the settings when first evaluated, None until then
+        self._schedule: Optional[Schedule] = None
 
         # Helper Functions
         self._coordinator = hass.data[DOMAIN]
@@ -92,6 +125,16 @@ class CodeSensor(RestoreEntity):
         """Return current slot"""
         return self._slot
 
+    @property
+    def entry_id(self) -> str:
+        """Return the config entry of the lock"""
+        return self._entry.entry_id
+
+    @property
+    def out_of_sync(self) -> bool:
+        """Slot and lock disagree on the code"""
+        return self._state == STATE_DIRTY or self._error_count > 0
+
     @property
     def unique_id(self) -> str:
         """Return a unique, Home Assistant friendly identifier for this entity."""
@@ -124,28 +167,60 @@ class CodeSensor(RestoreEntity):
     @property
     def code(self) -> Optional[int]:
         """Returns the current code"""
-        return self._code
+        if ATTR_SENSOR_SETTINGS in self._attrs:
+            return self._attrs[ATTR_SENSOR_SETTINGS][ATTR_SEN_SET_LOCK_CODE]
+        return None
+
+    @property
+    def settings(self) -> Optional[Dict[str, Any]]:
+        """Returns the slot settings"""
+        return self._attrs.get(ATTR_SENSOR_SETTINGS)
+
+    @property
+    def slot_enabled(self) -> bool:
+        """Has the slot been enabled"""
+        return self._attrs[ATTR_SENSOR_SLOT_ENABLED]
 
     @property
     def should_alert(self) -> bool:
         """Should we alert for this user"""
-        try:
+        if ATTR_SENSOR_SETTINGS in self._attrs:
             return self._attrs[ATTR_SENSOR_SETTINGS][ATTR_SEN_SET_NOTIFICATION]
-        finally:
-            return False
+        return False
+
+    @property
+    def count(self) -> int:
+        """Accesses counted against the slot's limit"""
+        return self._attrs[ATTR_SENSOR_COUNT]
+
+    @property
+    def granted(self) -> bool:
+        """Does the slot currently grant access"""
+        return self._status == STATUS_GRANTED
 
     @property
     def user_name(self) -> str:
         """User's Name"""
-        try:
+        if ATTR_SENSOR_SETTINGS in self._attrs:
             return self._attrs[ATTR_SENSOR_SETTINGS][ATTR_SEN_SET_USER_NAME]
-        finally:
-            return ""
-
-    async def update_settings(self, settings):
-        _attrs = CODE_SENSOR_SCHEMA(self._attrs)
-        _attrs[ATTR_SENSOR_SETTINGS] = CODE_SENSOR_SETTINGS_SCHEMA(settings)
+        return ""
+
+    def _index_code(self) -> None:
+        """Keep the coordinator's code index in step with the settings"""
+        self._coordinator.code_index.update(
+            self.entry_id, self._slot, self.code, self._coordinator.slot_owner(self.entry_id, self._slot)
+        )
+
+    async def update_settings(self, settings, validated: bool = False, enabled: Optional[bool] = None,
+                              schedule: Optional[Schedule] = None):
+        """Replace the settings, schedule is the compiled schedule of already validated settings"""
+        _attrs = dict(self._attrs) if validated else CODE_SENSOR_SCHEMA(self._attrs)
+        _attrs[ATTR_SENSOR_SETTINGS] = settings if validated else CODE_SENSOR_SETTINGS_SCHEMA(settings)
+        if enabled is not None:
+            _attrs[ATTR_SENSOR_SLOT_ENABLED] = enabled
         self._attrs = _attrs
+        self._schedule = schedule
+        self._index_code()
         await self._check_current_status()
 
     async def enable(self):
@@ -158,36 +233,59 @@ class CodeSensor(RestoreEntity):
         await self._check_current_status()
 
     async def update_code(self, code: int):
-        self._attrs = CODE_SENSOR_SCHEMA({**self._attrs, **{ATTR_SEN_SET_LOCK_CODE: code}})
+        _settings = self.settings or {ATTR_SEN_SET_USER_NAME: ""}
+        self._attrs = CODE_SENSOR_SCHEMA({
+            **self._attrs,
+            ATTR_SENSOR_SETTINGS: {**_settings, ATTR_SEN_SET_LOCK_CODE: code},
+        })
+        self._index_code()
         await self._check_current_status()
 
     async def reset_slot(self):
         self._attrs = CODE_SENSOR_SCHEMA({})
+        self._schedule = None
+        self._set_count(0)
+        self._index_code()
         await self._check_current_status()
 
     async def reset_code_count(self):
-        self._attrs[ATTR_SENSOR_COUNT] = 0
+        self._set_count(0)
         await self._check_current_status()
 
     async def increment_counter(self):
-        self._attrs[ATTR_SENSOR_COUNT] += 1
-        await self._check_current_status()
+        """Count an access, the slot is only re-evaluated when the count reaches its limit"""
+        self._set_count(self._attrs[ATTR_SENSOR_COUNT] + 1)
+        if self._attrs[ATTR_SENSOR_COUNT] == self._count_limit():
+            await self._check_current_status()
+
+    def _set_count(self, count: int) -> None:
+        """Counts are persisted by the coordinator, not by a state write"""
+        self._attrs[ATTR_SENSOR_COUNT] = count
+        self._coordinator.counters.set(self.unique_id, count)
+        self._coordinator.slot_changed(self)
+
+    def _count_limit(self) -> Optional[int]:
+        _by_count = (self.settings or {}).get(ATTR_SEN_SET_BY_ACCESS_COUNT)
+        if _by_count and _by_count[ATTR_ENABLED]:
+            return _by_count[ATTR_LIMIT]
+        return None
 
     async def zwave_code_check(self, code: str):
         """This is called when the DataUpdater grabs the code from ZWave Manager"""
 
         _code = int(code) if code.isnumeric() else None
+        self._coordinator.metrics.lock(self._entry.entry_id).sync_check(self._slot, _code, time.monotonic())
 
         if self._error_count >= PARAM_OUT_OF_SYNC_COUNT:
-            await self._coordinator.notify(
+            self._coordinator.notify(
                 f"Slot and Lock are out of sync. {self._name} Check Home Assistant logs. We are not going to try and "
                 f"update this slot any further.  Look into the issue and reboot home assistant to reset the counter. ",
-                self._notify, True)
+                self._entry.data[CONF_NOTIFY], True)
         else:
             if ATTR_SENSOR_SETTINGS in self._attrs:
                 self._zwave_code = _code
 
-                if code != self.code and self.state == STATE_ENABLED:
+                if _code != self.code and self.state == STATE_ENABLED:
                     _LOGGER.debug('Slot and Lock out of sync, slot is enabled. Trying to remedy.')
                     self._state = STATE_DIRTY
                     await self._check_current_status()
@@ -215,54 +313,68 @@ class CodeSensor(RestoreEntity):
                 self._state = STATE_UNKNOWN
                 _LOGGER.error("Invalid state set")
 
-    async def _check_current_status(self):
+    async def refresh_status(self, now: datetime.datetime = None):
+        """Re-evaluate the slot after something outside its settings changed, now is shared by a batch"""
+        await self._check_current_status(now)
+
+    async def _check_current_status(self, now: datetime.datetime = None):
         """Determines if this slot should be enabled/disabled"""
+        await self._evaluate_status(now)
+        self._coordinator.slot_changed(self)
+
+    async def _evaluate_status(self, now: datetime.datetime = None):
+        """Schedules are evaluated in HA's time zone at now, the current time by default"""
 
         if ATTR_SENSOR_SETTINGS in self._attrs:
             _settings = self._attrs[ATTR_SENSOR_SETTINGS]
 
+            if self._coordinator.locked_down(self.entry_id):
+                await self._set_state(STATE_DISABLE)
+                self._status = STATUS_LOCKDOWN
+                return
+
             if not self._attrs[ATTR_SENSOR_SLOT_ENABLED]:
                 await self._set_state(STATE_DISABLE)
                 self._status = STATUS_DISABLED
                 return
 
             # Logic for Access Count
-            if ATTR_SEN_SET_BY_ACCESS_COUNT in _settings:
-                _by_count = _settings[ATTR_SEN_SET_BY_ACCESS_COUNT]
-                if _by_count[ATTR_ENABLED] and _by_count[ATTR_LIMIT] >= self._attrs[ATTR_SENSOR_COUNT]:
-                    await self._set_state(STATE_DISABLE)
-                    self._status = STATUS_COUNT_EXCEEDED
-                    return
+            _limit = self._count_limit()
+            if _limit is not None and self._attrs[ATTR_SENSOR_COUNT] >= _limit:
+                await self._set_state(STATE_DISABLE)
+                self._status = STATUS_COUNT_EXCEEDED
+                return
+
+            if self._schedule is None:
+                self._schedule = compile_schedule(_settings)
+            _schedule = self._schedule
+            if _schedule is not NO_SCHEDULE and now is None:
+                now = dt_util.now()
 
             # Logic for Date Range checks
-            if ATTR_SEN_SET_BY_DATE_RANGE in _settings and _settings[ATTR_SEN_SET_BY_DATE_RANGE][ATTR_ENABLED]:
-                _by_date_range = _settings[ATTR_SEN_SET_BY_DATE_RANGE]
-                now = datetime.datetime.now().date()
-                begin_date = datetime.datetime.strptime(_by_date_range[ATTR_BEGIN_DATE], '%Y-%m-%d').date()
-                end_date = datetime.datetime.strptime(_by_date_range[ATTR_END_DATE], '%Y-%m-%d').date()
-                if not (begin_date <= now <= end_date):
+            if _schedule.dates:
+                today = now.date()
+                begin_date, end_date = _schedule.dates
+                if not (begin_date <= today <= end_date):
                     await self._set_state(STATE_DISABLE)
                     self._status = STATUS_NOT_DATE
                     return
 
             # Logic for Day of the Week checks
-            if ATTR_SEN_SET_BY_DOW in _settings and _settings[ATTR_SEN_SET_BY_DOW][ATTR_ENABLED]:
-                _by_dow = _settings[ATTR_SEN_SET_BY_DOW]
-                now = datetime.datetime.now().time()
-                today_name = datetime.datetime.now().strftime("%A").lower()
-
-                if today_name in _by_dow[ATTR_DAYS]:
-                    _dow_attr = _by_dow[ATTR_DAYS][today_name]
-                    start_time = datetime.datetime.strptime(_dow_attr[ATTR_START_TIME], '%H:%M:%S').time()
-                    end_time = datetime.datetime.strptime(_dow_attr[ATTR_END_TIME], '%H:%M:%S').time()
-                    if _dow_attr[ATTR_INCLUSIVE]:
-                        if not (start_time <= now <= end_time):
+            if _schedule.days is not None:
+                time_of_day = now.time()
+                today_name = WEEKDAYS[now.weekday()]
+
+                if today_name in _schedule.days:
+                    start_time, end_time, inclusive = _schedule.days[today_name]
+                    if inclusive:
+                        if not (start_time <= time_of_day <= end_time):
                             await self._set_state(STATE_DISABLE)
                             self._status = STATUS_NOT_TIME_PERIOD
                             return
 
                     else:
-                        if start_time <= now <= end_time:
+                        if start_time <= time_of_day <= end_time:
                             await self._set_state(STATE_DISABLE)
                             self._status = STATUS_NOT_TIME_PERIOD
                             return
@@ -288,6 +400,12 @@ class CodeSensor(RestoreEntity):
             return
         self._state = _restored_state.state
         self._attrs = CODE_SENSOR_SCHEMA({**self._attrs, **_restored_state.attributes})
+        self._schedule = None
+        # The stored counter is newer than the last state write
+        self._attrs[ATTR_SENSOR_COUNT] = self._coordinator.counters.get(
+            self.unique_id, self._attrs[ATTR_SENSOR_COUNT]
+        )
+        self._index_code()
         await self._check_current_status()
 
     async def async_update(self):
@@ -298,3 +416,64 @@ class CodeSensor(RestoreEntity):
     @callback
     def _schedule_immediate_update(self):
         self.async_schedule_update_ha_state(True)
+
+
+class MetricSensor(Entity):
+    """Diagnostic sensor exposing one of the coordinator's performance metrics"""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, metric: str):
+        self._entry = entry
+        self._metric = metric
+        self._name = f"{entry.data[CONF_LOCK_NAME_SAFE]}_{metric}"
+        self._state = None
+        self._attrs = {}
+        self._coordinator = hass.data[DOMAIN]
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._entry.entry_id}_{self._metric}"
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def icon(self) -> Optional[str]:
+        return ICON_METRIC
+
+    @property
+    def entity_registry_enabled_default(self) -> bool:
+        """Diagnostics are opt-in"""
+        return False
+
+    @property
+    def unit_of_measurement(self) -> Optional[str]:
+        if self._metric in (METRIC_WRITE_QUEUE, METRIC_OUT_OF_SYNC, METRIC_CONVERGING):
+            return None
+        return UNIT_MILLISECONDS
+
+    @property
+    def state(self) -> StateType:
+        return self._state
+
+    @property
+    def device_state_attributes(self) -> Optional[Dict[str, Any]]:
+        return self._attrs
+
+    async def async_update(self):
+        """Read the latest value from the coordinator"""
+        if self._metric == METRIC_NOTIFY:
+            _notifier = self._entry.data[CONF_NOTIFY]
+            _value = self._coordinator.metrics.notify.get(_notifier) if _notifier else None
+            _queue = self._coordinator.notifications.stats(_notifier) if _notifier else None
+        else:
+            _value = getattr(self._coordinator.metrics.lock(self._entry.entry_id), METRIC_SENSORS[self._metric])
+
+        if isinstance(_value, Histogram):
+            self._attrs = _value.as_dict()
+            self._state = self._attrs["p95"]
+        else:
+            self._state = _value
+
+        if self._metric == METRIC_NOTIFY and _queue:
+            self._attrs = {**self._attrs, **_queue}
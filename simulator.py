@@ -0,0 +1,373 @@
+"""Simulated Z-Wave lock network for Lock Manager load testing.
+
+The simulator stands in for the OZW manager in ``hass.data`` and for the
+``ozw.set_usercode`` / ``ozw.clear_usercode`` services, so the coordinator,
+``Updater`` and alarm handlers run unmodified against it.
+"""
+import asyncio
+import logging
+import random
+
+from typing import Dict, List, Optional, Tuple
+
+from homeassistant.components.ozw import DOMAIN as OZW_DOMAIN
+from homeassistant.core import HomeAssistant
+from openzwavemqtt.const import CommandClass
+
+from . import (
+    ATTR_CODE_SLOT,
+    ATTR_NODE_ID,
+    ATTR_USER_CODE,
+    STATUS,
+    ZWAVE_CLEAR_USERCODE,
+    ZWAVE_MANAGER,
+    ZWAVE_SET_USERCODE,
+)
+from .const import ATTR_ENTITY_ID
+
+_LOGGER = logging.getLogger(__name__)
+
+# Network status reported by the simulated instance
+SIM_STATUS_READY = "driverAllNodesQueried"
+
+# Index used by the lock to refresh its user codes
+SIM_REFRESH_INDEX = 255
+
+# Distributions
+DIST_FIXED = "fixed"
+DIST_UNIFORM = "uniform"
+DIST_LOGNORMAL = "lognormal"
+
+# Alarm types emitted by each vendor for common operations
+SIM_ALARMS = {
+    "kwikset": {
+        "keypad_unlock": 19,
+        "keypad_lock": 18,
+        "manual_unlock": 22,
+        "manual_lock": 21,
+        "rf_unlock": 25,
+        "bad_code": 161,
+        "out_of_schedule": 162,
+        "duplicate_code": 113,
+        "battery_low": 167,
+        "battery_critical": 168,
+    },
+    "schlage": {
+        "keypad_unlock": 6,
+        "keypad_lock": 5,
+        "manual_unlock": 2,
+        "manual_lock": 1,
+        "rf_unlock": 4,
+        "duplicate_code": 15,
+    },
+}
+
+# Order in which alarm halves are written
+ORDER_TYPE_FIRST = "type_first"
+ORDER_LEVEL_FIRST = "level_first"
+ORDER_RANDOM = "random"
+
+
+class LatencyModel:
+    """A latency distribution in seconds"""
+
+    def __init__(self, mean: float = 0.0, jitter: float = 0.0, distribution: str = DIST_UNIFORM):
+        self.mean = mean
+        self.jitter = jitter
+        self.distribution = distribution
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw a single latency value"""
+        if self.mean <= 0:
+            return 0.0
+        if self.distribution == DIST_FIXED or not self.jitter:
+            return self.mean
+        if self.distribution == DIST_LOGNORMAL:
+            return rng.lognormvariate(0, self.jitter) * self.mean
+        return max(0.0, rng.uniform(self.mean - self.jitter, self.mean + self.jitter))
+
+
+class SimulatedValue:
+    """A single Z-Wave value, shaped like the ozw and zwave value objects"""
+
+    def __init__(self, node: "SimulatedNode", index: int, value: str = ""):
+        self.node = node
+        self.command_class = CommandClass.USER_CODE
+        self.index = index
+        self.value = value
+        self.value_id_key = (node.node_id << 16) + index
+
+    @property
+    def data(self) -> str:
+        """Legacy zwave name for the value"""
+        return self.value
+
+    def send_value(self, value) -> None:
+        """Refresh request, the simulated lock reports back immediately"""
+        self.node.network.record("send_value", self.node, self.index, value)
+
+
+class SimulatedCommandClass:
+    """The USER_CODE command class of a node"""
+
+    def __init__(self, node: "SimulatedNode"):
+        self._node = node
+
+    def values(self):
+        self._node.network.stats["reads"] += 1
+        self._node.network.stats["values_walked"] += len(self._node.user_codes)
+        return self._node.user_codes.values()
+
+
+class SimulatedNode:
+    """A simulated lock"""
+
+    def __init__(
+            self,
+            network: "SimulatedNetwork",
+            node_id: int,
+            entity_id: str,
+            slots: int = 30,
+            manufacturer: str = "Kwikset",
+            model: str = "914",
+            write_latency: LatencyModel = None,
+            read_latency: LatencyModel = None,
+            drop_rate: float = 0.0,
+            duty_cycle: Optional[tuple] = None,
+    ):
+        self.network = network
+        self.node_id = node_id
+        self.entity_id = entity_id
+        self.manufacturer = manufacturer
+        self.model = model
+        self.write_latency = write_latency or LatencyModel()
+        self.read_latency = read_latency or LatencyModel()
+        self.drop_rate = drop_rate
+        self.duty_cycle = duty_cycle
+        self.sleeping = False
+        self.pending = {}
+        self.user_codes: Dict[int, SimulatedValue] = {
+            i: SimulatedValue(self, i) for i in range(1, slots + 1)
+        }
+        self._refresh = SimulatedValue(self, SIM_REFRESH_INDEX)
+        self._command_class = SimulatedCommandClass(self)
+        self._duty_handle = None
+
+    @property
+    def safe_name(self) -> str:
+        return self.entity_id.split(".", 1)[1]
+
+    @property
+    def alarm_type_entity(self) -> str:
+        return f"sensor.{self.safe_name}_alarm_type"
+
+    @property
+    def alarm_level_entity(self) -> str:
+        return f"sensor.{self.safe_name}_alarm_level"
+
+    @property
+    def vendor(self) -> str:
+        return "schlage" if "schlage" in self.manufacturer.lower() else "kwikset"
+
+    def values(self):
+        return [*self.user_codes.values(), self._refresh]
+
+    def get_command_class(self, _command_class):
+        return self._command_class
+
+    def get_values(self, class_id=None):
+        """Legacy zwave accessor"""
+        self.network.stats["reads"] += 1
+        self.network.stats["values_walked"] += len(self.user_codes)
+        return self.user_codes
+
+    def reinterview(self) -> None:
+        """Recreate the node's values the way a re-interview does, codes are kept"""
+        self.user_codes = {i: SimulatedValue(self, i, v.value) for i, v in self.user_codes.items()}
+        self._refresh = SimulatedValue(self, SIM_REFRESH_INDEX)
+        self._command_class = SimulatedCommandClass(self)
+
+    def code(self, slot: int) -> str:
+        """The code currently stored in a slot"""
+        return self.user_codes[slot].value
+
+    async def async_write(self, slot: int, code: str) -> bool:
+        """Send a code to the lock, returns False if the frame was lost"""
+        stats = self.network.stats
+        stats["writes"] += 1
+        self.network.record("write", self, slot, code)
+        _delay = self.write_latency.sample(self.network.rng)
+        if _delay:
+            await asyncio.sleep(_delay)
+
+        if self.network.rng.random() < self.drop_rate:
+            stats["drops"] += 1
+            self.network.record("drop", self, slot, code)
+            return False
+
+        if self.sleeping:
+            stats["queued"] += 1
+            self.pending[slot] = code
+            self.network.record("queued", self, slot, code)
+            return True
+
+        self._schedule_report(slot, code)
+        return True
+
+    def _schedule_report(self, slot: int, code: str) -> None:
+        _delay = self.read_latency.sample(self.network.rng)
+        if _delay:
+            self.network.loop.call_later(_delay, self._apply, slot, code)
+        else:
+            self._apply(slot, code)
+
+    def _apply(self, slot: int, code: str) -> None:
+        if slot in self.user_codes:
+            self.user_codes[slot].value = code
+            self.network.stats["applied"] += 1
+            self.network.record("applied", self, slot, code)
+
+    def sleep(self) -> None:
+        self.sleeping = True
+
+    def wake(self) -> None:
+        """Wake the node up and deliver anything queued while asleep"""
+        self.sleeping = False
+        pending, self.pending = self.pending, {}
+        for slot, code in pending.items():
+            self._schedule_report(slot, code)
+
+    def start(self) -> None:
+        """Start the sleep/wake cycle if one is configured"""
+        if self.duty_cycle:
+            self._duty_handle = self.network.loop.call_later(self.duty_cycle[0], self._toggle)
+
+    def stop(self) -> None:
+        if self._duty_handle:
+            self._duty_handle.cancel()
+            self._duty_handle = None
+
+    def _toggle(self) -> None:
+        if self.sleeping:
+            self.wake()
+            _next = self.duty_cycle[0]
+        else:
+            self.sleep()
+            _next = self.duty_cycle[1]
+        self._duty_handle = self.network.loop.call_later(_next, self._toggle)
+
+
+class _SimulatedStatus:
+    def __init__(self, status: str):
+        self.data = {STATUS: status}
+
+
+class SimulatedInstance:
+    """The OZW instance the coordinator talks to"""
+
+    def __init__(self, network: "SimulatedNetwork"):
+        self._network = network
+
+    def get_status(self):
+        return _SimulatedStatus(self._network.status)
+
+    def get_node(self, node_id: int) -> SimulatedNode:
+        return self._network.nodes[node_id]
+
+
+class SimulatedNetwork:
+    """A network of simulated locks, installed in place of the OZW manager"""
+
+    def __init__(self, hass: HomeAssistant, seed: int = 0, max_log: int = 100000):
+        self.hass = hass
+        self.rng = random.Random(seed)
+        self.status = SIM_STATUS_READY
+        self.nodes: Dict[int, SimulatedNode] = {}
+        self._by_entity: Dict[str, SimulatedNode] = {}
+        self._instance = SimulatedInstance(self)
+        self._max_log = max_log
+        self.log: List[tuple] = []
+        self.stats = {
+            "writes": 0,
+            "drops": 0,
+            "queued": 0,
+            "applied": 0,
+            "reads": 0,
+            "values_walked": 0,
+            "alarms": 0,
+        }
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self.hass.loop
+
+    def get_instance(self, _instance_id: int) -> SimulatedInstance:
+        return self._instance
+
+    def add_lock(self, entity_id: str, node_id: int = None, **kwargs) -> SimulatedNode:
+        """Add a lock to the network"""
+        node_id = node_id or len(self.nodes) + 2
+        node = SimulatedNode(self, node_id, entity_id, **kwargs)
+        self.nodes[node_id] = node
+        self._by_entity[entity_id] = node
+        return node
+
+    def lock(self, entity_id: str) -> Optional[SimulatedNode]:
+        return self._by_entity.get(entity_id)
+
+    def record(self, action: str, node: SimulatedNode, slot: int, code) -> None:
+        if len(self.log) < self._max_log:
+            self.log.append((self.loop.time(), action, node.node_id, slot, code))
+
+    def install(self) -> None:
+        """Register the simulated manager, services and entity states"""
+        self.hass.data[OZW_DOMAIN] = {ZWAVE_MANAGER: self}
+
+        async def _set_usercode(service):
+            node = self._by_entity[service.data[ATTR_ENTITY_ID]]
+            await node.async_write(int(service.data[ATTR_CODE_SLOT]), str(service.data[ATTR_USER_CODE]))
+
+        async def _clear_usercode(service):
+            node = self._by_entity[service.data[ATTR_ENTITY_ID]]
+            await node.async_write(int(service.data[ATTR_CODE_SLOT]), "")
+
+        self.hass.services.async_register(OZW_DOMAIN, ZWAVE_SET_USERCODE, _set_usercode)
+        self.hass.services.async_register(OZW_DOMAIN, ZWAVE_CLEAR_USERCODE, _clear_usercode)
+
+        for node in self.nodes.values():
+            self.hass.states.async_set(node.entity_id, "locked", {ATTR_NODE_ID: node.node_id})
+            self.hass.states.async_set(node.alarm_type_entity, 0)
+            self.hass.states.async_set(node.alarm_level_entity, 0)
+            node.start()
+
+    def uninstall(self) -> None:
+        for node in self.nodes.values():
+            node.stop()
+        self.hass.data.pop(OZW_DOMAIN, None)
+
+    def emit_alarm(self, entity_id: str, alarm_type: int, alarm_level: int, order: str = ORDER_TYPE_FIRST,
+                   gap: float = 0) -> None:
+        """Write an alarm_type/alarm_level pair the way the lock reports it, gap delays the second half"""
+        node = self._by_entity[entity_id]
+        self.stats["alarms"] += 1
+        if order == ORDER_RANDOM:
+            order = ORDER_TYPE_FIRST if self.rng.random() < 0.5 else ORDER_LEVEL_FIRST
+
+        _halves = [(node.alarm_type_entity, alarm_type), (node.alarm_level_entity, alarm_level)]
+        if order == ORDER_LEVEL_FIRST:
+            _halves.reverse()
+        self.hass.states.async_set(*_halves[0], force_update=True)
+        if gap:
+            self.hass.loop.call_later(gap, lambda: self.hass.states.async_set(*_halves[1], force_update=True))
+        else:
+            self.hass.states.async_set(*_halves[1], force_update=True)
+
+    def alarm_halves(self, entity_id: str, operation: str, slot: int = 0) -> List[Tuple[str, int]]:
+        """The (entity_id, value) halves of an operation, for replaying them in any order"""
+        node = self._by_entity[entity_id]
+        return [(node.alarm_type_entity, SIM_ALARMS[node.vendor][operation]), (node.alarm_level_entity, slot)]
+
+    def emit(self, entity_id: str, operation: str, slot: int = 0, **kwargs) -> None:
+        """Emit a named operation (keypad_unlock, bad_code, ...) using the lock's vendor codes"""
+        node = self._by_entity[entity_id]
+        self.emit_alarm(entity_id, SIM_ALARMS[node.vendor][operation], slot, **kwargs)
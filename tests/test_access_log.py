@@ -0,0 +1,43 @@
+"""Access records survive a restart of Home Assistant"""
+import asyncio
+import os
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+
+from custom_components.lock_manager import ACCESS_LOG
+from custom_components.lock_manager.access_log import FLUSH_BATCH
+from custom_components.lock_manager.benchmark import Bench
+
+
+def _run(test):
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(test())
+    finally:
+        loop.close()
+
+
+def test_stop_flushes_pending_records(tmp_path, monkeypatch):
+    # The bench keeps its config directory in the working directory
+    monkeypatch.chdir(tmp_path)
+
+    async def _test():
+        bench = Bench(2, 5)
+        await bench.async_setup()
+        logs = [bench.coordinator.entries[e.entry_id][ACCESS_LOG] for e in bench.entries]
+        for i in range(FLUSH_BATCH - 1):
+            logs[0].record(float(i), 1, 19, 1)
+        logs[1].record(0.0, None, 21, 1)
+        await bench.hass.async_block_till_done()
+        assert not any(os.path.exists(log.path) for log in logs)
+
+        bench.hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+        await bench.hass.async_block_till_done()
+
+        with open(logs[0].path) as f:
+            assert len(f.readlines()) == FLUSH_BATCH - 1
+        with open(logs[1].path) as f:
+            assert len(f.readlines()) == 1
+        await bench.async_teardown()
+
+    _run(_test)
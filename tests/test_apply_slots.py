@@ -0,0 +1,55 @@
+"""Bulk slot updates report what the locks accepted"""
+import asyncio
+
+from custom_components.lock_manager.benchmark import Bench
+from custom_components.lock_manager.const import (
+    ATTR_CODE_SLOT,
+    ATTR_ENTITY_ID,
+    ATTR_LOCK,
+    ATTR_SEN_SET_LOCK_CODE,
+    ATTR_SEN_SET_USER_NAME,
+    ATTR_SENSOR_SETTINGS,
+    ATTR_SENSOR_SLOT_ENABLED,
+    RESULT,
+    RESULT_ERROR,
+    RESULT_OK,
+)
+
+
+def _run(test):
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(test())
+    finally:
+        loop.close()
+
+
+def _item(lock: str, slot: int, code: int) -> dict:
+    return {ATTR_LOCK: lock, ATTR_CODE_SLOT: slot, ATTR_SENSOR_SLOT_ENABLED: True,
+            ATTR_SENSOR_SETTINGS: {ATTR_SEN_SET_LOCK_CODE: code, ATTR_SEN_SET_USER_NAME: f"User {slot}"}}
+
+
+def test_failed_write_is_an_error_and_releases_the_code():
+    async def _test():
+        bench = Bench(2, 5)
+        await bench.async_setup()
+        coordinator = bench.coordinator
+        locks = [coordinator.lock_entity(e.entry_id) for e in bench.entries]
+        _write = coordinator.zwave_update_code
+
+        async def _update_code(service_data: dict, clear: bool = False) -> bool:
+            if service_data[ATTR_ENTITY_ID] == locks[1]:
+                return False
+            return await _write(service_data, clear)
+
+        coordinator.zwave_update_code = _update_code
+        results = await coordinator.update_slots([_item(locks[0], 1, 1111), _item(locks[1], 1, 2222)])
+
+        assert [r[RESULT] for r in results] == [RESULT_OK, RESULT_ERROR]
+        assert coordinator.code_index.code(bench.entries[0].entry_id, 1) == 1111
+        assert coordinator.code_index.code(bench.entries[1].entry_id, 1) is None
+        # The released code can be used by another slot of the lock
+        assert coordinator.code_index.conflict(bench.entries[1].entry_id, 2, 2222) is None
+        await bench.async_teardown()
+
+    _run(_test)
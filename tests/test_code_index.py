@@ -0,0 +1,126 @@
+"""Codes collide per lock and per lock group, owned by user id"""
+import asyncio
+
+from custom_components.lock_manager.benchmark import Bench
+from custom_components.lock_manager.code_index import CodeIndex
+from custom_components.lock_manager.const import (
+    ATTR_CODE_SLOT,
+    ATTR_LOCK,
+    ATTR_SEN_SET_LOCK_CODE,
+    ATTR_SEN_SET_USER_NAME,
+    ATTR_SENSOR_SETTINGS,
+    ATTR_SENSOR_SLOT_ENABLED,
+    RESULT,
+    RESULT_ERROR,
+)
+
+
+def _run(test):
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(test())
+    finally:
+        loop.close()
+
+
+def _item(lock: str, slot: int, code: int) -> dict:
+    return {ATTR_LOCK: lock, ATTR_CODE_SLOT: slot, ATTR_SENSOR_SLOT_ENABLED: True,
+            ATTR_SENSOR_SETTINGS: {ATTR_SEN_SET_LOCK_CODE: code, ATTR_SEN_SET_USER_NAME: "Alex"}}
+
+
+def _grouped() -> CodeIndex:
+    index = CodeIndex()
+    for entry_id in ("front", "back", "garage"):
+        index.set_group(entry_id, "home")
+    return index
+
+
+def test_same_lock_clash():
+    index = CodeIndex()
+    index.update("front", 1, 1234)
+    assert index.conflict("front", 2, 1234) == "Code is already used by slot 1 of this lock"
+    # The slot itself may keep its code, another lock may use it
+    assert index.conflict("front", 1, 1234) is None
+    assert index.conflict("back", 1, 1234) is None
+
+
+def test_group_clash():
+    index = _grouped()
+    index.update("front", 1, 1234)
+    assert index.conflict("back", 1, 1234) == "Code is already used by a slot of another lock in lock group home"
+
+    index.update("garage", 3, 5678, "u1")
+    assert index.conflict("back", 1, 5678, "u2") == "Code is already used by user u1 in lock group home"
+    # Outside the group the code is free
+    index.set_group("back", None)
+    assert index.conflict("back", 1, 5678, "u2") is None
+
+
+def test_same_user_on_several_locks():
+    index = _grouped()
+    index.update("front", 2, 1234, "u1")
+    assert index.conflict("back", 2, 1234, "u1") is None
+    index.update("back", 2, 1234, "u1")
+    assert index.conflict("garage", 2, 1234, "u1") is None
+    # Another user, or a slot of no user, can not share it
+    assert index.conflict("garage", 2, 1234, "u2") is not None
+    assert index.conflict("garage", 2, 1234) is not None
+    assert index.collisions() == []
+
+
+def test_collisions():
+    index = _grouped()
+    index.update("front", 1, 1234)
+    index.update("front", 2, 1234)
+    index.update("back", 1, 1234, "u1")
+    assert index.collisions() == [
+        {"entry_id": "front", "slots": [1, 2]},
+        {"group": "home", "users": ["u1"], "slots": [("back", 1), ("front", 1), ("front", 2)]},
+    ]
+
+
+def test_reset_releases_code():
+    index = _grouped()
+    index.update("front", 1, 1234, "u1")
+    index.update("front", 1, None)
+    assert index.code("front", 1) is None
+    assert index.conflict("front", 2, 1234) is None
+    assert index.conflict("back", 1, 1234, "u2") is None
+
+
+def test_unloaded_lock_releases_codes():
+    index = _grouped()
+    index.update("front", 1, 1234)
+    index.update("front", 2, 5678, "u1")
+    index.remove_lock("front")
+    assert index.conflict("back", 1, 1234) is None
+    assert index.conflict("back", 1, 5678, "u2") is None
+    assert index.collisions() == []
+
+
+def test_collision_is_rejected_before_any_write():
+    async def _test():
+        bench = Bench(1, 5)
+        await bench.async_setup()
+        coordinator = bench.coordinator
+        lock = coordinator.lock_entity(bench.entries[0].entry_id)
+        writes = []
+        _write = coordinator.zwave_update_code
+
+        async def _update_code(service_data: dict, clear: bool = False) -> bool:
+            writes.append(service_data[ATTR_CODE_SLOT])
+            return await _write(service_data, clear)
+
+        coordinator.zwave_update_code = _update_code
+        results = await coordinator.update_slots([_item(lock, 1, 1234), _item(lock, 2, 1234)])
+
+        assert results[1][RESULT] == RESULT_ERROR
+        assert writes == [1]
+
+        # Resetting the slot frees the code for the other one
+        await coordinator.reset_slots([{ATTR_LOCK: lock, ATTR_CODE_SLOT: 1}])
+        results = await coordinator.update_slots([_item(lock, 2, 1234)])
+        assert results[0][RESULT] != RESULT_ERROR
+        await bench.async_teardown()
+
+    _run(_test)
@@ -0,0 +1,99 @@
+"""Every alarm notification is decoded exactly once, whatever order its halves arrive in"""
+import asyncio
+
+from custom_components.lock_manager.benchmark import FakeHass
+from custom_components.lock_manager.correlator import (
+    CORRELATION_WINDOW,
+    HALF_LEVEL,
+    HALF_TYPE,
+    AlarmCorrelator,
+)
+from custom_components.lock_manager.timers import TimerManager
+
+
+def _run(test):
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(test())
+    finally:
+        loop.close()
+
+
+def _correlator(hass, timers, name: str):
+    alarms = []
+    correlator = AlarmCorrelator(
+        hass, timers, f"entry_{name}",
+        [f"sensor.{name}_alarm_type", f"sensor.{name}_alarm_level"],
+        lambda alarm_type, alarm_level: alarms.append((alarm_type, alarm_level)),
+    )
+    return correlator, alarms
+
+
+def test_type_first():
+    async def _test():
+        hass = FakeHass()
+        correlator, alarms = _correlator(hass, TimerManager(hass), "front")
+        correlator.half_changed(HALF_TYPE, "19")
+        correlator.half_changed(HALF_LEVEL, "3")
+        await asyncio.sleep(CORRELATION_WINDOW * 2)
+        assert alarms == [(19, 3)]
+
+    _run(_test)
+
+
+def test_level_first():
+    async def _test():
+        hass = FakeHass()
+        correlator, alarms = _correlator(hass, TimerManager(hass), "front")
+        correlator.half_changed(HALF_LEVEL, "3")
+        correlator.half_changed(HALF_TYPE, "19")
+        await asyncio.sleep(CORRELATION_WINDOW * 2)
+        assert alarms == [(19, 3)]
+
+    _run(_test)
+
+
+def test_interleaved_locks():
+    async def _test():
+        hass = FakeHass()
+        timers = TimerManager(hass)
+        front, front_alarms = _correlator(hass, timers, "front")
+        back, back_alarms = _correlator(hass, timers, "back")
+        front.half_changed(HALF_TYPE, "19")
+        back.half_changed(HALF_LEVEL, "7")
+        front.half_changed(HALF_LEVEL, "3")
+        back.half_changed(HALF_TYPE, "18")
+        await asyncio.sleep(CORRELATION_WINDOW * 2)
+        assert front_alarms == [(19, 3)]
+        assert back_alarms == [(18, 7)]
+
+    _run(_test)
+
+
+def test_late_level():
+    async def _test():
+        hass = FakeHass()
+        correlator, alarms = _correlator(hass, TimerManager(hass), "front")
+        correlator.half_changed(HALF_TYPE, "19")
+        await asyncio.sleep(CORRELATION_WINDOW / 2)
+        correlator.half_changed(HALF_LEVEL, "3")
+        # A late copy of the closing half is not a second notification
+        correlator.half_changed(HALF_LEVEL, "3")
+        await asyncio.sleep(CORRELATION_WINDOW * 2)
+        assert alarms == [(19, 3)]
+
+    _run(_test)
+
+
+def test_unpaired_type():
+    async def _test():
+        hass = FakeHass()
+        # An unchanged alarm_level fires no state change, its current state completes the pair
+        hass.states.async_set("sensor.front_alarm_level", 3)
+        correlator, alarms = _correlator(hass, TimerManager(hass), "front")
+        correlator.half_changed(HALF_TYPE, "19")
+        assert alarms == []
+        await asyncio.sleep(CORRELATION_WINDOW * 2)
+        assert alarms == [(19, 3)]
+
+    _run(_test)
@@ -0,0 +1,69 @@
+"""Attempt bursts trip once per window in fixed memory"""
+import tracemalloc
+
+from custom_components.lock_manager.detector import (
+    ATTEMPT_BAD_CODE,
+    ATTEMPT_OUT_OF_SCHEDULE,
+    AttemptDetector,
+    RateWindow,
+)
+
+LIMIT = 5
+WINDOW = 60
+
+
+def test_burst_memory_bounded():
+    window = RateWindow(LIMIT, WINDOW)
+    # Warm up so the deque has reached its size before measuring
+    for i in range(LIMIT):
+        window.hit(i * 0.001)
+    tracemalloc.start()
+    try:
+        _before = tracemalloc.take_snapshot()
+        for i in range(100000):
+            window.hit(1 + i * 0.001)
+        _after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    assert len(window._times) <= LIMIT
+    assert window.attempts == 100000 + LIMIT
+    _growth = sum(stat.size_diff for stat in _after.compare_to(_before, "filename")
+                  if stat.traceback[0].filename.endswith("detector.py"))
+    assert _growth < 1024
+
+
+def test_below_limit_never_trips():
+    window = RateWindow(LIMIT, WINDOW)
+    # LIMIT - 1 attempts in every window, spaced so no LIMIT of them fit in one
+    _spacing = WINDOW / (LIMIT - 1) + 0.1
+    assert not any(window.hit(i * _spacing) for i in range(1000))
+    assert window.trips == 0
+
+
+def test_one_trip_per_window():
+    window = RateWindow(LIMIT, WINDOW)
+    # One attempt a second for ten windows
+    _trips = [t for t in range(WINDOW * 10) if window.hit(float(t))]
+    assert _trips == [LIMIT - 1 + n * WINDOW for n in range(10)]
+    assert window.trips == 10
+
+
+def test_trips_again_after_quiet_period():
+    window = RateWindow(LIMIT, WINDOW)
+    assert [window.hit(0.0) for _ in range(LIMIT)] == [False] * (LIMIT - 1) + [True]
+    # Still quiet, however many attempts
+    assert not any(window.hit(WINDOW - 1.0) for _ in range(LIMIT * 10))
+    # A fresh burst after the quiet period alerts again
+    assert window.hit(WINDOW + 1.0)
+    assert window.trips == 2
+
+
+def test_kinds_are_separate():
+    detector = AttemptDetector(LIMIT, WINDOW)
+    assert not any(detector.attempt(ATTEMPT_BAD_CODE, 0.0) for _ in range(LIMIT - 1))
+    assert not any(detector.attempt(ATTEMPT_OUT_OF_SCHEDULE, 0.0) for _ in range(LIMIT - 1))
+    assert detector.attempt(ATTEMPT_BAD_CODE, 1.0)
+    assert detector.count(ATTEMPT_OUT_OF_SCHEDULE, 1.0) == LIMIT - 1
+    assert detector.as_dict()[ATTEMPT_BAD_CODE] == {"attempts": LIMIT, "trips": 1}
+    assert detector.as_dict()[ATTEMPT_OUT_OF_SCHEDULE] == {"attempts": LIMIT - 1, "trips": 0}
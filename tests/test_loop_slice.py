@@ -0,0 +1,44 @@
+"""Bulk work on the loop lets other tasks run once a slice is used"""
+import asyncio
+import time
+
+from custom_components.lock_manager import SLICE_SECONDS, LoopSlice
+
+
+def _run(test):
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(test())
+    finally:
+        loop.close()
+
+
+def test_pause_yields_once_slice_is_used(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(time, "perf_counter", lambda: clock[0])
+
+    async def _test():
+        loop = asyncio.get_running_loop()
+        ran = []
+        _slice = LoopSlice()
+        loop.call_soon(ran.append, 1)
+
+        await _slice.pause()
+        clock[0] = SLICE_SECONDS / 2
+        await _slice.pause()
+        assert ran == []
+
+        clock[0] = SLICE_SECONDS
+        await _slice.pause()
+        assert ran == [1]
+
+        # The next slice starts when the task resumed
+        loop.call_soon(ran.append, 2)
+        clock[0] = SLICE_SECONDS * 1.5
+        await _slice.pause()
+        assert ran == [1]
+        clock[0] = SLICE_SECONDS * 2
+        await _slice.pause()
+        assert ran == [1, 2]
+
+    _run(_test)
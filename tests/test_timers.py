@@ -0,0 +1,83 @@
+"""Timers fire in deadline order and keep their repeat when re-armed"""
+import asyncio
+
+from custom_components.lock_manager.benchmark import FakeHass
+from custom_components.lock_manager.timers import TimerManager
+
+# Seconds between deadlines, far above the loop's scheduling jitter
+STEP = 0.02
+
+
+def _run(test):
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(test())
+    finally:
+        loop.close()
+
+
+def test_fire_in_deadline_order():
+    async def _test():
+        timers = TimerManager(FakeHass())
+        fired = []
+        timers.schedule("front", "c", STEP * 3, lambda: fired.append("c"))
+        timers.schedule("front", "a", STEP, lambda: fired.append("a"))
+        timers.schedule("back", "b", STEP * 2, lambda: fired.append("b"))
+        await asyncio.sleep(STEP * 4)
+        assert fired == ["a", "b", "c"]
+        assert len(timers) == 0
+
+    _run(_test)
+
+
+def test_retime_keeps_repeat():
+    async def _test():
+        timers = TimerManager(FakeHass())
+        fired = []
+        timers.schedule("front", "door", STEP * 10, lambda: fired.append("door"), repeat=STEP * 2)
+        assert timers.retime("front", "door", STEP)
+        assert timers.as_list()[0]["repeat"] == STEP * 2
+
+        # Fires at 1, 3 and 5 steps, still armed after
+        await asyncio.sleep(STEP * 6)
+        assert fired == ["door"] * 3
+        assert timers.active("front", "door")
+
+        assert timers.retime("front", "door", STEP, repeat=STEP * 10)
+        assert timers.as_list()[0]["repeat"] == STEP * 10
+        assert not timers.retime("front", "missing", STEP)
+        timers.stop()
+
+    _run(_test)
+
+
+def test_retime_reorders():
+    async def _test():
+        timers = TimerManager(FakeHass())
+        fired = []
+        timers.schedule("front", "a", STEP, lambda: fired.append("a"))
+        timers.schedule("front", "b", STEP * 2, lambda: fired.append("b"))
+        timers.retime("front", "a", STEP * 3)
+        await asyncio.sleep(STEP * 4)
+        assert fired == ["b", "a"]
+
+    _run(_test)
+
+
+def test_cancel_entry_keeps_other_locks():
+    async def _test():
+        timers = TimerManager(FakeHass())
+        fired = []
+        timers.schedule("front", "door", STEP, lambda: fired.append("front door"), repeat=STEP)
+        timers.schedule("front", "lock", STEP * 2, lambda: fired.append("front lock"))
+        timers.schedule("back", "door", STEP * 3, lambda: fired.append("back door"))
+        timers.schedule("back", "lock", STEP * 2, lambda: fired.append("back lock"), repeat=STEP * 10)
+        timers.cancel_entry("front")
+
+        assert [(t["entry_id"], t["kind"]) for t in timers.as_list()] == [("back", "lock"), ("back", "door")]
+        assert timers.as_list()[0]["repeat"] == STEP * 10
+        await asyncio.sleep(STEP * 4)
+        assert fired == ["back lock", "back door"]
+        timers.stop()
+
+    _run(_test)
@@ -0,0 +1,95 @@
+"""Options changes are applied in place without reloading or writing to the lock"""
+import asyncio
+
+from custom_components.lock_manager.benchmark import Bench
+from custom_components.lock_manager.const import (
+    CONF_NOTIFY_DIGEST,
+    CONF_NOTIFY_DOOR_LEFT_OPEN,
+    CONF_OPEN_DURATION,
+    CONF_SLOTS,
+    CONF_START,
+)
+
+SLOTS = 6
+
+
+def _run(test):
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(test())
+    finally:
+        loop.close()
+
+
+async def _bench():
+    bench = Bench(1, SLOTS)
+    await bench.async_setup()
+    await bench.async_configure_slots()
+    coordinator = bench.coordinator
+    reloads = []
+    _load, _unload = coordinator.load_entry, coordinator.unload_entry
+
+    async def _load_entry(entry):
+        reloads.append("load")
+        await _load(entry)
+
+    async def _unload_entry(entry, reload=False):
+        reloads.append("unload")
+        return await _unload(entry, reload)
+
+    coordinator.load_entry, coordinator.unload_entry = _load_entry, _unload_entry
+    return bench, reloads
+
+
+async def _update(bench, **changes) -> int:
+    """Apply changes to the entry, returns the writes they sent to the lock"""
+    entry = bench.entries[0]
+    writes = bench.network.stats["writes"]
+    entry.data = {**entry.data, **changes}
+    await bench.coordinator.update_entry(entry)
+    await bench.hass.async_block_till_done()
+    return bench.network.stats["writes"] - writes
+
+
+def _slots(bench) -> list:
+    return sorted(s.slot for s in bench.sensors())
+
+
+def test_options_change_does_not_reload_or_write():
+    async def _test():
+        bench, reloads = await _bench()
+        _sensors = bench.sensors()
+        assert await _update(bench, **{
+            CONF_OPEN_DURATION: 120, CONF_NOTIFY_DOOR_LEFT_OPEN: True, CONF_NOTIFY_DIGEST: 60,
+        }) == 0
+        assert reloads == []
+        assert bench.sensors() == _sensors
+        await bench.async_teardown()
+
+    _run(_test)
+
+
+def test_grow_and_shrink_slots():
+    async def _test():
+        bench, reloads = await _bench()
+        coordinator = bench.coordinator
+        entry_id = bench.entries[0].entry_id
+        _kept = {s.slot: s for s in bench.sensors()}
+
+        assert await _update(bench, **{CONF_SLOTS: SLOTS + 3}) == 0
+        assert _slots(bench) == list(range(1, SLOTS + 4))
+        # The slots in both ranges are the same sensors with their codes
+        assert all(s is _kept.get(s.slot) for s in bench.sensors() if s.slot <= SLOTS)
+
+        assert await _update(bench, **{CONF_SLOTS: 2}) == 0
+        assert _slots(bench) == [1, 2]
+        assert coordinator.code_index.code(entry_id, 3) is None
+        assert coordinator.code_index.code(entry_id, 1) == _kept[1].code is not None
+
+        # Moving the start drops the slots below it and adds the ones past the end
+        assert await _update(bench, **{CONF_START: 2, CONF_SLOTS: 3}) == 0
+        assert _slots(bench) == [2, 3, 4]
+        assert reloads == []
+        await bench.async_teardown()
+
+    _run(_test)
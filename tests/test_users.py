@@ -0,0 +1,113 @@
+"""Multi-lock users keep what the locks did not accept"""
+import asyncio
+
+from custom_components.lock_manager.benchmark import Bench
+from custom_components.lock_manager.const import (
+    ATTR_ASSIGNMENTS,
+    ATTR_CODE,
+    ATTR_CODE_SLOT,
+    ATTR_CONCURRENCY,
+    ATTR_ENTITY_ID,
+    ATTR_LOCK,
+    ATTR_NAME,
+    ATTR_SENSOR_SETTINGS,
+    ATTR_SENSOR_SLOT_ENABLED,
+    ATTR_USER_ID,
+    RESULT,
+    RESULT_ERROR,
+    RESULT_OK,
+)
+
+
+def _run(test):
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(test())
+    finally:
+        loop.close()
+
+
+def _user(user_id: str, code: int, assignments: list) -> dict:
+    return {
+        ATTR_USER_ID: user_id,
+        ATTR_NAME: "Alex",
+        ATTR_CODE: code,
+        ATTR_SENSOR_SETTINGS: {},
+        ATTR_SENSOR_SLOT_ENABLED: True,
+        ATTR_CONCURRENCY: 2,
+        ATTR_ASSIGNMENTS: assignments,
+    }
+
+
+async def _bench():
+    bench = Bench(2, 5)
+    await bench.async_setup()
+    locks = [bench.coordinator.lock_entity(e.entry_id) for e in bench.entries]
+    return bench, locks
+
+
+def _fail_writes(coordinator, lock: str):
+    """Make every service call to one lock fail"""
+    _write = coordinator.zwave_update_code
+
+    async def _update_code(service_data: dict, clear: bool = False) -> bool:
+        if service_data[ATTR_ENTITY_ID] == lock:
+            return False
+        return await _write(service_data, clear)
+
+    coordinator.zwave_update_code = _update_code
+
+
+def test_revoke_keeps_failed_assignments():
+    async def _test():
+        bench, locks = await _bench()
+        users = bench.coordinator.users
+        assignments = [{ATTR_LOCK: lock, ATTR_CODE_SLOT: 2} for lock in locks]
+        await users.async_set_user(_user("u1", 4321, assignments))
+
+        _fail_writes(bench.coordinator, locks[1])
+        result = await users.async_revoke_user("u1", 2)
+
+        assert [s[RESULT] for s in result["slots"]] == [RESULT_OK, RESULT_ERROR]
+        assert users.users["u1"][ATTR_ASSIGNMENTS] == [assignments[1]]
+        assert users.owner(locks[0], 2) is None
+        assert users.owner(locks[1], 2) == "u1"
+        await bench.async_teardown()
+
+    _run(_test)
+
+
+def test_revoke_removes_cleared_user():
+    async def _test():
+        bench, locks = await _bench()
+        users = bench.coordinator.users
+        await users.async_set_user(_user("u1", 4321, [{ATTR_LOCK: lock, ATTR_CODE_SLOT: 2} for lock in locks]))
+
+        result = await users.async_revoke_user("u1", 2)
+
+        assert [s[RESULT] for s in result["slots"]] == [RESULT_OK, RESULT_OK]
+        assert "u1" not in users.users
+        await bench.async_teardown()
+
+    _run(_test)
+
+
+def test_set_user_does_not_take_another_users_slot():
+    async def _test():
+        bench, locks = await _bench()
+        users = bench.coordinator.users
+        await users.async_set_user(_user("u1", 4321, [{ATTR_LOCK: locks[0], ATTR_CODE_SLOT: 2}]))
+        _sensor = next(s for s in bench.sensors(bench.entries[0]) if s.slot == 2)
+
+        result = await users.async_set_user(_user("u2", 8765, [
+            {ATTR_LOCK: locks[0], ATTR_CODE_SLOT: 2},
+            {ATTR_LOCK: locks[1], ATTR_CODE_SLOT: 2},
+        ]))
+
+        assert [s[RESULT] for s in result["slots"]] == [RESULT_ERROR, RESULT_OK]
+        assert _sensor.code == 4321
+        assert users.owner(locks[0], 2) == "u1"
+        assert users.users["u2"][ATTR_ASSIGNMENTS] == [{ATTR_LOCK: locks[1], ATTR_CODE_SLOT: 2}]
+        await bench.async_teardown()
+
+    _run(_test)
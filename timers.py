@@ -0,0 +1,169 @@
+"""Per-lock timers sharing one scheduled callback"""
+import heapq
+import itertools
+import logging
+
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+import homeassistant.util.dt as dt_util
+
+# Timer kinds
+TIMER_DOOR_OPEN = "door_open"
+TIMER_LOCK_CHANGED = "lock_changed"
+TIMER_ALARM_PAIR = "alarm_pair"
+TIMER_LOCKDOWN = "lockdown"
+
+# Rebuild the heap once it holds this many cancelled entries more than live ones
+COMPACT_SLACK = 64
+
+TimerKey = Tuple[str, str]
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Timer:
+    """A pending timer, repeat re-arms it every repeat seconds after it fires"""
+
+    __slots__ = ("key", "when", "action", "repeat", "seq")
+
+    def __init__(self, key: TimerKey, when: float, action: Callable[[], None], repeat: Optional[float], seq: int):
+        self.key = key
+        self.when = when
+        self.action = action
+        self.repeat = repeat
+        self.seq = seq
+
+
+class TimerManager:
+    """Timers keyed by (entry_id, kind) on one heap.
+
+    There is at most one timer per key and one loop callback for all of them,
+    armed for the earliest deadline. Re-arming or cancelling a timer replaces
+    its map entry, the stale heap entry is skipped when it surfaces and the heap
+    is compacted when stale entries pile up.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._timers: Dict[TimerKey, Timer] = {}
+        self._heap: List[Tuple[float, int, TimerKey]] = []
+        self._seq = itertools.count()
+        self._handle = None
+        self._handle_when: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    @callback
+    def schedule(self, entry_id: str, kind: str, delay: float, action: Callable[[], None],
+                 repeat: float = None) -> None:
+        """Start or re-arm a timer"""
+        _key = (entry_id, kind)
+        _timer = Timer(_key, self._hass.loop.time() + delay, action, repeat, next(self._seq))
+        self._timers[_key] = _timer
+        self._push(_timer)
+
+    @callback
+    def cancel(self, entry_id: str, kind: str) -> bool:
+        """Cancel a timer, returns False if it was not running"""
+        if self._timers.pop((entry_id, kind), None) is None:
+            return False
+        self._compact()
+        return True
+
+    @callback
+    def retime(self, entry_id: str, kind: str, delay: float, repeat: float = None) -> bool:
+        """Re-arm a running timer with a new delay and its own repeat, returns False if it was not running"""
+        _timer = self._timers.get((entry_id, kind))
+        if _timer is None:
+            return False
+        self.schedule(entry_id, kind, delay, _timer.action, repeat if repeat is not None else _timer.repeat)
+        return True
+
+    @callback
+    def cancel_entry(self, entry_id: str) -> None:
+        for _key in [k for k in self._timers if k[0] == entry_id]:
+            del self._timers[_key]
+        self._compact()
+
+    def active(self, entry_id: str, kind: str) -> bool:
+        return (entry_id, kind) in self._timers
+
+    def remaining(self, entry_id: str, kind: str) -> Optional[float]:
+        _timer = self._timers.get((entry_id, kind))
+        return max(0.0, _timer.when - self._hass.loop.time()) if _timer else None
+
+    def as_list(self) -> List[dict]:
+        """Pending timers, soonest first"""
+        _now = self._hass.loop.time()
+        _utcnow = dt_util.utcnow()
+        return [
+            {
+                "entry_id": t.key[0],
+                "kind": t.key[1],
+                "due": (_utcnow + timedelta(seconds=max(0.0, t.when - _now))).isoformat(),
+                "remaining": round(max(0.0, t.when - _now), 3),
+                "repeat": t.repeat,
+            }
+            for t in sorted(self._timers.values(), key=lambda t: t.when)
+        ]
+
+    @callback
+    def stop(self) -> None:
+        self._timers.clear()
+        self._heap.clear()
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+            self._handle_when = None
+
+    def _push(self, timer: Timer) -> None:
+        heapq.heappush(self._heap, (timer.when, timer.seq, timer.key))
+        self._compact()
+        self._arm()
+
+    def _compact(self) -> None:
+        if len(self._heap) > 2 * len(self._timers) + COMPACT_SLACK:
+            self._heap = [(t.when, t.seq, t.key) for t in self._timers.values()]
+            heapq.heapify(self._heap)
+
+    def _arm(self) -> None:
+        """Point the loop callback at the earliest live deadline"""
+        while self._heap and self._stale(self._heap[0]):
+            heapq.heappop(self._heap)
+        _when = self._heap[0][0] if self._heap else None
+        if _when == self._handle_when:
+            return
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+        self._handle_when = _when
+        if _when is not None:
+            self._handle = self._hass.loop.call_at(_when, self._run)
+
+    def _stale(self, item: Tuple[float, int, TimerKey]) -> bool:
+        _timer = self._timers.get(item[2])
+        return _timer is None or _timer.seq != item[1]
+
+    @callback
+    def _run(self) -> None:
+        self._handle = None
+        self._handle_when = None
+        _now = self._hass.loop.time()
+        while self._heap and self._heap[0][0] <= _now:
+            _item = heapq.heappop(self._heap)
+            if self._stale(_item):
+                continue
+            _timer = self._timers.pop(_item[2])
+            if _timer.repeat:
+                _timer.when += _timer.repeat
+                _timer.seq = next(self._seq)
+                self._timers[_timer.key] = _timer
+                heapq.heappush(self._heap, (_timer.when, _timer.seq, _timer.key))
+            try:
+                _timer.action()
+            except Exception:
+                _LOGGER.error(f"Error running {_timer.key[1]} timer", exc_info=True)
+        self._arm()
@@ -0,0 +1,170 @@
+"""Recording of the coordinator's inputs to a JSON-lines trace.
+
+The first line is a header with the config entries, the lock devices and the
+configured slots, so a replay starts from the same state. Every following line
+is a watched state change or a lock_manager service call with its offset in
+seconds from the start of the trace. ``replay.py`` pushes a trace back through
+the coordinator.
+"""
+import asyncio
+import json
+import logging
+
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from homeassistant.const import ATTR_DOMAIN, ATTR_SERVICE, ATTR_SERVICE_DATA, EVENT_CALL_SERVICE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, ATTR_ENTITY_ID
+
+TRACE_VERSION = 1
+
+# Record types
+RECORD_HEADER = "header"
+RECORD_STATE = "state"
+RECORD_SERVICE = "service"
+
+# Pending records written to the file together
+FLUSH_BATCH = 200
+# Seconds a record may wait before it is written
+FLUSH_DELAY = 5
+
+EVENT_TRACE = f"{DOMAIN}_trace"
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _write(path: str, lines: List[str], first: bool) -> None:
+    """Write lines to the trace, runs in the executor"""
+    with open(path, "w" if first else "a") as f:
+        f.writelines(lines)
+
+
+def read_trace(path: str) -> List[dict]:
+    """Every record of a trace, the header first"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TraceRecorder:
+    """Captures the watched state changes and service calls of the next T seconds.
+
+    The coordinator's event listener hands watched state changes to ``record_state``
+    while ``active`` is set, calls to the domain's services other than the ignored
+    ones are picked up from the bus. Records are serialised on the loop and
+    written in batches in the executor.
+    """
+
+    def __init__(self, hass: HomeAssistant, ignore: Iterable[str] = ()):
+        self._hass = hass
+        self._ignore = set(ignore)
+        self.active = False
+        self.path: Optional[str] = None
+        self._start = 0.0
+        self._records = 0
+        self._pending: List[str] = []
+        self._first = True
+        self._flush_timer = None
+        self._stop_timer = None
+        self._unsub_services = None
+        # Flushes write in order, the first one truncates the file
+        self._write_lock = asyncio.Lock()
+
+    def _line(self, record: dict) -> str:
+        return json.dumps(record, default=str) + "\n"
+
+    def start(self, path: str, seconds: float, entries: List[dict]) -> bool:
+        """Start a trace with the current entries and slots, returns False if one is already running"""
+        if self.active:
+            _LOGGER.warning("A trace is already running")
+            return False
+
+        self.path = path
+        self._start = self._hass.loop.time()
+        self._records = 0
+        self._first = True
+        self._pending = [self._line({
+            "type": RECORD_HEADER,
+            "version": TRACE_VERSION,
+            "started": datetime.now().isoformat(),
+            "entries": entries,
+        })]
+        self._unsub_services = self._hass.bus.async_listen(EVENT_CALL_SERVICE, self._service_called)
+        self._stop_timer = async_call_later(self._hass, seconds, self._async_timeout)
+        self.active = True
+        _LOGGER.info(f"Tracing {seconds}s of events to {path}")
+        return True
+
+    def _add(self, record: dict) -> None:
+        record["t"] = round(self._hass.loop.time() - self._start, 6)
+        self._pending.append(self._line(record))
+        self._records += 1
+        if len(self._pending) >= FLUSH_BATCH:
+            self._hass.async_create_task(self.async_flush())
+        elif self._flush_timer is None:
+            self._flush_timer = async_call_later(self._hass, FLUSH_DELAY, self._async_flush_later)
+
+    @callback
+    def record_state(self, event: Event) -> None:
+        """A state change of a watched entity"""
+        _new = event.data.get("new_state")
+        self._add({
+            "type": RECORD_STATE,
+            ATTR_ENTITY_ID: event.data[ATTR_ENTITY_ID],
+            "state": _new.state if _new else None,
+            "attributes": dict(_new.attributes) if _new else None,
+        })
+
+    @callback
+    def _service_called(self, event: Event) -> None:
+        if event.data.get(ATTR_DOMAIN) != DOMAIN or event.data.get(ATTR_SERVICE) in self._ignore:
+            return
+        self._add({
+            "type": RECORD_SERVICE,
+            "service": event.data[ATTR_SERVICE],
+            "data": dict(event.data.get(ATTR_SERVICE_DATA) or {}),
+        })
+
+    @callback
+    def _async_flush_later(self, _now) -> None:
+        self._flush_timer = None
+        self._hass.async_create_task(self.async_flush())
+
+    async def async_flush(self) -> None:
+        if self._flush_timer:
+            self._flush_timer()
+            self._flush_timer = None
+        async with self._write_lock:
+            if not self._pending:
+                return
+            _pending, self._pending = self._pending, []
+            _first, self._first = self._first, False
+            await self._hass.async_add_executor_job(_write, self.path, _pending, _first)
+
+    @callback
+    def _async_timeout(self, _now) -> None:
+        self._stop_timer = None
+        if self.active:
+            self._hass.async_create_task(self.async_stop())
+
+    async def async_stop(self) -> None:
+        """Stop the running trace and write what is left"""
+        if not self.active:
+            return
+
+        self.active = False
+        if self._stop_timer:
+            self._stop_timer()
+            self._stop_timer = None
+        self._unsub_services()
+        self._unsub_services = None
+        await self.async_flush()
+        _LOGGER.info(f"Trace of {self._records} records written to {self.path}")
+        self._hass.bus.async_fire(EVENT_TRACE, {
+            "path": self.path,
+            "records": self._records,
+            "seconds": round(self._hass.loop.time() - self._start, 3),
+        })
+
@@ -0,0 +1,159 @@
+"""Users holding one code and schedule across many locks"""
+import logging
+
+from typing import Dict, List, Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    ATTR_ASSIGNMENTS,
+    ATTR_CODE,
+    ATTR_CODE_SLOT,
+    ATTR_CONCURRENCY,
+    ATTR_LOCK,
+    ATTR_NAME,
+    ATTR_SEN_SET_LOCK_CODE,
+    ATTR_SEN_SET_USER_NAME,
+    ATTR_SENSOR_SETTINGS,
+    ATTR_SENSOR_SLOT_ENABLED,
+    ATTR_USER_ID,
+    DEFAULT_CONCURRENCY,
+    RESULT,
+    RESULT_ERROR,
+)
+from .schema import CODE_SENSOR_SETTINGS_SCHEMA
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.users"
+
+EVENT_USER_PROGRESS = f"{DOMAIN}_user_progress"
+EVENT_USER = f"{DOMAIN}_user"
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _key(assignment: dict) -> tuple:
+    return assignment[ATTR_LOCK], assignment[ATTR_CODE_SLOT]
+
+
+class UserManager:
+    """Keeps user records and fans their slots out to every assigned lock"""
+
+    def __init__(self, hass: HomeAssistant, coordinator):
+        self._hass = hass
+        self._coordinator = coordinator
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._users: Dict[str, dict] = {}
+        # (lock, slot) of every assignment to the user id holding it
+        self._owners: Dict[tuple, str] = {}
+        self.loaded = False
+
+    @property
+    def users(self) -> Dict[str, dict]:
+        return self._users
+
+    async def async_load(self) -> None:
+        self._users = await self._store.async_load() or {}
+        self._index_owners()
+        self.loaded = True
+
+    def _index_owners(self) -> None:
+        self._owners = {_key(a): user_id for user_id, user in self._users.items() for a in user[ATTR_ASSIGNMENTS]}
+
+    def owner(self, lock: str, slot: int) -> Optional[str]:
+        """Id of the user assigned to a slot, None for a slot configured on its own"""
+        return self._owners.get((lock, slot))
+
+    def _save(self) -> None:
+        self._store.async_delay_save(lambda: self._users, 1)
+
+    def _progress(self, user_id: str, action: str):
+        def _report(entry_id: str, result: dict) -> None:
+            self._hass.bus.async_fire(EVENT_USER_PROGRESS, {
+                ATTR_USER_ID: user_id,
+                "action": action,
+                ATTR_LOCK: self._coordinator.lock_entity(entry_id),
+                **result,
+            })
+        return _report
+
+    async def async_set_user(self, data: dict) -> dict:
+        """Validate a user once and write its slot on every assigned lock"""
+        user_id = data[ATTR_USER_ID]
+        settings = CODE_SENSOR_SETTINGS_SCHEMA({
+            **data[ATTR_SENSOR_SETTINGS],
+            ATTR_SEN_SET_LOCK_CODE: data[ATTR_CODE],
+            ATTR_SEN_SET_USER_NAME: data[ATTR_NAME],
+        })
+        assignments = data[ATTR_ASSIGNMENTS]
+
+        items = []
+        for i, a in enumerate(assignments):
+            # Another user's slot is only freed by revoking it from them
+            _owner = self.owner(*_key(a))
+            if _owner not in (None, user_id):
+                items.append((i, None, f"Code slot is assigned to user {_owner}"))
+                continue
+            # The slot is the user's while it is written, so its other locks are not a conflict
+            self._owners[_key(a)] = user_id
+            items.append((
+                i, {**a, ATTR_SENSOR_SETTINGS: settings, ATTR_SENSOR_SLOT_ENABLED: data[ATTR_SENSOR_SLOT_ENABLED]}, None
+            ))
+        slots = await self._coordinator.apply_slots(
+            items, data[ATTR_CONCURRENCY], self._progress(user_id, "set")
+        )
+
+        # Slots the user no longer has are cleared
+        _previous = self._users.get(user_id, {}).get(ATTR_ASSIGNMENTS, [])
+        _current = {_key(a) for a in assignments}
+        _dropped = [a for a in _previous if _key(a) not in _current]
+        if _dropped:
+            await self._async_clear(user_id, _dropped, data[ATTR_CONCURRENCY])
+
+        self._users[user_id] = {
+            ATTR_NAME: data[ATTR_NAME],
+            ATTR_SENSOR_SETTINGS: data[ATTR_SENSOR_SETTINGS],
+            ATTR_SENSOR_SLOT_ENABLED: data[ATTR_SENSOR_SLOT_ENABLED],
+            ATTR_ASSIGNMENTS: [a for a, r in zip(assignments, slots) if r[RESULT] != RESULT_ERROR],
+        }
+        self._index_owners()
+        self._save()
+        return self._result(user_id, "set", slots)
+
+    async def async_revoke_user(self, user_id: str, concurrency: int = DEFAULT_CONCURRENCY) -> Optional[dict]:
+        """Clear the user from every assigned lock in parallel.
+
+        The record is dropped only once every slot is cleared, the assignments
+        that failed stay on it so the revoke can be retried.
+        """
+        user = self._users.get(user_id)
+        if user is None:
+            _LOGGER.warning(f"Unknown user {user_id}")
+            return None
+        slots = await self._async_clear(user_id, user[ATTR_ASSIGNMENTS], concurrency)
+
+        # A set_user while clearing replaced the record, it is the one to keep
+        if self._users.get(user_id) is user:
+            _failed = [a for a, r in zip(user[ATTR_ASSIGNMENTS], slots) if r[RESULT] == RESULT_ERROR]
+            if _failed:
+                self._users[user_id] = {**user, ATTR_ASSIGNMENTS: _failed}
+            else:
+                del self._users[user_id]
+            self._index_owners()
+            self._save()
+        return self._result(user_id, "revoke", slots)
+
+    async def _async_clear(self, user_id: str, assignments: List[dict], concurrency: int) -> List[dict]:
+        return await self._coordinator.reset_slots(
+            assignments, concurrency, self._progress(user_id, "revoke")
+        )
+
+    def _result(self, user_id: str, action: str, slots: List[dict]) -> dict:
+        _result = {ATTR_USER_ID: user_id, "action": action, "slots": slots}
+        _failed = [s for s in slots if s[RESULT] == RESULT_ERROR]
+        if _failed:
+            _LOGGER.warning(f"User {user_id} {action} failed on {len(_failed)} slots: {_failed}")
+        self._hass.bus.async_fire(EVENT_USER, _result)
+        return _result
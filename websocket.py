@@ -0,0 +1,185 @@
+"""Websocket commands reading slots from the coordinator instead of the state machine"""
+from typing import Dict, List, Optional
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, ATTR_LOCK, ATTR_ENABLED, ATTR_SEN_SET_BY_DATE_RANGE, ATTR_SEN_SET_BY_DOW
+
+WS_LIST_SLOTS = f"{DOMAIN}/slots"
+WS_SUBSCRIBE_SLOTS = f"{DOMAIN}/slots/subscribe"
+
+# Row fields
+FIELD_ENTITY_ID = "entity_id"
+FIELD_LOCK = "lock"
+FIELD_SLOT = "slot"
+FIELD_STATE = "state"
+FIELD_STATUS = "status"
+FIELD_ENABLED = "enabled"
+FIELD_DIRTY = "dirty"
+FIELD_SCHEDULED = "scheduled"
+FIELD_SCHEDULE_ACTIVE = "schedule_active"
+FIELD_USER_NAME = "user_name"
+FIELD_COUNT = "count"
+FIELD_CODE = "code"
+FIELDS = [
+    FIELD_ENTITY_ID, FIELD_LOCK, FIELD_SLOT, FIELD_STATE, FIELD_STATUS, FIELD_ENABLED, FIELD_DIRTY,
+    FIELD_SCHEDULED, FIELD_SCHEDULE_ACTIVE, FIELD_USER_NAME, FIELD_COUNT, FIELD_CODE,
+]
+# Codes are only sent when asked for
+DEFAULT_FIELDS = [f for f in FIELDS if f != FIELD_CODE]
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+ATTR_OFFSET = "offset"
+ATTR_LIMIT = "limit"
+ATTR_FIELDS = "fields"
+ATTR_DIRTY = "dirty"
+ATTR_SCHEDULE_ACTIVE = "schedule_active"
+ATTR_USER_PREFIX = "user_prefix"
+
+FILTER_SCHEMA = {
+    vol.Optional(ATTR_LOCK): str,
+    vol.Optional(ATTR_ENABLED): bool,
+    vol.Optional(ATTR_DIRTY): bool,
+    vol.Optional(ATTR_SCHEDULE_ACTIVE): bool,
+    vol.Optional(ATTR_USER_PREFIX): str,
+    vol.Optional(ATTR_FIELDS, default=DEFAULT_FIELDS): [vol.In(FIELDS)],
+}
+
+
+def _scheduled(settings: Optional[dict]) -> bool:
+    return any(
+        (settings or {}).get(key, {}).get(ATTR_ENABLED)
+        for key in (ATTR_SEN_SET_BY_DATE_RANGE, ATTR_SEN_SET_BY_DOW)
+    )
+
+
+def slot_row(sensor) -> dict:
+    """Every field of a slot"""
+    _scheduled_slot = _scheduled(sensor.settings)
+    return {
+        FIELD_ENTITY_ID: f"sensor.{sensor.name}",
+        FIELD_LOCK: sensor.parent,
+        FIELD_SLOT: sensor.slot,
+        FIELD_STATE: sensor.state,
+        FIELD_STATUS: sensor.status,
+        FIELD_ENABLED: sensor.slot_enabled,
+        FIELD_DIRTY: sensor.out_of_sync,
+        FIELD_SCHEDULED: _scheduled_slot,
+        FIELD_SCHEDULE_ACTIVE: _scheduled_slot and sensor.granted,
+        FIELD_USER_NAME: sensor.user_name,
+        FIELD_COUNT: sensor.count,
+        FIELD_CODE: sensor.code,
+    }
+
+
+def _matches(row: dict, msg: dict) -> bool:
+    for key, field in ((ATTR_ENABLED, FIELD_ENABLED), (ATTR_DIRTY, FIELD_DIRTY),
+                       (ATTR_SCHEDULE_ACTIVE, FIELD_SCHEDULE_ACTIVE)):
+        if key in msg and row[field] != msg[key]:
+            return False
+    if ATTR_USER_PREFIX in msg and not (row[FIELD_USER_NAME] or "").lower().startswith(msg[ATTR_USER_PREFIX].lower()):
+        return False
+    return True
+
+
+def _select(row: dict, fields: List[str]) -> dict:
+    return {f: row[f] for f in fields}
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): WS_LIST_SLOTS,
+    vol.Optional(ATTR_OFFSET, default=0): vol.All(int, vol.Range(min=0)),
+    vol.Optional(ATTR_LIMIT, default=DEFAULT_PAGE_SIZE): vol.All(int, vol.Range(min=1, max=MAX_PAGE_SIZE)),
+    **FILTER_SCHEMA,
+})
+@callback
+def websocket_list_slots(hass: HomeAssistant, connection, msg: dict) -> None:
+    """A page of the slots matching the filters"""
+    coordinator = hass.data.get(DOMAIN)
+    if coordinator is None:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "Lock Manager is not loaded")
+        return
+
+    _rows = [r for r in (slot_row(s) for s in coordinator.slot_sensors(msg.get(ATTR_LOCK))) if _matches(r, msg)]
+    _offset = msg[ATTR_OFFSET]
+    _end = _offset + msg[ATTR_LIMIT]
+    connection.send_result(msg["id"], {
+        "slots": [_select(r, msg[ATTR_FIELDS]) for r in _rows[_offset:_end]],
+        "total": len(_rows),
+        "next_offset": _end if _end < len(_rows) else None,
+    })
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): WS_SUBSCRIBE_SLOTS,
+    **FILTER_SCHEMA,
+})
+@callback
+def websocket_subscribe_slots(hass: HomeAssistant, connection, msg: dict) -> None:
+    """Push the slots matching the filters whenever they change.
+
+    Changes are collected until the loop is idle and only rows that differ
+    from what the client was last sent go out. A slot that stops matching or
+    is removed is sent in "removed".
+    """
+    coordinator = hass.data.get(DOMAIN)
+    if coordinator is None:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "Lock Manager is not loaded")
+        return
+
+    _sent: Dict[str, dict] = {}
+    _changed = {}
+    _handle = None
+
+    @callback
+    def _flush() -> None:
+        nonlocal _handle
+        _handle = None
+        _slots = []
+        _removed = []
+        for _name, _sensor in _changed.items():
+            _row = slot_row(_sensor)
+            _live = coordinator.has_sensor(_sensor) and msg.get(ATTR_LOCK, _row[FIELD_LOCK]) == _row[FIELD_LOCK]
+            if _live and _matches(_row, msg):
+                _row = _select(_row, msg[ATTR_FIELDS])
+                if _sent.get(_name) != _row:
+                    _sent[_name] = _row
+                    _slots.append(_row)
+            elif _sent.pop(_name, None) is not None:
+                _removed.append(_name)
+        _changed.clear()
+        if _slots or _removed:
+            connection.send_message(websocket_api.event_message(msg["id"], {"slots": _slots, "removed": _removed}))
+
+    @callback
+    def _slot_changed(sensor) -> None:
+        nonlocal _handle
+        _changed[f"sensor.{sensor.name}"] = sensor
+        if _handle is None:
+            _handle = hass.loop.call_soon(_flush)
+
+    _unsub = coordinator.async_listen_slots(_slot_changed)
+
+    @callback
+    def _unsubscribe() -> None:
+        _unsub()
+        if _handle:
+            _handle.cancel()
+
+    connection.subscriptions[msg["id"]] = _unsubscribe
+    connection.send_result(msg["id"])
+
+    # Start the client off with every matching slot
+    for _sensor in coordinator.slot_sensors(msg.get(ATTR_LOCK)):
+        _slot_changed(_sensor)
+
+
+@callback
+def async_register_websocket(hass: HomeAssistant) -> None:
+    websocket_api.async_register_command(hass, websocket_list_slots)
+    websocket_api.async_register_command(hass, websocket_subscribe_slots)